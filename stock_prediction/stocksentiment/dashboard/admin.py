@@ -1,3 +1,81 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import (
+    ApiQuotaUsage, ArticleMention, ArticleSentiment, DailySentiment, HourlySentiment, LivePost, LiveSentiment,
+    NewsArticle, NewsQuery, PriceBar, PriceCoverage,
+)
+
+
+@admin.register(PriceBar)
+class PriceBarAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'date', 'adj_close', 'volume')
+    list_filter = ('ticker',)
+    date_hierarchy = 'date'
+
+
+@admin.register(PriceCoverage)
+class PriceCoverageAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'start_date', 'end_date')
+    list_filter = ('ticker',)
+
+
+@admin.register(NewsArticle)
+class NewsArticleAdmin(admin.ModelAdmin):
+    list_display = ('title', 'source', 'published_at')
+    search_fields = ('title', 'url')
+    date_hierarchy = 'published_at'
+
+
+@admin.register(NewsQuery)
+class NewsQueryAdmin(admin.ModelAdmin):
+    list_display = ('query', 'covered_from', 'newest_published_at', 'pending_from', 'pending_to', 'last_fetched_at')
+    exclude = ('articles',)
+
+
+@admin.register(ArticleMention)
+class ArticleMentionAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'published_at', 'article')
+    list_filter = ('ticker',)
+    raw_id_fields = ('article',)
+
+
+@admin.register(ArticleSentiment)
+class ArticleSentimentAdmin(admin.ModelAdmin):
+    list_display = ('article', 'compound', 'scored_at')
+    raw_id_fields = ('article',)
+
+
+@admin.register(DailySentiment)
+class DailySentimentAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'date', 'mean', 'article_count')
+    list_filter = ('ticker',)
+    date_hierarchy = 'date'
+
+
+@admin.register(HourlySentiment)
+class HourlySentimentAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'hour', 'mean', 'article_count')
+    list_filter = ('ticker',)
+    date_hierarchy = 'hour'
+
+
+@admin.register(LiveSentiment)
+class LiveSentimentAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'window_start', 'mean', 'article_count')
+    list_filter = ('ticker',)
+    date_hierarchy = 'window_start'
+
+
+@admin.register(LivePost)
+class LivePostAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'source', 'title', 'score', 'window_start', 'seen_at')
+    search_fields = ('title',)
+    list_filter = ('ticker', 'source')
+    date_hierarchy = 'seen_at'
+
+
+@admin.register(ApiQuotaUsage)
+class ApiQuotaUsageAdmin(admin.ModelAdmin):
+    list_display = ('provider', 'day', 'used', 'exhausted', 'updated_at')
+    list_filter = ('provider', 'exhausted')
+    date_hierarchy = 'day'
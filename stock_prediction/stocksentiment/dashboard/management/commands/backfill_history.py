@@ -0,0 +1,95 @@
+import json
+from datetime import datetime, timedelta
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.utils import backfill, data_fetchers
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfills years of stored prices (and as much news as the NewsAPI plan allows) for a "
+        "ticker universe. Work is chunked, runs in parallel and is checkpointed, so an "
+        "interrupted run resumes where it stopped when started again with the same --job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', nargs='+',
+                            help="Tickers to backfill (default: TARGET_STOCKS).")
+        parser.add_argument('--tickers-file',
+                            help="File with one ticker per line (blank lines and # comments ignored).")
+        parser.add_argument('--years', type=int, default=10,
+                            help="Years of price history to backfill.")
+        parser.add_argument('--start', help="First day to backfill (YYYY-MM-DD); overrides --years.")
+        parser.add_argument('--news-days', type=int, default=28,
+                            help="Days of news to backfill (0 to skip news).")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Chunks downloaded in parallel.")
+        parser.add_argument('--job', default='default',
+                            help="Checkpoint name; runs with the same name resume each other.")
+        parser.add_argument('--reset', action='store_true',
+                            help="Discard the job's checkpoint and start over.")
+        parser.add_argument('--json', action='store_true',
+                            help="Print the final report as JSON.")
+
+    def _tickers(self, options):
+        tickers = [ticker.upper() for ticker in options['tickers'] or []]
+        if options['tickers_file']:
+            try:
+                with open(options['tickers_file']) as f:
+                    for line in f:
+                        line = line.split('#')[0].strip()
+                        if line:
+                            tickers.append(line.upper())
+            except OSError as e:
+                raise CommandError(f"Could not read tickers file: {e}")
+        # Keep the given order, drop duplicates
+        return list(dict.fromkeys(tickers)) or data_fetchers.TARGET_STOCKS
+
+    def handle(self, *args, **options):
+        tickers = self._tickers(options)
+        end_date = timezone.now().date() + timedelta(days=1)  # exclusive, includes today
+        if options['start']:
+            try:
+                start_date = datetime.strptime(options['start'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--start must be YYYY-MM-DD.")
+        else:
+            start_date = end_date - timedelta(days=options['years'] * 365)
+
+        if not options['json']:
+            self.stdout.write(
+                f"Backfilling {len(tickers)} tickers from {start_date} "
+                f"({options['news_days']} days of news) with {options['workers']} workers..."
+            )
+
+        def progress(stats):
+            finished = stats['skipped'] + stats['done'] + stats['failed']
+            self.stdout.write(
+                f"  {finished}/{stats['chunks']} chunks | prices {stats['prices']['rows']} rows "
+                f"({stats['prices']['rows_per_second']}/s) | news {stats['news']['rows']} articles "
+                f"({stats['news']['rows_per_second']}/s)"
+            )
+
+        stats = backfill.run_backfill(
+            tickers, start_date, end_date,
+            job=options['job'], news_days=options['news_days'], workers=options['workers'],
+            reset=options['reset'], progress=None if options['json'] else progress,
+        )
+        # Cached results were computed from the previous data
+        caches['results'].clear()
+
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+        style = self.style.SUCCESS if not stats['failed'] else self.style.WARNING
+        self.stdout.write(style(
+            f"Done in {stats['seconds']}s: {stats['done']} chunks run, {stats['skipped']} already done, "
+            f"{stats['failed']} failed (rerun to retry)."
+        ))
+        for kind in ('prices', 'news'):
+            self.stdout.write(
+                f"  {kind}: {stats[kind]['rows']} rows, {stats[kind]['calls']} calls | "
+                f"{stats[kind]['rows_per_second']} rows/s, {stats[kind]['calls_per_second']} calls/s"
+            )
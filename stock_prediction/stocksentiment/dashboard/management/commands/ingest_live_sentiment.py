@@ -0,0 +1,61 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.utils import data_fetchers, ingestion
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams posts from the live sources (Reddit, Google News RSS, Twitter) through the "
+        "ingestion pipeline into per-ticker LiveSentiment windows, printing per-stage "
+        "throughput and latency. Runs until interrupted or for --duration seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', nargs='+', default=data_fetchers.TARGET_STOCKS,
+                            help="Tickers to follow (default: TARGET_STOCKS).")
+        parser.add_argument('--sources', nargs='+', choices=sorted(ingestion.POLL_INTERVALS),
+                            help="Sources to poll (default: every configured source).")
+        parser.add_argument('--window', type=int, default=ingestion.WINDOW_SECONDS,
+                            help="Aggregation window in seconds.")
+        parser.add_argument('--report-every', type=int, default=60,
+                            help="Seconds between stage reports.")
+        parser.add_argument('--duration', type=int, default=0,
+                            help="Seconds to run; 0 runs until interrupted.")
+
+    def _report(self, pipeline):
+        for stage in pipeline.report():
+            latency = stage['latency_ms'] or {}
+            self.stdout.write(
+                f"  {stage['stage']:<9} in {stage['received']:>7} out {stage['emitted']:>7} "
+                f"dropped {stage['dropped']:>5} | {stage['per_second']}/s, busy {stage['busy']:.1%} | "
+                f"queue {stage['queue_depth'] if stage['queue_depth'] is not None else '-'} | "
+                f"p50 {latency.get('p50', '-')}ms p95 {latency.get('p95', '-')}ms"
+            )
+
+    def handle(self, *args, **options):
+        sources = ingestion.available_sources()
+        if options['sources']:
+            missing = set(options['sources']) - set(sources)
+            if missing:
+                raise CommandError(f"Not configured: {', '.join(sorted(missing))} (check credentials and installed packages).")
+            sources = {name: sources[name] for name in options['sources']}
+        if not sources:
+            raise CommandError("No live sources are configured (set Reddit credentials, or install feedparser or snscrape).")
+
+        pipeline = ingestion.IngestionPipeline(sources, options['tickers'], window_seconds=options['window'])
+        self.stdout.write(f"Ingesting {', '.join(sources)} for {', '.join(options['tickers'])}...")
+        pipeline.start()
+        deadline = time.monotonic() + options['duration'] if options['duration'] else None
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                wait = options['report_every']
+                if deadline is not None:
+                    wait = min(wait, max(deadline - time.monotonic(), 0))
+                time.sleep(wait)
+                self._report(pipeline)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping...")
+        pipeline.stop()
+        self.stdout.write(self.style.SUCCESS("Stopped; queued posts were written out."))
+        self._report(pipeline)
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dashboard.utils import data_fetchers, refresher
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes stored prices and news for the target stocks and retrains their "
+        "prediction models, so page views can be served from local data. Runs once, "
+        "or every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', nargs='+', default=data_fetchers.TARGET_STOCKS,
+                            help="Tickers to refresh (default: TARGET_STOCKS).")
+        parser.add_argument('--years', type=int, default=3,
+                            help="Years of price history to keep stored.")
+        parser.add_argument('--news-days', type=int, default=28,
+                            help="Days of news to keep fetched (NewsAPI plan limit).")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Seconds between refreshes; 0 runs once and exits.")
+
+    def handle(self, *args, **options):
+        tickers = options['tickers']
+        while True:
+            close_old_connections()
+            self.stdout.write(f"Refreshing {', '.join(tickers)}...")
+            stats = refresher.refresh_all(tickers, years=options['years'], news_days=options['news_days'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Done in {stats['seconds']}s: {stats['price_gaps']} price gaps downloaded, "
+                f"{stats['news_fetches']} news windows fetched, "
+                f"price cube {stats['cube_bytes']} bytes, {stats['models_trained']} models trained."
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,71 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Times each stage of the historic request path (fetch, sentiment analysis, "
+        "aggregation, chart build, serialization) on fixture data across ticker counts, "
+        "date ranges and article counts, and writes the results as JSON. Runs against a "
+        "throwaway test database; no network calls are made."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickers', nargs='+', type=int, default=list(benchmark.DEFAULT_TICKER_COUNTS),
+                            help="Ticker counts to benchmark.")
+        parser.add_argument('--days', nargs='+', type=int, default=list(benchmark.DEFAULT_DAYS),
+                            help="Price history lengths (days) to benchmark.")
+        parser.add_argument('--articles', nargs='+', type=int, default=list(benchmark.DEFAULT_ARTICLE_COUNTS),
+                            help="Article counts to benchmark.")
+        parser.add_argument('--repeats', type=int, default=benchmark.DEFAULT_REPEATS,
+                            help="Timed repeats per scenario.")
+        parser.add_argument('--output',
+                            help="Results file (default: var/benchmarks/benchmark-<timestamp>.json).")
+        parser.add_argument('--baseline',
+                            help="Earlier results file to compare against; exits with an error on regressions.")
+        parser.add_argument('--tolerance', type=float, default=benchmark.DEFAULT_TOLERANCE,
+                            help="Allowed relative slowdown of a stage's median before it counts as a regression.")
+
+    def handle(self, *args, **options):
+        if options['repeats'] < 1:
+            raise CommandError("--repeats must be at least 1.")
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline: {e}")
+
+        scenarios = benchmark.make_scenarios(options['tickers'], options['days'], options['articles'])
+        self.stdout.write(f"Running {len(scenarios)} scenarios x {options['repeats']} repeats...")
+
+        def progress(result):
+            scenario = result['scenario']
+            self.stdout.write(
+                f"  {scenario['tickers']} tickers, {scenario['days']} days, {scenario['articles']} articles:"
+            )
+            for stage, timing in result['stages'].items():
+                self.stdout.write(f"    {stage:<20} median {timing['median_ms']:>10.3f} ms  min {timing['min_ms']:>10.3f} ms")
+
+        with benchmark.isolated_database():
+            report = benchmark.run_suite(scenarios, repeats=options['repeats'], progress=progress)
+
+        output = options['output'] or benchmark.results_path()
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if baseline is not None:
+            regressions = benchmark.compare(report, baseline, tolerance=options['tolerance'])
+            for r in regressions:
+                scenario = r['scenario']
+                self.stdout.write(self.style.WARNING(
+                    f"  {r['stage']} ({scenario['tickers']} tickers, {scenario['days']} days, "
+                    f"{scenario['articles']} articles): {r['baseline_ms']} ms -> {r['current_ms']} ms"
+                ))
+            if regressions:
+                raise CommandError(f"{len(regressions)} stage timings regressed against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
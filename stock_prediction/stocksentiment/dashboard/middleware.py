@@ -0,0 +1,48 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .utils import instrumentation
+
+
+class ServerTimingMiddleware:
+    """Traces each request and reports its stage timings in a Server-Timing header.
+
+    Spans, counters and sizes recorded while the view runs (see
+    utils/instrumentation.py) are sent to the browser, where they show up in the
+    developer tools' timing panel, and are added to the per-process aggregates
+    served at /api/metrics/timing/. Set SERVER_TIMING = False to keep the
+    aggregates but not send the header. For streaming responses the timings
+    cover the view, not the stream.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with instrumentation.trace_request() as trace:
+            response = self.get_response(request)
+        return self._finish(request, response, trace)
+
+    async def __acall__(self, request):
+        with instrumentation.trace_request() as trace:
+            response = await self.get_response(request)
+        return self._finish(request, response, trace)
+
+    def _finish(self, request, response, trace):
+        total = trace.elapsed()
+        match = request.resolver_match
+        instrumentation.metrics.add_request(match.view_name if match else 'unresolved', total)
+        if not response.streaming:
+            trace.add_size('response', len(response.content))
+            instrumentation.metrics.add_size('response', len(response.content))
+        if getattr(settings, 'SERVER_TIMING', True):
+            response['Server-Timing'] = trace.server_timing(total)
+        return response
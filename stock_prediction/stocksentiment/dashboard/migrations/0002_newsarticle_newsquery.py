@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=40, unique=True)),
+                ('url', models.URLField(blank=True, max_length=1000)),
+                ('title', models.TextField(blank=True)),
+                ('description', models.TextField(blank=True)),
+                ('source', models.CharField(blank=True, max_length=200)),
+                ('published_at', models.DateTimeField(db_index=True, null=True)),
+            ],
+            options={
+                'ordering': ['-published_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NewsQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=500, unique=True)),
+                ('covered_from', models.DateTimeField(null=True)),
+                ('newest_published_at', models.DateTimeField(null=True)),
+                ('last_fetched_at', models.DateTimeField(null=True)),
+                ('articles', models.ManyToManyField(blank=True, related_name='queries', to='dashboard.newsarticle')),
+            ],
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_newsarticle_newsquery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleMention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=16)),
+                ('published_at', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArticleSentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('neg', models.FloatField()),
+                ('neu', models.FloatField()),
+                ('pos', models.FloatField()),
+                ('compound', models.FloatField()),
+                ('scored_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=16)),
+                ('date', models.DateField()),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('article_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['ticker', 'date'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='pricecoverage',
+            name='ticker',
+            field=models.CharField(max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='pricecoverage',
+            index=models.Index(fields=['ticker', 'start_date'], name='price_coverage_ticker_start'),
+        ),
+        migrations.AddField(
+            model_name='articlemention',
+            name='article',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='dashboard.newsarticle'),
+        ),
+        migrations.AddField(
+            model_name='articlesentiment',
+            name='article',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sentiment', to='dashboard.newsarticle'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysentiment',
+            constraint=models.UniqueConstraint(fields=('ticker', 'date'), name='unique_daily_sentiment'),
+        ),
+        migrations.AddIndex(
+            model_name='articlemention',
+            index=models.Index(fields=['ticker', 'published_at'], name='mention_ticker_published'),
+        ),
+        migrations.AddConstraint(
+            model_name='articlemention',
+            constraint=models.UniqueConstraint(fields=('article', 'ticker'), name='unique_article_mention'),
+        ),
+    ]
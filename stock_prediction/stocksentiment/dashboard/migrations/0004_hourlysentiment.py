@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_articlemention_articlesentiment_dailysentiment_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlySentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=16)),
+                ('hour', models.DateTimeField()),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('article_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['ticker', 'hour'],
+                'constraints': [models.UniqueConstraint(fields=('ticker', 'hour'), name='unique_hourly_sentiment')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_hourlysentiment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiQuotaUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=32)),
+                ('day', models.DateField()),
+                ('used', models.PositiveIntegerField(default=0)),
+                ('exhausted', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-day', 'provider'],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'day'), name='unique_quota_usage')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_apiquotausage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LiveSentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=16)),
+                ('window_start', models.DateTimeField()),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('article_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['ticker', 'window_start'],
+                'constraints': [models.UniqueConstraint(fields=('ticker', 'window_start'), name='unique_live_sentiment')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_livesentiment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsquery',
+            name='pending_from',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='newsquery',
+            name='pending_to',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,66 @@
+from datetime import timezone as dt_timezone
+from django.db import migrations
+
+from dashboard.utils import ticker_matcher
+from dashboard.utils.sentiment_analyzer import headline_text
+
+
+def keep_real_mentions(apps, schema_editor):
+    """Deletes mentions whose headline doesn't name the ticker and rebuilds the sentiment buckets.
+
+    Articles matching none of a combined query's tickers used to be linked to
+    all of them; they are now only blended in when the combined series is read.
+    A mention stays if its headline names the ticker or the article was
+    returned by a query for that ticker alone.
+    """
+    ArticleMention = apps.get_model('dashboard', 'ArticleMention')
+    DailySentiment = apps.get_model('dashboard', 'DailySentiment')
+    HourlySentiment = apps.get_model('dashboard', 'HourlySentiment')
+    NewsQuery = apps.get_model('dashboard', 'NewsQuery')
+
+    single_queries = {
+        query.query: set(query.articles.values_list('pk', flat=True))
+        for query in NewsQuery.objects.exclude(query__contains=' OR ')
+    }
+    stale = []
+    rows = ArticleMention.objects.values_list('pk', 'ticker', 'article_id', 'article__title', 'article__description')
+    for pk, ticker, article_id, title, description in rows.iterator(chunk_size=2000):
+        if article_id in single_queries.get(ticker, ()):
+            continue
+        text = headline_text({'title': title, 'description': description})
+        if ticker not in ticker_matcher.get_matcher([ticker]).find(text):
+            stale.append(pk)
+    for start in range(0, len(stale), 500):
+        ArticleMention.objects.filter(pk__in=stale[start:start + 500]).delete()
+
+    daily, hourly = {}, {}
+    rows = ArticleMention.objects.filter(
+        published_at__isnull=False, article__sentiment__isnull=False
+    ).values_list('ticker', 'published_at', 'article__sentiment__compound')
+    for ticker, published_at, compound in rows.iterator(chunk_size=2000):
+        published_at = published_at.astimezone(dt_timezone.utc)
+        for buckets, key in ((daily, (ticker, published_at.date())),
+                             (hourly, (ticker, published_at.replace(minute=0, second=0, microsecond=0)))):
+            score_sum, count = buckets.get(key, (0.0, 0))
+            buckets[key] = (score_sum + compound, count + 1)
+    DailySentiment.objects.all().delete()
+    HourlySentiment.objects.all().delete()
+    DailySentiment.objects.bulk_create([
+        DailySentiment(ticker=ticker, date=day, score_sum=score_sum, article_count=count)
+        for (ticker, day), (score_sum, count) in daily.items()
+    ], batch_size=1000)
+    HourlySentiment.objects.bulk_create([
+        HourlySentiment(ticker=ticker, hour=hour, score_sum=score_sum, article_count=count)
+        for (ticker, hour), (score_sum, count) in hourly.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_newsquery_pending'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_real_mentions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+def mark_existing_folded(apps, schema_editor):
+    """Existing mentions with a score and a date are already in the sentiment buckets."""
+    ArticleMention = apps.get_model('dashboard', 'ArticleMention')
+    ArticleMention.objects.filter(
+        published_at__isnull=False, article__sentiment__isnull=False
+    ).update(folded=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_real_mentions_only'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articlemention',
+            name='folded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_folded, migrations.RunPython.noop),
+    ]
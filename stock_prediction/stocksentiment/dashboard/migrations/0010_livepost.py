@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_articlemention_folded'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LivePost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=16)),
+                ('post_hash', models.CharField(max_length=40)),
+                ('source', models.CharField(max_length=32)),
+                ('window_start', models.DateTimeField()),
+                ('seen_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('flush', models.UUIDField(db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ticker', 'post_hash'), name='unique_live_post')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_livepost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='livepost',
+            name='score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='livepost',
+            name='title',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='livepost',
+            name='url',
+            field=models.URLField(blank=True, default='', max_length=1000),
+        ),
+    ]
@@ -1,3 +1,242 @@
 from django.db import models
 
-# Create your models here.
+
+class PriceBar(models.Model):
+    """One daily OHLCV bar for a ticker, as downloaded from yfinance."""
+    ticker = models.CharField(max_length=16)
+    date = models.DateField()
+    open = models.FloatField(null=True)
+    high = models.FloatField(null=True)
+    low = models.FloatField(null=True)
+    close = models.FloatField(null=True)
+    adj_close = models.FloatField(null=True)
+    volume = models.BigIntegerField(null=True)
+
+    class Meta:
+        ordering = ['ticker', 'date']
+        # The unique constraint doubles as the (ticker, date) index for range reads
+        constraints = [
+            models.UniqueConstraint(fields=['ticker', 'date'], name='unique_price_bar'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticker} {self.date}"
+
+
+class PriceCoverage(models.Model):
+    """A date range [start_date, end_date) already fetched from the provider for a ticker.
+
+    Ranges are half-open like yfinance's start/end arguments, and adjacent or
+    overlapping ranges are merged so each ticker usually has a single row.
+    """
+    ticker = models.CharField(max_length=16)
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    class Meta:
+        ordering = ['ticker', 'start_date']
+        indexes = [
+            models.Index(fields=['ticker', 'start_date'], name='price_coverage_ticker_start'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticker} [{self.start_date}, {self.end_date})"
+
+
+class NewsArticle(models.Model):
+    """A news article, stored once no matter how many queries returned it."""
+    url_hash = models.CharField(max_length=40, unique=True)  # sha1 of the URL (or of the content if no URL)
+    url = models.URLField(max_length=1000, blank=True)
+    title = models.TextField(blank=True)
+    description = models.TextField(blank=True)
+    source = models.CharField(max_length=200, blank=True)
+    published_at = models.DateTimeField(null=True, db_index=True)
+
+    class Meta:
+        ordering = ['-published_at']
+
+    def __str__(self):
+        return self.title[:80]
+
+
+class NewsQuery(models.Model):
+    """Fetch state for one NewsAPI query string (e.g. 'AAPL OR MSFT').
+
+    Everything between covered_from and the newest_published_at high-water mark
+    has been fetched, so later requests only ask NewsAPI for what lies outside it,
+    except [pending_from, pending_to): a span a truncated fetch left missing
+    inside that range, fetched again on the next refresh.
+    """
+    query = models.CharField(max_length=500, unique=True)
+    covered_from = models.DateTimeField(null=True)
+    newest_published_at = models.DateTimeField(null=True)
+    pending_from = models.DateTimeField(null=True)
+    pending_to = models.DateTimeField(null=True)
+    last_fetched_at = models.DateTimeField(null=True)
+    articles = models.ManyToManyField(NewsArticle, related_name='queries', blank=True)
+
+    @property
+    def tickers(self):
+        return self.query.split(' OR ')
+
+    def __str__(self):
+        return self.query
+
+
+class ArticleMention(models.Model):
+    """Links an article to a ticker it is about.
+
+    published_at is copied from the article so per-ticker time-range reads use
+    the (ticker, published_at) index without a join. folded is set in the same
+    transaction that adds the article's score to the sentiment buckets.
+    """
+    article = models.ForeignKey(NewsArticle, on_delete=models.CASCADE, related_name='mentions')
+    ticker = models.CharField(max_length=16)
+    published_at = models.DateTimeField(null=True)
+    folded = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'ticker'], name='unique_article_mention'),
+        ]
+        indexes = [
+            models.Index(fields=['ticker', 'published_at'], name='mention_ticker_published'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticker}: {self.article}"
+
+
+class ArticleSentiment(models.Model):
+    """VADER scores for one article's headline text (title + description)."""
+    article = models.OneToOneField(NewsArticle, on_delete=models.CASCADE, related_name='sentiment')
+    neg = models.FloatField()
+    neu = models.FloatField()
+    pos = models.FloatField()
+    compound = models.FloatField()
+    scored_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.compound:+.3f} {self.article}"
+
+
+class DailySentiment(models.Model):
+    """Running sum and count of article compound scores for one ticker on one (UTC) day.
+
+    Buckets are updated incrementally as articles are attributed to tickers;
+    weekly series are rolled up from them.
+    """
+    ticker = models.CharField(max_length=16)
+    date = models.DateField()
+    score_sum = models.FloatField(default=0.0)
+    article_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['ticker', 'date']
+        # The unique constraint doubles as the (ticker, date) index for range reads
+        constraints = [
+            models.UniqueConstraint(fields=['ticker', 'date'], name='unique_daily_sentiment'),
+        ]
+
+    @property
+    def mean(self):
+        return self.score_sum / self.article_count if self.article_count else 0.0
+
+    def __str__(self):
+        return f"{self.ticker} {self.date}: {self.mean:+.3f} ({self.article_count})"
+
+
+class HourlySentiment(models.Model):
+    """Running sum and count of article compound scores for one ticker in one UTC hour."""
+    ticker = models.CharField(max_length=16)
+    hour = models.DateTimeField()
+    score_sum = models.FloatField(default=0.0)
+    article_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['ticker', 'hour']
+        constraints = [
+            models.UniqueConstraint(fields=['ticker', 'hour'], name='unique_hourly_sentiment'),
+        ]
+
+    @property
+    def mean(self):
+        return self.score_sum / self.article_count if self.article_count else 0.0
+
+    def __str__(self):
+        return f"{self.ticker} {self.hour:%Y-%m-%d %H}:00: {self.mean:+.3f} ({self.article_count})"
+
+
+class LiveSentiment(models.Model):
+    """Running sum and count of social/RSS post scores for one ticker in one short UTC window.
+
+    Written by the ingest_live_sentiment command (see utils/ingestion.py).
+    """
+    ticker = models.CharField(max_length=16)
+    window_start = models.DateTimeField()
+    score_sum = models.FloatField(default=0.0)
+    article_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['ticker', 'window_start']
+        constraints = [
+            models.UniqueConstraint(fields=['ticker', 'window_start'], name='unique_live_sentiment'),
+        ]
+
+    @property
+    def mean(self):
+        return self.score_sum / self.article_count if self.article_count else 0.0
+
+    def __str__(self):
+        return f"{self.ticker} {self.window_start:%Y-%m-%d %H:%M}: {self.mean:+.3f} ({self.article_count})"
+
+
+class LivePost(models.Model):
+    """A social/RSS post already folded into LiveSentiment for a ticker.
+
+    Posts are stored in the same transaction that folds them, and the unique
+    (ticker, post_hash) constraint makes a post that is seen again - after a
+    restart, or from another source - count once. `flush` identifies the write
+    that stored the row, so the writer can tell which of its posts were new.
+    Title, link and score are kept so live streams can show the post (see
+    live_stream.IngestedFeed).
+    """
+    ticker = models.CharField(max_length=16)
+    post_hash = models.CharField(max_length=40)  # news_store.article_hash of the post
+    source = models.CharField(max_length=32)
+    window_start = models.DateTimeField()
+    title = models.CharField(max_length=500, blank=True, default='')
+    url = models.URLField(max_length=1000, blank=True, default='')
+    score = models.FloatField(null=True, blank=True)  # VADER compound
+    seen_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    flush = models.UUIDField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ticker', 'post_hash'], name='unique_live_post'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticker} {self.source} {self.post_hash[:8]}"
+
+
+class ApiQuotaUsage(models.Model):
+    """Calls made to an API provider on one UTC day, checked against its daily quota.
+
+    Shared by every worker process, so the quota holds across restarts and workers.
+    """
+    provider = models.CharField(max_length=32)
+    day = models.DateField()
+    used = models.PositiveIntegerField(default=0)
+    # Set when the provider itself reports the quota as used up
+    exhausted = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-day', 'provider']
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'day'], name='unique_quota_usage'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.day}: {self.used} calls{' (exhausted)' if self.exhausted else ''}"
@@ -0,0 +1,86 @@
+/*
+ * Client-side chart rendering for the dashboard.
+ *
+ * Any element with a data-chart-url attribute is filled with a Plotly chart
+ * built from the JSON payload at that URL:
+ *   {title, xaxis_title, yaxis_title, legend_title, dates: [...],
+ *    series: [{name, mode, values: [...], dates: [...] (if downsampled)}]}
+ * or, for heatmaps:
+ *   {type: 'heatmap', title, xaxis_title, yaxis_title, x: [...], y: [...], z: [[...]]}
+ */
+(function () {
+    'use strict';
+
+    function showMessage(container, message) {
+        container.innerHTML = '';
+        var p = document.createElement('p');
+        p.textContent = message;
+        container.appendChild(p);
+    }
+
+    function renderHeatmap(container, payload) {
+        var trace = {
+            type: 'heatmap',
+            x: payload.x,
+            y: payload.y,
+            z: payload.z,
+            zmin: -1,
+            zmax: 1,
+            colorscale: 'RdBu',
+            reversescale: true
+        };
+        var layout = {
+            title: payload.title,
+            xaxis: {title: payload.xaxis_title, dtick: 1},
+            yaxis: {title: payload.yaxis_title}
+        };
+        Plotly.newPlot(container, [trace], layout, {responsive: true});
+    }
+
+    function renderChart(container, payload) {
+        if (payload.type === 'heatmap') {
+            renderHeatmap(container, payload);
+            return;
+        }
+        var traces = payload.series.map(function (series) {
+            return {
+                x: series.dates || payload.dates,
+                y: series.values,
+                mode: series.mode || 'lines',
+                type: 'scatter',
+                name: series.name
+            };
+        });
+        var layout = {
+            title: payload.title,
+            xaxis: {title: payload.xaxis_title},
+            yaxis: {title: payload.yaxis_title},
+            legend: payload.legend_title ? {title: {text: payload.legend_title}} : {}
+        };
+        Plotly.newPlot(container, traces, layout, {responsive: true});
+    }
+
+    function loadChart(container) {
+        showMessage(container, 'Loading chart...');
+        fetch(container.dataset.chartUrl, {headers: {'Accept': 'application/json'}})
+            .then(function (response) {
+                return response.json().then(function (body) {
+                    if (!response.ok) {
+                        throw new Error(body.error || 'Chart data could not be loaded.');
+                    }
+                    return body;
+                });
+            })
+            .then(function (payload) {
+                container.innerHTML = '';
+                renderChart(container, payload);
+            })
+            .catch(function (error) {
+                showMessage(container, error.message);
+            });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-chart-url]').forEach(loadChart);
+    });
+})();
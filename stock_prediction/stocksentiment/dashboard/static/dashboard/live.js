@@ -0,0 +1,132 @@
+/*
+ * Live page updates over Server-Sent Events.
+ *
+ * The element with data-stream-url is updated from the stream's events:
+ *   ready     {ticker, sources, intervals}
+ *   price     {ticker, price, change, change_percent, delta, stale, at, ...}
+ *   sentiment {ticker, source, articles: [...], mean, count, delta, at}
+ *   prediction_token {ticker, text}  (a piece of the LLM answer while it is generated)
+ *   prediction {ticker, direction, confidence, explanation, cached, at}
+ *   close     {reason}
+ * EventSource reconnects by itself when the server ends the stream.
+ */
+(function () {
+    'use strict';
+
+    var MAX_HEADLINES = 30;
+    // Text of the LLM answer streamed so far, replaced by the parsed prediction
+    var draft = '';
+
+    function setText(id, text) {
+        var element = document.getElementById(id);
+        if (element) {
+            element.textContent = text;
+        }
+    }
+
+    function signed(value, digits) {
+        return (value > 0 ? '+' : '') + value.toFixed(digits);
+    }
+
+    function timeLabel(at) {
+        return 'Updated ' + new Date(at).toLocaleTimeString();
+    }
+
+    function onPrice(data) {
+        setText('livePrice', '$' + data.price.toFixed(2));
+        var change = document.getElementById('livePriceChange');
+        change.textContent = signed(data.change, 2) + ' (' + signed(data.change_percent, 2) + '%) today';
+        change.className = 'mb-0 ' + (data.change >= 0 ? 'text-success' : 'text-danger');
+        setText('livePriceTime', timeLabel(data.at) + (data.stale ? ' (last known price, quote unavailable)' : ''));
+    }
+
+    function headlineItem(article) {
+        var item = document.createElement('a');
+        var label = article.sentiment_label;
+        item.className = 'list-group-item list-group-item-action ' +
+            (label === 'Positive' ? 'list-group-item-success' : label === 'Negative' ? 'list-group-item-danger' : 'list-group-item-light');
+        item.href = article.url || '#';
+        item.target = '_blank';
+        item.rel = 'noopener';
+        var title = document.createElement('div');
+        title.className = 'fw-semibold';
+        title.textContent = article.title;
+        var meta = document.createElement('small');
+        meta.textContent = (article.source || '') + ' | ' + (article.publishedAt || '') +
+            ' | Sentiment: ' + article.sentiment.toFixed(2) + ' (' + label + ')';
+        item.appendChild(title);
+        item.appendChild(meta);
+        return item;
+    }
+
+    function onSentiment(data) {
+        setText('liveSentiment', signed(data.mean, 3));
+        var count = data.count + ' headline' + (data.count === 1 ? '' : 's');
+        if (data.delta !== null) {
+            count += ' (' + signed(data.delta, 3) + ' from ' + data.source + ')';
+        }
+        setText('liveSentimentCount', count);
+        setText('liveSentimentTime', timeLabel(data.at));
+        var list = document.getElementById('liveHeadlines');
+        data.articles.forEach(function (article) {
+            list.insertBefore(headlineItem(article), list.firstChild);
+        });
+        while (list.children.length > MAX_HEADLINES) {
+            list.removeChild(list.lastChild);
+        }
+    }
+
+    function onPredictionToken(data) {
+        draft += data.text;
+        setText('livePredictionExplanation', draft);
+        setText('livePredictionTime', 'Model is answering...');
+    }
+
+    function onPrediction(data) {
+        draft = '';
+        var prediction = document.getElementById('livePrediction');
+        if (!prediction) {
+            return;
+        }
+        var confidence = data.confidence === null ? '' : ' (' + Math.round(data.confidence * 100) + '% confidence)';
+        prediction.textContent = 'Next session: ' + data.direction.toUpperCase() + confidence;
+        prediction.className = 'lead mb-0 ' +
+            (data.direction === 'up' ? 'text-success' : data.direction === 'down' ? 'text-danger' : 'text-secondary');
+        setText('livePredictionExplanation', data.explanation);
+        setText('livePredictionTime', timeLabel(data.at) + (data.cached ? ' (cached answer)' : ''));
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var container = document.querySelector('[data-stream-url]');
+        if (!container || !window.EventSource) {
+            return;
+        }
+        var source = new EventSource(container.dataset.streamUrl);
+        source.addEventListener('ready', function (event) {
+            var data = JSON.parse(event.data);
+            setText('liveStatus', 'Streaming ' + data.ticker + ' from: ' + (data.sources.join(', ') || 'no sources'));
+        });
+        source.addEventListener('price', function (event) {
+            onPrice(JSON.parse(event.data));
+        });
+        source.addEventListener('sentiment', function (event) {
+            onSentiment(JSON.parse(event.data));
+        });
+        source.addEventListener('prediction_token', function (event) {
+            onPredictionToken(JSON.parse(event.data));
+        });
+        source.addEventListener('prediction', function (event) {
+            onPrediction(JSON.parse(event.data));
+        });
+        source.addEventListener('close', function (event) {
+            var data = JSON.parse(event.data);
+            if (data.reason !== 'time limit') {
+                source.close();
+                setText('liveStatus', 'Stream closed: ' + data.reason + '.');
+            }
+        });
+        source.onerror = function () {
+            setText('liveStatus', 'Connection lost, reconnecting...');
+        };
+    });
+})();
@@ -1,3 +1,798 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from unittest import mock
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-# Create your tests here.
+from .models import (
+    ArticleMention, ArticleSentiment, DailySentiment, LivePost, LiveSentiment, NewsArticle, NewsQuery, PriceBar,
+    PriceCoverage,
+)
+from . import views
+from .utils import (
+    api_clients, backfill, benchmark, chart_data, correlation_analyzer, data_fetchers, downsampling, ingestion,
+    instrumentation, live_stream, llm_integration, llm_predictor, ml_model, model_registry, news_store, price_cube,
+    price_store, rate_limiter, refresher, result_cache, sentiment_analyzer, sentiment_store, ticker_matcher,
+)
+
+
+class VarDirMixin:
+    """Points VAR_DIR at a temporary directory for the duration of each test."""
+
+    def setUp(self):
+        super().setUp()
+        var_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(var_dir.cleanup)
+        settings_override = override_settings(VAR_DIR=Path(var_dir.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+def make_bars(ticker, start, days, price=100.123456789):
+    """Stores `days` consecutive daily bars for ticker, starting at start."""
+    PriceBar.objects.bulk_create([
+        PriceBar(ticker=ticker, date=start + timedelta(days=i), adj_close=price + i, close=price + i)
+        for i in range(days)
+    ])
+
+
+class BenchmarkFixtureTests(SimpleTestCase):
+    def test_prices_do_not_depend_on_how_the_range_is_split(self):
+        whole = benchmark.fixture_download(['AAPL', 'MSFT'], start='2024-01-01', end='2024-03-01')
+        part = benchmark.fixture_download(['AAPL'], start='2024-02-01', end='2024-03-01')
+        self.assertEqual(list(whole.columns.get_level_values(1).unique()), ['AAPL', 'MSFT'])
+        self.assertEqual(
+            whole[('Adj Close', 'AAPL')].loc['2024-02-01':].tolist(),
+            part[('Adj Close', 'AAPL')].tolist(),
+        )
+
+    def test_news_fixture_pages_like_newsapi(self):
+        start = datetime(2024, 12, 1, tzinfo=dt_timezone.utc)
+        end = start + timedelta(days=28)
+        articles = benchmark.fixture_articles(['AAPL', 'MSFT'], 250, start, end)
+        self.assertEqual(articles, benchmark.fixture_articles(['AAPL', 'MSFT'], 250, start, end))
+        newsapi = benchmark.FixtureNewsApi(articles)
+        window = {'from_param': start.strftime('%Y-%m-%dT%H:%M:%S'), 'to': end.strftime('%Y-%m-%dT%H:%M:%S')}
+        pages = [newsapi.get_everything(page=page, page_size=100, **window) for page in (1, 2, 3)]
+        self.assertEqual(pages[0]['totalResults'], 250)
+        self.assertEqual([len(p['articles']) for p in pages], [100, 100, 50])
+        self.assertGreaterEqual(pages[0]['articles'][0]['publishedAt'], pages[2]['articles'][-1]['publishedAt'])
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_suite_times_every_stage(self):
+        scenarios = benchmark.make_scenarios([1, 2], [60], [30])
+        report = benchmark.run_suite(scenarios, repeats=1)
+        self.assertEqual(report['schema'], benchmark.SCHEMA_VERSION)
+        self.assertEqual(len(report['results']), 2)
+        for result in report['results']:
+            self.assertEqual(list(result['stages']), list(benchmark.STAGES))
+            self.assertTrue(all(timing['repeats'] == 1 for timing in result['stages'].values()))
+            self.assertEqual(result['counts']['articles_scored'], 30)
+            self.assertGreater(result['counts']['price_rows'], 0)
+            self.assertGreater(result['counts']['payload_bytes'], 0)
+        # The report is written as JSON
+        json.dumps(report)
+
+    def test_prediction_is_timed_with_trained_models(self):
+        report = benchmark.run_suite(benchmark.make_scenarios([1], [365], [30]), repeats=1)
+        self.assertEqual(report['results'][0]['counts']['predictions'], len(settings.ML_HORIZONS))
+
+    def test_compare_flags_only_real_slowdowns(self):
+        def report(fetch_ms, chart_ms):
+            return {'results': [{
+                'scenario': {'tickers': 1, 'days': 365, 'articles': 100},
+                'stages': {'fetch_prices': {'median_ms': fetch_ms}, 'build_charts': {'median_ms': chart_ms}},
+            }]}
+
+        baseline = report(100.0, 0.2)
+        self.assertEqual(benchmark.compare(report(110.0, 0.6), baseline), [])
+        regressions = benchmark.compare(report(150.0, 0.6), baseline)
+        self.assertEqual([r['stage'] for r in regressions], ['fetch_prices'])
+        self.assertEqual(regressions[0]['change'], 0.5)
+
+
+class InstrumentationTests(TestCase):
+    def test_spans_and_counters_are_recorded_per_request(self):
+        with instrumentation.trace_request() as trace:
+            with instrumentation.span('fetch_prices'):
+                instrumentation.count('yfinance_calls', 2)
+            with instrumentation.span('fetch_prices'):
+                pass
+            instrumentation.record_size('chart_payload', 512)
+        header = trace.server_timing(total=0.01)
+        self.assertRegex(header, r'fetch_prices;dur=[0-9.]+;desc="x2"')
+        self.assertIn('yfinance_calls;desc="2"', header)
+        self.assertIn('chart_payload;desc="512B"', header)
+        self.assertTrue(header.endswith('total;dur=10.0'))
+        # Outside a request only the process-wide metrics are updated
+        instrumentation.count('yfinance_calls')
+        self.assertEqual(trace.counters['yfinance_calls'], 2)
+
+    def test_middleware_sets_server_timing(self):
+        response = self.client.get('/api/metrics/timing/')
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertIn('api_timing_metrics', self.client.get('/api/metrics/timing/').json()['views'])
+        with override_settings(SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', self.client.get('/api/metrics/timing/'))
+
+
+class PriceCubeTests(VarDirMixin, TestCase):
+    def test_ticker_without_bars_is_not_covered(self):
+        start = date(2024, 1, 1)
+        make_bars('AAPL', start, 30)
+        cube = price_cube.PriceCube.load(price_cube.build(['AAPL', 'MSFT'], start, start + timedelta(days=30)))
+        self.assertTrue(cube.covers(['AAPL'], start, start + timedelta(days=30)))
+        # MSFT is in the universe but its fetch failed, so the store is read instead
+        self.assertFalse(cube.covers(['MSFT'], start, start + timedelta(days=30)))
+        self.assertFalse(cube.covers(['AAPL', 'MSFT'], start, start + timedelta(days=30)))
+        self.assertFalse(cube.covers(['AAPL'], start, start + timedelta(days=60)))
+
+    def test_frame_matches_the_price_store(self):
+        start = date(2024, 1, 1)
+        make_bars('AAPL', start, 30)
+        make_bars('MSFT', start + timedelta(days=5), 25)
+        end = start + timedelta(days=30)
+        cube = price_cube.PriceCube.load(price_cube.build(['AAPL', 'MSFT'], start, end))
+        frame = cube.frame(['AAPL', 'MSFT'], start, end)
+        stored = price_store.load_prices(['AAPL', 'MSFT'], start, end).bfill()
+        self.assertTrue((frame.dtypes == np.float64).all())
+        self.assertTrue(frame.equals(stored))
+        self.assertEqual(ml_model.data_version(frame['AAPL']), ml_model.data_version(stored['AAPL']))
+
+
+class NewsStoreTests(TestCase):
+    def articles(self, count, first_day, last_day, batch):
+        start = datetime.combine(first_day, datetime.min.time(), tzinfo=dt_timezone.utc)
+        end = datetime.combine(last_day, datetime.min.time(), tzinfo=dt_timezone.utc) + timedelta(hours=23)
+        articles = benchmark.fixture_articles(['AAPL'], count, start, end)
+        for article in articles:
+            article['url'] += f"/{batch}"
+        return articles
+
+    def test_truncated_forward_gap_is_fetched_next_refresh(self):
+        older = self.articles(50, date(2024, 1, 1), date(2024, 1, 5), 'older')
+        newsapi = benchmark.FixtureNewsApi(older)
+        news_store.refresh_query(newsapi, ['AAPL'], date(2024, 1, 1), date(2024, 1, 5))
+        high_water = NewsQuery.objects.get(query='AAPL').newest_published_at
+
+        # More new articles than one fetch returns: only the newest MAX_FETCH arrive
+        newsapi.articles = self.articles(700, date(2024, 1, 6), date(2024, 1, 10), 'newer') + older
+        news_store.refresh_query(newsapi, ['AAPL'], date(2024, 1, 1), date(2024, 1, 10))
+        news_query = NewsQuery.objects.get(query='AAPL')
+        self.assertEqual(NewsArticle.objects.count(), 50 + news_store.MAX_FETCH)
+        self.assertEqual(news_query.pending_from, high_water)
+        self.assertGreater(news_query.pending_to, high_water)
+
+        news_store.refresh_query(newsapi, ['AAPL'], date(2024, 1, 1), date(2024, 1, 10))
+        news_query.refresh_from_db()
+        self.assertEqual(NewsArticle.objects.count(), 750)
+        self.assertIsNone(news_query.pending_from)
+        self.assertEqual(len(news_store.load_articles(['AAPL'], date(2024, 1, 1), date(2024, 1, 10))), 750)
+
+    def stream(self, articles, max_fetch):
+        newsapi = benchmark.FixtureNewsApi(articles)
+        get_everything = newsapi.get_everything
+
+        def early_pages_last(page=1, **kwargs):
+            # Prefetched pages complete in reverse order
+            time.sleep(0.02 * max(6 - page, 0))
+            return get_everything(page=page, **kwargs)
+
+        newsapi.get_everything = early_pages_last
+        start, end = news_store._window(date(2024, 1, 1), date(2024, 1, 10))
+        return news_store.PageStream(newsapi, 'AAPL', start, end, max_fetch=max_fetch)
+
+    def test_pages_are_yielded_in_order(self):
+        articles = self.articles(450, date(2024, 1, 1), date(2024, 1, 10), 'all')
+        stream = self.stream(articles, max_fetch=1000)
+        pages = list(stream)
+        self.assertEqual([len(page) for page in pages], [100, 100, 100, 100, 50])
+        self.assertEqual([a['url'] for page in pages for a in page], [a['url'] for a in articles])
+        self.assertEqual(stream.status, 'complete')
+
+    def test_stream_stops_at_max_fetch(self):
+        articles = self.articles(450, date(2024, 1, 1), date(2024, 1, 10), 'all')
+        stream = self.stream(articles, max_fetch=250)
+        pages = list(stream)
+        self.assertEqual([len(page) for page in pages], [100, 100, 50])
+        self.assertEqual([a['url'] for page in pages for a in page], [a['url'] for a in articles[:250]])
+        self.assertEqual((stream.status, stream.fetched), ('truncated', 250))
+
+
+class PriceStoreTests(TestCase):
+    def setUp(self):
+        self.downloads = []
+        self.adjustment = 1.0
+        patcher = mock.patch.object(price_store.yf, 'download', self.download)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def download(self, tickers, start=None, end=None, **kwargs):
+        self.downloads.append((start, end))
+        data = benchmark.fixture_download(tickers, start=start, end=end)
+        data['Adj Close'] = data['Adj Close'] * self.adjustment
+        return data
+
+    def test_only_missing_ranges_are_downloaded_and_coverage_merges(self):
+        price_store.get_prices(['AAPL'], '2024-01-01', '2024-03-01')
+        price_store.get_prices(['AAPL'], '2024-02-01', '2024-04-01')
+        price_store.get_prices(['AAPL'], '2024-01-15', '2024-03-15')
+        # The second download starts at the last stored bar, to check it was not revised
+        self.assertEqual(self.downloads, [('2024-01-01', '2024-03-01'), ('2024-02-29', '2024-04-01')])
+        coverage = PriceCoverage.objects.get(ticker='AAPL')
+        self.assertEqual((coverage.start_date, coverage.end_date), (date(2024, 1, 1), date(2024, 4, 1)))
+        stored = price_store.load_prices(['AAPL'], '2024-01-01', '2024-04-01')['AAPL']
+        expected = self.download(['AAPL'], '2024-01-01', '2024-04-01')[('Adj Close', 'AAPL')]
+        self.assertEqual(stored.tolist(), expected.tolist())
+
+    def test_revised_history_is_downloaded_again(self):
+        price_store.get_prices(['AAPL'], '2024-01-01', '2024-03-01')
+        # A dividend re-adjusts every earlier bar
+        self.adjustment = 0.99
+        prices = price_store.get_prices(['AAPL'], '2024-01-01', '2024-04-01')['AAPL']
+        self.assertEqual(self.downloads[-1], ('2024-01-01', '2024-04-01'))
+        expected = self.download(['AAPL'], '2024-01-01', '2024-04-01')[('Adj Close', 'AAPL')]
+        self.assertEqual(prices.tolist(), expected.tolist())
+        self.assertEqual(PriceCoverage.objects.filter(ticker='AAPL').count(), 1)
+
+    def test_past_actions_in_a_gap_do_not_trigger_a_refetch(self):
+        price_store.get_prices(['AAPL'], '2024-01-01', '2024-03-01')
+        download = self.download
+
+        def with_dividend(tickers, start=None, end=None, **kwargs):
+            data = download(tickers, start=start, end=end)
+            data[('Dividends', 'AAPL')] = 0.0
+            data.loc[data.index[len(data) // 2], ('Dividends', 'AAPL')] = 0.25
+            return data
+
+        with mock.patch.object(price_store.yf, 'download', with_dividend):
+            price_store.get_prices(['AAPL'], '2024-01-01', '2024-06-01')
+        self.assertEqual(self.downloads, [('2024-01-01', '2024-03-01'), ('2024-02-29', '2024-06-01')])
+
+
+class DataFetcherTests(SimpleTestCase):
+    @override_settings(FETCH_TIMEOUTS={'prices': 5, 'news': 0.1})
+    def test_a_timed_out_source_is_returned_as_missing(self):
+        prices = pd.DataFrame({'AAPL': [190.0]}, index=pd.to_datetime(['2024-01-02']))
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow_news(*args):
+            release.wait(5)
+            return [raw_article("Apple shares soar", '2024-01-02T15:00:00Z')]
+
+        with mock.patch.object(data_fetchers, 'get_historical_stock_data_by_date', return_value=prices), \
+                mock.patch.object(data_fetchers, 'get_news_headlines_by_date', side_effect=slow_news):
+            stock_data, news = data_fetchers.fetch_historic_inputs(['AAPL'], date(2024, 1, 1), date(2024, 1, 3), 7)
+        self.assertIs(stock_data, prices)
+        self.assertEqual(news, [])
+
+
+@override_settings(ALPHA_VANTAGE_API_KEY='test-key', CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-api-clients'},
+    'results': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-api-results'},
+})
+class ApiClientTests(TestCase):
+    def setUp(self):
+        api_clients.reset()
+        self.addCleanup(api_clients.reset)
+
+    def test_one_session_is_shared_across_threads(self):
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(api_clients.get_session('newsapi'))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(session) for session in sessions}), 1)
+        self.assertIs(sessions[0], api_clients.get_session('newsapi'))
+        self.assertIsNot(sessions[0], api_clients.get_session('alpha_vantage'))
+
+    def test_quotes_are_reused_for_the_cache_period(self):
+        quote = {'price': 190.0, 'change': 1.0, 'change_percent': 0.5, 'volume': 100, 'latest_trading_day': '2024-01-02'}
+        with mock.patch.object(data_fetchers, '_fetch_alpha_vantage_quote', return_value=quote) as fetch:
+            first = data_fetchers.get_alpha_vantage_quote('AAPL')
+            second = data_fetchers.get_alpha_vantage_quote('AAPL')
+        fetch.assert_called_once_with('AAPL')
+        self.assertEqual(first, dict(quote, stale=False))
+        self.assertEqual(second, first)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'results': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-results'},
+})
+class ResultCacheTests(SimpleTestCase):
+    def test_results_expire_when_the_next_close_has_settled(self):
+        new_york = ZoneInfo('America/New_York')
+        # Monday morning: valid until 16:30 the same day
+        monday = datetime(2024, 3, 4, 10, 0, tzinfo=new_york)
+        self.assertEqual(result_cache.seconds_until_refresh(monday), int(6.5 * 3600))
+        # Friday evening: valid over the weekend until Monday 16:30
+        friday = datetime(2024, 3, 1, 17, 0, tzinfo=new_york)
+        self.assertEqual(result_cache.seconds_until_refresh(friday), 71 * 3600 + 30 * 60)
+        # Clocks go forward on Sunday 10 March, so that weekend is an hour shorter
+        friday = datetime(2024, 3, 8, 17, 0, tzinfo=new_york)
+        self.assertEqual(result_cache.seconds_until_refresh(friday), 70 * 3600 + 30 * 60)
+
+    def test_equivalent_requests_share_a_key(self):
+        self.assertEqual(
+            result_cache.make_key('historic', ['MSFT', 'AAPL'], date(2024, 1, 1), '2024-02-01', lookback=28),
+            result_cache.make_key('historic', ['AAPL', 'MSFT', 'AAPL'], '2024-01-01', date(2024, 2, 1), lookback=28),
+        )
+
+    def test_charts_of_a_partial_result_are_served_from_the_cache(self):
+        partial = {
+            'price_chart': {'dates': ['2024-01-02'], 'series': [{'name': 'AAPL', 'values': [1.0]}]},
+            'sentiment_chart': None,
+            'news_articles': [],
+            'predictions': [],
+            'models_training': [],
+            'error': "Could not process sentiment data for the selected range. ",
+        }
+        query = {'stocks': ['AAPL'], 'start_date': '2024-01-01', 'end_date': '2024-02-01'}
+        with mock.patch.object(views, '_analyze_historic', return_value=partial) as analyze:
+            self.client.get('/historic/', query)
+            self.assertEqual(self.client.get('/api/historic/prices/', query).json(), partial['price_chart'])
+            self.assertEqual(self.client.get('/api/historic/prices/', query).status_code, 200)
+            self.assertEqual(analyze.call_count, 1)
+            # A chart the partial result lacks reruns the analysis, which is not cached
+            self.assertEqual(self.client.get('/api/historic/sentiment/', query).status_code, 404)
+            self.client.get('/historic/', query)
+            self.assertEqual(analyze.call_count, 3)
+
+
+class BackfillTests(VarDirMixin, SimpleTestCase):
+    def run_backfill(self, fail_before=None):
+        """Runs a two-chunk price backfill; chunks starting before `fail_before` raise."""
+        chunks = []
+
+        def ensure_coverage(tickers, start, end):
+            chunks.append(start)
+            if fail_before and start < fail_before:
+                raise ConnectionError("download failed")
+            return 10
+
+        with mock.patch.object(backfill.price_store, 'missing_ranges', return_value=[None]), \
+                mock.patch.object(backfill.price_store, 'ensure_coverage', side_effect=ensure_coverage):
+            stats = backfill.run_backfill(['AAPL', 'MSFT'], date(2022, 1, 1), date(2023, 12, 31), job='test', workers=2)
+        return stats, chunks
+
+    def test_an_interrupted_backfill_resumes_from_its_checkpoint(self):
+        with self.assertLogs(backfill.logger, 'ERROR'):
+            stats, chunks = self.run_backfill(fail_before=date(2022, 12, 1))
+        self.assertEqual((stats['chunks'], stats['done'], stats['failed']), (2, 1, 1))
+        self.assertEqual(stats['prices']['rows'], 10)
+
+        # Only the failed chunk runs again
+        stats, chunks = self.run_backfill()
+        self.assertEqual((stats['skipped'], stats['done'], stats['failed']), (1, 1, 0))
+        self.assertEqual(chunks, [date(2022, 1, 1)])
+        self.assertEqual(len(backfill.Checkpoint('test').done), 2)
+
+
+class FakeClock:
+    """Stands in for the time module in rate_limiter; sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(rate_limiter, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bucket_refills_at_its_rate(self):
+        bucket = rate_limiter.TokenBucket('test', rate=2, capacity=3)
+        for _ in range(3):
+            bucket.acquire(max_wait=0)
+        self.assertEqual(bucket.available(), 0)
+        with self.assertRaises(rate_limiter.RateLimitExceeded):
+            bucket.acquire(max_wait=0.1)
+        # The next token arrives after 1 / rate seconds
+        bucket.acquire(max_wait=1)
+        self.assertEqual(self.clock.slept, [0.5])
+        self.clock.now += 10
+        self.assertEqual(bucket.available(), 3)
+
+    def test_ledger_refuses_calls_past_the_limit(self):
+        ledger = rate_limiter.QuotaLedger('test', daily_limit=2)
+        ledger.consume()
+        ledger.consume()
+        with self.assertRaises(rate_limiter.QuotaExhausted):
+            ledger.consume()
+        self.assertEqual((ledger.status()['used'], ledger.has_quota()), (2, False))
+
+        unlimited = rate_limiter.QuotaLedger('other', daily_limit=None)
+        unlimited.consume()
+        unlimited.mark_exhausted()
+        with self.assertRaises(rate_limiter.QuotaExhausted):
+            unlimited.consume()
+        self.assertEqual(unlimited.status()['used'], 1)
+
+    def test_concurrent_callers_share_one_call(self):
+        flight = rate_limiter.SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {'price': 190.0}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('quote', fetch))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while flight.coalesced < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'price': 190.0}] * 4)
+        self.assertIs(results[0], results[3])
+        # Nothing is cached once the call has finished
+        flight.do('quote', fetch)
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(ML_HORIZONS=(1,))
+class ModelRegistryTests(VarDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        days = pd.bdate_range(end=date.today() - timedelta(days=1), periods=200)
+        prices = 100 * np.exp(np.cumsum(np.random.default_rng(7).normal(0, 0.02, len(days))))
+        PriceBar.objects.bulk_create([
+            PriceBar(ticker='AAPL', date=day.date(), adj_close=price, close=price) for day, price in zip(days, prices)
+        ])
+        self.series = price_store.load_prices(['AAPL'], days[0].date(), date.today())['AAPL']
+
+    def test_models_are_trained_once_per_bar_and_shared_across_ranges(self):
+        self.assertEqual(refresher.refresh_models(['AAPL']), 1)
+        self.assertEqual(refresher.refresh_models(['AAPL']), 0)
+        registry = model_registry.ModelRegistry()
+        with mock.patch.object(ml_model, 'train_model') as train:
+            for bars in (100, 150):
+                predictions = registry.predict(self.series.iloc[-bars:].to_frame(), pd.DataFrame(), (1,))
+                self.assertEqual([p['as_of'] for p in predictions], [self.series.index[-1].date()])
+        train.assert_not_called()
+        self.assertEqual((registry.loads, registry.hits), (1, 1))
+
+    def test_past_ranges_are_not_predicted_by_later_models(self):
+        refresher.refresh_models(['AAPL'])
+        registry = model_registry.ModelRegistry()
+        with mock.patch.object(model_registry._training_executor, 'submit') as submit:
+            self.assertEqual(registry.predict(self.series.iloc[:-1].to_frame(), pd.DataFrame(), (1,)), [])
+        submit.assert_not_called()
+
+    def test_latest_feature_row_matches_the_full_matrix(self):
+        dates, features = ml_model.build_features(self.series)
+        as_of, latest = ml_model.latest_features(self.series)
+        self.assertEqual(as_of, dates[-1])
+        np.testing.assert_array_equal(latest, features[-1:])
+
+    def test_missing_model_is_trained_in_the_background(self):
+        registry = model_registry.ModelRegistry()
+        with mock.patch.object(model_registry._training_executor, 'submit') as submit:
+            for _ in range(2):
+                self.assertEqual(registry.predict(self.series.to_frame(), pd.DataFrame(), (1,)), [])
+        submit.assert_called_once_with(registry._train, 'AAPL', (1,))
+        self.assertEqual(registry.training(['AAPL', 'MSFT']), ['AAPL'])
+
+
+class DownsamplingTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = np.arange(1000, dtype=float)
+        self.y = np.cumsum(rng.normal(size=1000))
+
+    def test_point_budget_is_respected_and_extremes_kept(self):
+        for method in downsampling.METHODS:
+            kept = downsampling.downsample_indices(self.x, self.y, 100, method=method)
+            self.assertLessEqual(len(kept), 102)
+            self.assertEqual((kept[0], kept[-1]), (0, 999))
+            self.assertTrue((np.diff(kept) > 0).all())
+        kept = downsampling.downsample_indices(self.x, self.y, 100, method='minmax')
+        self.assertIn(int(self.y.argmax()), kept)
+        self.assertIn(int(self.y.argmin()), kept)
+
+    def test_tiny_budgets_do_not_return_full_resolution(self):
+        for method in downsampling.METHODS:
+            self.assertEqual(downsampling.downsample_indices(self.x, self.y, 1, method=method).tolist(), [0, 999])
+        self.assertEqual(downsampling.downsample_indices(self.x, self.y, 2, method='lttb').tolist(), [0, 999])
+        # One min/max bucket, plus the endpoints
+        self.assertEqual(len(downsampling.downsample_indices(self.x, self.y, 2, method='minmax')), 4)
+
+    def test_gaps_are_never_selected(self):
+        y = self.y.copy()
+        y[::3] = np.nan
+        kept = downsampling.downsample_indices(self.x, y, 50)
+        self.assertFalse(np.isnan(y[kept]).any())
+
+    def test_payload_series_get_their_own_dates(self):
+        dates = [str(date(2020, 1, 1) + timedelta(days=i)) for i in range(1000)]
+        payload = {'dates': dates, 'series': [{'name': 'AAPL', 'values': self.y.tolist()}]}
+        reduced = chart_data.downsample_payload(payload, 2)
+        self.assertEqual(reduced['series'][0]['dates'], [dates[0], dates[-1]])
+        self.assertIs(chart_data.downsample_payload(payload, 0), payload)
+
+
+class CorrelationAnalyzerTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = pd.Series(rng.normal(size=120)).cumsum()
+        self.y = pd.Series(rng.normal(size=120))
+        # Gaps in either series drop the pair from the windows that contain it
+        self.x[[10, 40, 41]] = np.nan
+        self.y[[70]] = np.nan
+
+    def test_rolling_pearson_matches_pandas(self):
+        result = correlation_analyzer.rolling_pearson(self.x, self.y, 20)[:, 0]
+        expected = self.x.rolling(20, min_periods=10).corr(self.y).to_numpy()
+        self.assertTrue(np.isnan(result[:19]).all())
+        np.testing.assert_allclose(result[19:], expected[19:], rtol=0, atol=1e-12)
+
+    def test_rolling_spearman_matches_pandas(self):
+        result = correlation_analyzer.rolling_spearman(self.x, self.y, 20)[:, 0]
+        expected = [self.x[i - 19:i + 1].corr(self.y[i - 19:i + 1], method='spearman') for i in range(19, 120)]
+        self.assertTrue(np.isnan(result[:19]).all())
+        np.testing.assert_allclose(result[19:], expected, rtol=0, atol=1e-12)
+
+
+class TickerMatcherTests(SimpleTestCase):
+    def test_headlines_are_attributed_to_the_tickers_they_name(self):
+        texts = [
+            "Apple and Microsoft rally on AI demand",
+            "$TSLA jumps after deliveries",
+            "Markets drift ahead of the Fed",
+            "AAPLX and pineapple futures",
+            None,
+        ]
+        self.assertEqual(
+            ticker_matcher.attribute(texts, ['MSFT', 'AAPL', 'TSLA']),
+            [['AAPL', 'MSFT'], ['TSLA'], [], [], []],
+        )
+
+    def test_single_ticker_queries_need_no_match(self):
+        self.assertEqual(ticker_matcher.attribute(["Markets drift", None], ['AAPL']), [['AAPL'], ['AAPL']])
+
+
+def raw_article(title, published_at):
+    return {
+        'source': {'name': 'Wire'},
+        'title': title,
+        'description': '',
+        'url': f"https://example.invalid/{title.replace(' ', '-')}",
+        'publishedAt': published_at,
+    }
+
+
+class SentimentAnalyzerTests(SimpleTestCase):
+    def setUp(self):
+        sentiment_analyzer.score_cache.clear()
+        self.addCleanup(sentiment_analyzer.score_cache.clear)
+
+    def test_each_distinct_text_is_scored_once(self):
+        texts = ['Apple shares soar', 'Apple shares soar', None, 'Apple shares slump']
+        with mock.patch.object(sentiment_analyzer, '_score_serial', wraps=sentiment_analyzer._score_serial) as score:
+            first = sentiment_analyzer.score_texts(texts)
+            second = sentiment_analyzer.score_texts(texts[:2])
+        # Duplicates in a batch are scored once; the second batch comes from the cache
+        scored = [text for call in score.call_args_list for text in call.args[0]]
+        self.assertEqual(scored, ['Apple shares soar', 'Apple shares slump'])
+        self.assertEqual(first['compound'].iloc[0], first['compound'].iloc[1])
+        self.assertTrue(np.isnan(first['compound'].iloc[2]))
+        self.assertEqual(second['compound'].tolist(), first['compound'].iloc[:2].tolist())
+
+    def test_cache_evicts_the_least_recently_used_scores(self):
+        cache = sentiment_analyzer.ScoreCache(maxsize=2)
+        cache.put_many({'a': (0, 1, 0, 0.0), 'b': (0, 1, 0, 0.1)})
+        cache.get_many(['a'])
+        cache.put_many({'c': (0, 1, 0, 0.2)})
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(set(cache.get_many(['a', 'b', 'c'])), {'a', 'c'})
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_parallel_scoring_matches_serial(self):
+        texts = [f"Apple shares {word} after earnings {i}" for i, word in enumerate(['soar', 'slump', 'hold'] * 5)]
+        texts.append(None)
+        serial = sentiment_analyzer._score_serial(texts[:-1])
+        self.assertEqual(sentiment_analyzer._score_parallel(texts[:-1], workers=2, chunk_size=4), serial)
+        with mock.patch.object(sentiment_analyzer, '_score_serial') as score_serial:
+            scores = sentiment_analyzer.score_texts(texts, workers=2, chunk_size=4)
+        score_serial.assert_not_called()
+        self.assertEqual([tuple(row) for row in scores.iloc[:-1].to_numpy()], serial)
+        self.assertTrue(scores.iloc[-1].isna().all())
+
+
+class SentimentStoreTests(TestCase):
+    def setUp(self):
+        news_query = NewsQuery.objects.create(query='AAPL OR MSFT')
+        news_store.save_articles([
+            raw_article("Apple shares soar to a record", '2024-01-02T15:00:00Z'),
+            raw_article("Markets slump after a terrible week", '2024-01-02T16:00:00Z'),
+        ], news_query)
+        self.scores = dict(ArticleSentiment.objects.values_list('article__title', 'compound'))
+
+    def test_only_named_tickers_get_mentions(self):
+        self.assertEqual(list(ArticleMention.objects.values_list('ticker', 'article__title')),
+                         [('AAPL', "Apple shares soar to a record")])
+        bucket = DailySentiment.objects.get()
+        self.assertEqual((bucket.ticker, bucket.article_count), ('AAPL', 1))
+        ticker_sentiment = sentiment_store.load_daily_sentiment(['AAPL', 'MSFT'], date(2024, 1, 1), date(2024, 1, 3))
+        self.assertEqual(list(ticker_sentiment.columns), ['AAPL'])
+
+    def test_unmatched_articles_are_blended_when_read(self):
+        day = date(2024, 1, 2)
+        blended = sentiment_store.load_sentiment_series(['AAPL', 'MSFT'], day, day)
+        self.assertAlmostEqual(blended.iloc[0], sum(self.scores.values()) / 2)
+        # A series for AAPL alone doesn't take in what the combined query returned
+        alone = sentiment_store.load_sentiment_series(['AAPL'], day, day)
+        self.assertAlmostEqual(alone.iloc[0], self.scores["Apple shares soar to a record"])
+
+    def test_mentions_are_folded_once(self):
+        mentions = list(ArticleMention.objects.values_list('article_id', 'ticker', 'published_at'))
+        self.assertTrue(ArticleMention.objects.get().folded)
+        # A retry, or another process folding the same mentions, adds nothing
+        self.assertEqual(sentiment_store.fold_mentions(mentions), 0)
+        ArticleMention.objects.update(folded=False)
+        self.assertEqual(sentiment_store.fold_mentions(mentions + mentions), 1)
+        bucket = DailySentiment.objects.get()
+        self.assertEqual(bucket.article_count, 2)
+        self.assertAlmostEqual(bucket.score_sum, 2 * self.scores["Apple shares soar to a record"])
+
+    def test_fold_cost_does_not_grow_with_the_mentions(self):
+        news_store.save_articles([
+            raw_article(f"Apple shares rise for day {i}", '2024-01-02T15:30:00Z') for i in range(30)
+        ], NewsQuery.objects.get())
+        ArticleMention.objects.update(folded=False)
+        mentions = list(ArticleMention.objects.values_list('article_id', 'ticker', 'published_at'))
+        queries = []
+        for batch in (mentions[:5], mentions[5:]):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(sentiment_store.fold_mentions(batch), len(batch))
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+
+    def test_ingesting_again_does_not_count_twice(self):
+        ids = list(NewsArticle.objects.values_list('pk', flat=True))
+        sentiment_store.ingest_articles(ids, ['AAPL', 'MSFT'])
+        self.assertEqual(DailySentiment.objects.get().article_count, 1)
+
+
+class IngestionTests(VarDirMixin, TransactionTestCase):
+    def run_pipeline(self, posts):
+        pipeline = ingestion.IngestionPipeline({}, ['AAPL'])
+        pipeline.start()
+        pipeline.feed('rss', posts)
+        pipeline.stop()
+        return {stage['stage']: stage for stage in pipeline.report()}
+
+    def test_posts_are_counted_once_across_restarts(self):
+        posts = [
+            ('AAPL', raw_article(f"Apple shares soar to a record {i}", '2024-01-02T15:00:30Z'))
+            for i in range(5)
+        ]
+        report = self.run_pipeline(posts + posts[:2])
+        self.assertEqual(report['dedup']['dropped'], 2)
+        self.assertEqual(report['aggregate']['emitted'], 5)
+        window = LiveSentiment.objects.get()
+        self.assertEqual((window.window_start.minute, window.window_start.second, window.article_count), (0, 0, 5))
+
+        # A restarted pipeline has forgotten the posts in memory, but not in the database
+        report = self.run_pipeline(posts)
+        self.assertEqual(report['aggregate']['dropped'], 5)
+        self.assertEqual(LiveSentiment.objects.get().article_count, 5)
+        self.assertEqual(LivePost.objects.count(), 5)
+        self.assertEqual(LivePost.objects.filter(title__startswith='Apple shares soar').count(), 5)
+
+    async def test_live_streams_read_the_running_pipeline(self):
+        posts = [('AAPL', raw_article(f"Apple shares soar to a record {i}", timezone.now().isoformat())) for i in range(3)]
+        await asyncio.to_thread(self.run_pipeline, posts)
+        ingestion.write_heartbeat(['rss'], ['AAPL'])
+        self.assertEqual(ingestion.ingested_sources('AAPL'), ['rss'])
+        self.assertEqual(ingestion.ingested_sources('MSFT'), [])
+
+        rss = mock.Mock(return_value=[])
+        with mock.patch.object(live_stream, 'available_sources', return_value={'rss': rss}):
+            stream = live_stream.stream_updates('AAPL', max_seconds=5)
+            events = [await anext(stream), await anext(stream)]
+            await stream.aclose()
+        ready, sentiment = (json.loads(event.split('data: ', 1)[1]) for event in events)
+        self.assertEqual(ready['sources'], ['ingested'])
+        self.assertEqual(len(sentiment['articles']), 3)
+        self.assertEqual(sentiment['count'], 3)
+        rss.assert_not_called()
+
+
+class LiveStreamTests(SimpleTestCase):
+    @override_settings(LIVE_POLL_INTERVALS={'quote': 0.01, 'llm': 300})
+    async def test_llm_is_called_at_most_once_per_interval(self):
+        prices = iter(range(100, 200))
+        quote = mock.Mock(side_effect=lambda ticker: {'price': float(next(prices)), 'change_percent': 0.1})
+        predict = mock.Mock(return_value={'ticker': 'AAPL', 'direction': 'up', 'confidence': 0.6})
+        with mock.patch.object(live_stream, 'available_sources', return_value={'quote': quote, 'llm': predict}), \
+                mock.patch.object(ingestion, 'ingested_sources', return_value=[]):
+            stream = live_stream.stream_updates('AAPL', max_seconds=5)
+            events = []
+            async for event in stream:
+                events.append(event.split('\n', 1)[0])
+                if events.count('event: price') >= 10 and 'event: prediction' in events:
+                    break
+            await stream.aclose()
+        self.assertEqual(predict.call_count, 1)
+        self.assertEqual(events.count('event: prediction'), 1)
+
+
+class LiveViewTests(TestCase):
+    def test_stream_is_refused_under_wsgi(self):
+        response = self.client.get('/api/live/stream/', {'stock': 'AAPL'})
+        self.assertEqual(response.status_code, 503)
+        page = self.client.get('/live/', {'stock': 'AAPL'})
+        self.assertIsNone(page.context['stream_url'])
+        self.assertEqual(page.context['error'], views.ASGI_REQUIRED)
+
+    async def test_page_streams_under_asgi(self):
+        page = await self.async_client.get('/live/', {'stock': 'AAPL'})
+        self.assertEqual(page.context['stream_url'], '/api/live/stream/?stock=AAPL')
+        self.assertIsNone(page.context['error'])
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'results': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-llm'},
+})
+class LlmPredictorTests(SimpleTestCase):
+    def test_answers_are_cached_per_snapshot_bucket(self):
+        answer = '{"ticker": "AAPL", "direction": "up", "confidence": 0.7, "explanation": "Strong demand."}'
+        snapshot = {'ticker': 'AAPL', 'price': 190.0, 'change_percent': 1.02, 'sentiment': 0.31}
+        with mock.patch.object(llm_integration, 'chat', return_value=answer) as chat:
+            first = llm_predictor.predict(snapshot)
+            # A small move lands in the same bucket
+            second = llm_predictor.predict(dict(snapshot, change_percent=1.1))
+        self.assertEqual(chat.call_count, 1)
+        self.assertEqual((first['direction'], first['confidence'], first['cached']), ('up', 0.7, False))
+        self.assertTrue(second['cached'])
+
+    @override_settings(OPENROUTER_API_KEY='test-key')
+    def test_answer_is_streamed_to_the_caller(self):
+        lines = [
+            ': OPENROUTER PROCESSING', '',
+            'data: {"choices": [{"delta": {"content": "{\\"direction\\": \\"down\\", "}}]}', '',
+            'data: {"choices": [{"delta": {"content": "\\"confidence\\": 0.6}"}}]}', '',
+            'data: [DONE]', '',
+        ]
+        response = mock.MagicMock()
+        response.__enter__.return_value = response
+        response.iter_lines.return_value = lines
+        session = mock.Mock(post=mock.Mock(return_value=response))
+        tokens = []
+        with mock.patch.object(llm_integration.api_clients, 'get_session', return_value=session):
+            prediction = llm_predictor._request({'ticker': 'AAPL'}, tokens.append)
+        self.assertEqual(tokens, ['{"direction": "down", ', '"confidence": 0.6}'])
+        self.assertEqual((prediction['direction'], prediction['confidence']), ('down', 0.6))
+        self.assertTrue(session.post.call_args.kwargs['json']['stream'])
@@ -6,4 +6,13 @@ urlpatterns = [
     path('historic/', views.historic, name='historic'),
     path('live/', views.live, name='live'),
     path('correlation/', views.correlation_view, name='correlation'),
+    path('api/historic/prices/', views.historic_prices_api, name='api_historic_prices'),
+    path('api/historic/sentiment/', views.historic_sentiment_api, name='api_historic_sentiment'),
+    path('api/correlation/lags/', views.correlation_lags_api, name='api_correlation_lags'),
+    path('api/correlation/rolling/', views.correlation_rolling_api, name='api_correlation_rolling'),
+    path('api/live/stream/', views.live_stream_api, name='api_live_stream'),
+    path('api/metrics/models/', views.model_metrics_api, name='api_model_metrics'),
+    path('api/metrics/quotas/', views.quota_metrics_api, name='api_quota_metrics'),
+    path('api/metrics/price-cube/', views.price_cube_metrics_api, name='api_price_cube_metrics'),
+    path('api/metrics/timing/', views.timing_metrics_api, name='api_timing_metrics'),
 ]
@@ -0,0 +1,210 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from newsapi import NewsApiClient
+from django.conf import settings
+import logging
+
+from .rate_limiter import QuotaExhausted, QuotaLedger, RateLimitExceeded, TokenBucket  # noqa: F401 (re-exported)
+
+logger = logging.getLogger(__name__)
+
+# Per-provider connection settings. 'rate_limit' is (calls, period in seconds)
+# shared by every thread in the process; override it with settings.API_RATE_LIMITS.
+# 'daily_quota' is the provider's calls per UTC day, shared by every process
+# (None for no quota); override it with settings.API_DAILY_QUOTAS.
+PROVIDERS = {
+    'newsapi': {
+        'base_url': 'https://newsapi.org/v2/',
+        'rate_limit': (30, 60),
+        'daily_quota': 100,  # developer plan
+        'pool_size': 10,
+    },
+    'alpha_vantage': {
+        'base_url': 'https://www.alphavantage.co/query',
+        'rate_limit': (5, 60),  # free tier
+        'daily_quota': 25,  # free tier
+        'pool_size': 4,
+    },
+    'reddit': {
+        'base_url': 'https://oauth.reddit.com/',
+        'rate_limit': (60, 60),
+        'daily_quota': None,
+        'pool_size': 4,
+    },
+    'google_news': {
+        'base_url': 'https://news.google.com/rss/search',
+        'rate_limit': (30, 60),
+        'daily_quota': None,
+        'pool_size': 4,
+    },
+    'openrouter': {
+        'base_url': 'https://openrouter.ai/api/v1/',
+        'rate_limit': (20, 60),
+        'daily_quota': None,
+        'pool_size': 4,
+    },
+}
+
+# Retry transient failures with exponential backoff (0.5s, 1s, 2s), honouring Retry-After.
+# 429 is not retried: it reaches BudgetedAdapter at once, which marks the quota
+# exhausted, and callers fall back to stored or cached data instead of waiting.
+RETRY_POLICY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(500, 502, 503, 504),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+# Longest a caller waits for rate-limit budget before giving up
+MAX_BUDGET_WAIT = 10
+
+class BudgetedAdapter(HTTPAdapter):
+    """HTTPAdapter that charges every outgoing request to a provider's token bucket and daily quota.
+
+    A 429 response marks the day's quota as exhausted, so later calls are refused
+    up front instead of being retried against the provider.
+    """
+
+    def __init__(self, budget, ledger, **kwargs):
+        self.budget = budget
+        self.ledger = ledger
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.budget.acquire(MAX_BUDGET_WAIT)
+        self.ledger.consume()
+        response = super().send(request, **kwargs)
+        if response.status_code == 429 and self.ledger.daily_limit is not None:
+            self.ledger.mark_exhausted()
+        return response
+
+_lock = threading.Lock()
+_sessions = {}
+_budgets = {}
+_ledgers = {}
+_clients = {}
+
+def provider_config(provider):
+    """Returns the connection settings for a provider, with settings overrides applied."""
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown API provider: {provider}")
+    config = dict(PROVIDERS[provider])
+    overrides = getattr(settings, 'API_RATE_LIMITS', {})
+    if provider in overrides:
+        config['rate_limit'] = overrides[provider]
+    quotas = getattr(settings, 'API_DAILY_QUOTAS', {})
+    if provider in quotas:
+        config['daily_quota'] = quotas[provider]
+    return config
+
+def get_budget(provider):
+    """Returns the process-wide TokenBucket for a provider.
+
+    The bucket holds the provider's full per-period allowance, so short bursts
+    go out immediately and sustained traffic is paced to the average rate.
+    """
+    with _lock:
+        if provider not in _budgets:
+            calls, period = provider_config(provider)['rate_limit']
+            _budgets[provider] = TokenBucket(provider, calls / period, calls)
+        return _budgets[provider]
+
+def get_ledger(provider):
+    """Returns the QuotaLedger tracking a provider's daily quota."""
+    with _lock:
+        if provider not in _ledgers:
+            _ledgers[provider] = QuotaLedger(provider, provider_config(provider)['daily_quota'])
+        return _ledgers[provider]
+
+def has_quota(provider):
+    """Returns False once a provider's daily quota is used up; callers should then serve stored data."""
+    try:
+        return get_ledger(provider).has_quota()
+    except Exception as e:
+        logger.error(f"Error reading the {provider} quota ledger: {e}", exc_info=True)
+        return True
+
+def quota_status():
+    """Returns today's usage for every provider (see QuotaLedger.status)."""
+    return [get_ledger(provider).status() for provider in PROVIDERS]
+
+def get_session(provider):
+    """Returns the shared keep-alive requests.Session for a provider.
+
+    The session's connection pool, retry policy and rate-limit budget are shared
+    by every caller in the process, so TLS connections are reused across requests
+    and threads. Requests beyond the daily quota raise QuotaExhausted.
+    """
+    budget = get_budget(provider)
+    ledger = get_ledger(provider)
+    with _lock:
+        if provider not in _sessions:
+            config = provider_config(provider)
+            adapter = BudgetedAdapter(
+                budget,
+                ledger,
+                pool_connections=2,
+                pool_maxsize=config['pool_size'],
+                max_retries=RETRY_POLICY,
+            )
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[provider] = session
+        return _sessions[provider]
+
+def get_newsapi_client():
+    """Returns a NewsApiClient that reuses the pooled 'newsapi' session.
+
+    Returns:
+        NewsApiClient: The shared client, or None if no API key is configured.
+    """
+    if not settings.NEWS_API_KEY:
+        return None
+    session = get_session('newsapi')
+    with _lock:
+        key = ('newsapi', settings.NEWS_API_KEY)
+        if key not in _clients:
+            _clients[key] = NewsApiClient(api_key=settings.NEWS_API_KEY, session=session)
+        return _clients[key]
+
+def get_reddit_client():
+    """Returns a read-only PRAW client that reuses the pooled 'reddit' session.
+
+    Returns:
+        praw.Reddit: The shared client, or None if PRAW is not installed or
+                     Reddit credentials are missing.
+    """
+    if not (settings.REDDIT_CLIENT_ID and settings.REDDIT_CLIENT_SECRET):
+        logger.error("Reddit credentials not found in settings.")
+        return None
+    try:
+        import praw
+    except ImportError:
+        logger.error("praw is not installed; Reddit data is unavailable.")
+        return None
+    session = get_session('reddit')
+    with _lock:
+        if 'reddit' not in _clients:
+            _clients['reddit'] = praw.Reddit(
+                client_id=settings.REDDIT_CLIENT_ID,
+                client_secret=settings.REDDIT_CLIENT_SECRET,
+                user_agent=settings.REDDIT_USER_AGENT or 'StockSentimentApp',
+                requestor_kwargs={'session': session},
+                check_for_async=False,
+            )
+            _clients['reddit'].read_only = True
+        return _clients['reddit']
+
+def reset():
+    """Closes and forgets all pooled sessions and clients (e.g. after a fork or in tests)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _budgets.clear()
+        _ledgers.clear()
+        _clients.clear()
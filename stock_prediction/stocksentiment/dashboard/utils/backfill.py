@@ -0,0 +1,214 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+import logging
+
+from ..models import NewsQuery
+from . import api_clients, news_store, price_store
+from .rate_limiter import QuotaExhausted
+
+logger = logging.getLogger(__name__)
+
+# Tickers per yf.download call and days per price chunk
+PRICE_BATCH_TICKERS = 20
+PRICE_CHUNK_DAYS = 365
+# Days per NewsAPI window; each window is one query per ticker
+NEWS_CHUNK_DAYS = 7
+# Chunks submitted ahead of the workers; bounds memory to a few chunks per worker
+IN_FLIGHT_PER_WORKER = 2
+
+def _checkpoint_path(job):
+    path = settings.VAR_DIR / 'backfill'
+    path.mkdir(parents=True, exist_ok=True)
+    return path / f"{job}.json"
+
+def make_chunks(tickers, start_date, end_date, news_days=0):
+    """Splits a backfill into independent chunks, newest first.
+
+    Price chunks are (PRICE_BATCH_TICKERS tickers, PRICE_CHUNK_DAYS days); news
+    chunks are one ticker's last `news_days` days, fetched in NEWS_CHUNK_DAYS
+    windows. Working newest-first means an interrupted backfill has the most
+    useful history stored, and each news window extends the stored range backwards.
+
+    Returns:
+        list: Chunk dicts with 'id', 'kind' ('prices' or 'news'), 'tickers', 'start' and 'end'
+              (end exclusive); news chunks also have 'windows' ((start, end) pairs).
+    """
+    chunks = []
+    chunk_end = end_date
+    while chunk_end > start_date:
+        chunk_start = max(start_date, chunk_end - timedelta(days=PRICE_CHUNK_DAYS))
+        for i in range(0, len(tickers), PRICE_BATCH_TICKERS):
+            group = tickers[i:i + PRICE_BATCH_TICKERS]
+            chunks.append({
+                'id': f"prices:{','.join(group)}:{chunk_start}:{chunk_end}",
+                'kind': 'prices', 'tickers': group, 'start': chunk_start, 'end': chunk_end,
+            })
+        chunk_end = chunk_start
+
+    news_start = max(start_date, end_date - timedelta(days=news_days))
+    windows = []
+    chunk_end = end_date
+    while chunk_end > news_start:
+        chunk_start = max(news_start, chunk_end - timedelta(days=NEWS_CHUNK_DAYS))
+        windows.append((chunk_start, chunk_end))
+        chunk_end = chunk_start
+    if windows:
+        for ticker in tickers:
+            # A ticker's windows run in order in one chunk, since they extend the same NewsQuery
+            chunks.append({
+                'id': f"news:{ticker}:{news_start}:{end_date}",
+                'kind': 'news', 'tickers': [ticker], 'start': news_start, 'end': end_date,
+                'windows': windows,
+            })
+    return chunks
+
+class Checkpoint:
+    """Set of completed chunk ids for a backfill job, saved to VAR_DIR/backfill/<job>.json.
+
+    Saved atomically after every chunk, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, job):
+        self.path = _checkpoint_path(job)
+        self._lock = threading.Lock()
+        self.done = set()
+        if self.path.exists():
+            with open(self.path) as f:
+                self.done = set(json.load(f)['done'])
+
+    def mark_done(self, chunk_id):
+        with self._lock:
+            self.done.add(chunk_id)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'done': sorted(self.done), 'updated_at': timezone.now().isoformat()}, f)
+            os.replace(tmp_path, self.path)
+
+    def reset(self):
+        with self._lock:
+            self.done.clear()
+            self.path.unlink(missing_ok=True)
+
+def _run_prices(chunk):
+    # yfinance requests each ticker separately, and only the stored gaps are downloaded
+    gaps = sum(len(price_store.missing_ranges(t, chunk['start'], chunk['end'])) for t in chunk['tickers'])
+    rows = price_store.ensure_coverage(chunk['tickers'], chunk['start'], chunk['end'])
+    return rows, gaps
+
+def _run_news(chunk, newsapi, checkpoint):
+    ticker = chunk['tickers'][0]
+    news_query, _ = NewsQuery.objects.get_or_create(query=news_store.make_query([ticker]))
+    before = news_query.articles.count()
+    fetches = 0
+    for window_start, window_end in chunk['windows']:
+        window_id = f"news:{ticker}:{window_start}:{window_end}"
+        if window_id in checkpoint.done:
+            continue
+        if not api_clients.has_quota('newsapi'):
+            raise QuotaExhausted("NewsAPI daily quota used up; rerun the backfill tomorrow to resume.")
+        # refresh_query's window is inclusive of its last day
+        fetches += news_store.refresh_query(newsapi, [ticker], window_start, window_end - timedelta(days=1))
+        checkpoint.mark_done(window_id)
+    return news_query.articles.count() - before, fetches
+
+def _run_chunk(chunk, newsapi, checkpoint):
+    try:
+        if chunk['kind'] == 'prices':
+            return _run_prices(chunk)
+        return _run_news(chunk, newsapi, checkpoint)
+    finally:
+        connections.close_all()
+
+def _update_rates(stats, started):
+    elapsed = max(time.monotonic() - started, 1e-9)
+    stats['seconds'] = round(elapsed, 2)
+    for kind in ('prices', 'news'):
+        stats[kind]['rows_per_second'] = round(stats[kind]['rows'] / elapsed, 2)
+        stats[kind]['calls_per_second'] = round(stats[kind]['calls'] / elapsed, 2)
+
+def run_backfill(tickers, start_date, end_date, job='default', news_days=0, workers=4, reset=False, progress=None):
+    """Backfills the price and news stores for a ticker universe.
+
+    Chunks (see make_chunks) run on a thread pool with at most
+    IN_FLIGHT_PER_WORKER chunks per worker queued, so memory stays bounded however
+    large the universe is. Each chunk's rows are bulk-upserted as they arrive
+    and the chunk (or news window) is checkpointed; work done in an earlier run
+    is skipped. Failed chunks are not checkpointed and are retried on the next
+    run, as are news windows left when NewsAPI's daily quota runs out.
+
+    Args:
+        tickers (list): Ticker universe.
+        start_date (datetime.date): First day to backfill.
+        end_date (datetime.date): Exclusive last day.
+        job (str): Checkpoint name; runs with the same name resume each other.
+        news_days (int): Days of news to backfill (NewsAPI only serves its plan's window).
+        workers (int): Parallel chunk downloads.
+        reset (bool): Ignore and clear the job's checkpoint.
+        progress (callable): Called with the running stats dict after each chunk.
+
+    Returns:
+        dict: Run statistics: 'chunks', 'skipped', 'done', 'failed', 'seconds', and
+              per kind ('prices', 'news') 'rows', 'calls', 'rows_per_second' and
+              'calls_per_second'. Price calls are per-ticker gap downloads; news
+              calls are NewsAPI query windows.
+    """
+    checkpoint = Checkpoint(job)
+    if reset:
+        checkpoint.reset()
+    chunks = make_chunks(tickers, start_date, end_date, news_days)
+    pending = [chunk for chunk in chunks if chunk['id'] not in checkpoint.done]
+    newsapi = api_clients.get_newsapi_client() if any(c['kind'] == 'news' for c in pending) else None
+    if newsapi is None:
+        news_chunks = [c for c in pending if c['kind'] == 'news']
+        if news_chunks:
+            logger.error(f"NewsAPI key not found in settings; skipping {len(news_chunks)} news chunks.")
+            pending = [c for c in pending if c['kind'] != 'news']
+
+    stats = {
+        'chunks': len(chunks),
+        'skipped': len(chunks) - len(pending),
+        'done': 0,
+        'failed': 0,
+        'prices': {'rows': 0, 'calls': 0},
+        'news': {'rows': 0, 'calls': 0},
+    }
+    started = time.monotonic()
+    _update_rates(stats, started)
+    queue = iter(pending)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backfill') as executor:
+        def submit():
+            for chunk in queue:
+                running[executor.submit(_run_chunk, chunk, newsapi, checkpoint)] = chunk
+                if len(running) >= workers * IN_FLIGHT_PER_WORKER:
+                    break
+
+        submit()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                chunk = running.pop(future)
+                try:
+                    rows, calls = future.result()
+                except Exception as e:
+                    logger.error(f"Backfill chunk {chunk['id']} failed: {e}", exc_info=True)
+                    stats['failed'] += 1
+                    continue
+                checkpoint.mark_done(chunk['id'])
+                stats['done'] += 1
+                stats[chunk['kind']]['rows'] += rows
+                stats[chunk['kind']]['calls'] += calls
+                _update_rates(stats, started)
+                if progress:
+                    progress(stats)
+            submit()
+    _update_rates(stats, started)
+    return stats
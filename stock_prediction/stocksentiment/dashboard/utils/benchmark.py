@@ -0,0 +1,366 @@
+import importlib.metadata
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.test.utils import override_settings
+from django.utils import timezone
+import logging
+
+from . import api_clients, chart_data, data_fetchers, ml_model, model_registry, price_store, sentiment_analyzer
+from .records import clean_article
+
+logger = logging.getLogger(__name__)
+
+# Version of the results file layout; bump when keys change
+SCHEMA_VERSION = 2
+
+# Fixture data is generated for fixed dates, so every run sees the same inputs
+FIXTURE_END = date(2024, 12, 31)
+FIXTURE_EPOCH = date(2000, 1, 1)
+NEWS_LOOKBACK_DAYS = 28
+
+# Default scaling grid: every combination is one scenario
+DEFAULT_TICKER_COUNTS = (1, 5)
+DEFAULT_DAYS = (365, 1095)
+DEFAULT_ARTICLE_COUNTS = (100, 1000)
+DEFAULT_REPEATS = 5
+
+# Stages timed per scenario, in pipeline order
+STAGES = (
+    'fetch_prices',         # empty store: fixture download, upsert, read back, fill
+    'load_prices',          # warm store
+    'fetch_news',           # empty store: fixture NewsAPI pages, upsert, attribute, score
+    'load_news',            # warm store
+    'analyze_sentiment',    # analyze_headlines_sentiment, VADER score cache cleared
+    'aggregate_over_time',  # aggregate_sentiment_over_time
+    'aggregate_by_ticker',  # aggregate_sentiment_by_ticker
+    'build_charts',         # price and sentiment chart payloads
+    'serialize',            # downsampling and JSON encoding, as served to charts.js
+    'predict_cold',         # model_registry predict with an empty registry: models loaded from disk
+    'predict_warm',         # the same prediction with the models in memory
+)
+
+# A stage regresses when its median grows by more than the tolerance and by at least MIN_REGRESSION_MS
+DEFAULT_TOLERANCE = 0.25
+MIN_REGRESSION_MS = 1.0
+
+FIXTURE_TICKERS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'NVDA', 'META', 'JPM', 'V', 'WMT']
+
+# Headline vocabulary; mixes give VADER a spread of scores
+_SUBJECTS = ['shares', 'stock', 'earnings', 'outlook', 'revenue', 'guidance', 'margins']
+_POSITIVE = ['surge', 'beat expectations', 'rally on strong demand', 'win praise', 'soar to a record']
+_NEGATIVE = ['slump', 'miss estimates', 'fall on weak demand', 'draw criticism', 'plunge after a lawsuit']
+_NEUTRAL = ['are unchanged', 'hold steady', 'are in line', 'are due next week']
+
+def _seed(*parts):
+    return zlib.crc32('|'.join(str(p) for p in parts).encode('utf-8'))
+
+def fixture_tickers(count):
+    """Returns `count` tickers for a scenario (synthetic symbols beyond the built-in list)."""
+    return (FIXTURE_TICKERS + [f"SYN{i}" for i in range(max(count - len(FIXTURE_TICKERS), 0))])[:count]
+
+def fixture_prices(ticker, dates):
+    """Returns synthetic OHLCV rows for a ticker on the given business days.
+
+    Prices are a seeded random walk from FIXTURE_EPOCH, so a (ticker, day) always
+    has the same bar however the range is split into downloads.
+    """
+    all_days = pd.bdate_range(FIXTURE_EPOCH, max(dates[-1], pd.Timestamp(FIXTURE_EPOCH)))
+    rng = np.random.default_rng(_seed('prices', ticker))
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(all_days))))
+    spread = rng.uniform(0.002, 0.02, len(all_days))
+    volume = rng.integers(1_000_000, 50_000_000, len(all_days))
+    frame = pd.DataFrame({
+        'Open': close * (1 - spread / 2),
+        'High': close * (1 + spread),
+        'Low': close * (1 - spread),
+        'Close': close,
+        'Adj Close': close * 0.98,
+        'Volume': volume,
+    }, index=all_days)
+    return frame.reindex(dates)
+
+def fixture_download(tickers, start=None, end=None, **kwargs):
+    """Stands in for yf.download: a (field, ticker) column frame of synthetic bars."""
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    dates = pd.bdate_range(start, pd.Timestamp(end) - timedelta(days=1), name='Date')
+    if not len(dates):
+        return pd.DataFrame()
+    frames = {ticker: fixture_prices(ticker, dates) for ticker in tickers}
+    return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+def fixture_articles(tickers, count, from_dt, to_dt):
+    """Returns `count` synthetic raw NewsAPI articles mentioning the tickers, newest first."""
+    rng = np.random.default_rng(_seed('news', ','.join(tickers), count))
+    span = (to_dt - from_dt).total_seconds()
+    offsets = np.sort(rng.uniform(0, span, count))[::-1]
+    articles = []
+    for i, offset in enumerate(offsets):
+        ticker = tickers[i % len(tickers)]
+        tone = (_POSITIVE, _NEGATIVE, _NEUTRAL)[rng.integers(3)]
+        published = from_dt + timedelta(seconds=float(offset))
+        articles.append({
+            'source': {'id': None, 'name': f"Wire {i % 7}"},
+            'title': f"{ticker} {rng.choice(_SUBJECTS)} {rng.choice(tone)}",
+            'description': f"Analysts discuss {ticker} {rng.choice(_SUBJECTS)}, which {rng.choice(tone)}.",
+            'url': f"https://fixtures.invalid/{ticker}/{i}",
+            'publishedAt': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        })
+    return articles
+
+class FixtureNewsApi:
+    """Stands in for NewsApiClient, serving one synthetic result set page by page."""
+
+    def __init__(self, articles):
+        self.articles = articles
+        self.calls = 0
+
+    def get_everything(self, q=None, from_param=None, to=None, page=1, page_size=100, **kwargs):
+        self.calls += 1
+        from_dt = datetime.fromisoformat(from_param).replace(tzinfo=dt_timezone.utc)
+        to_dt = datetime.fromisoformat(to).replace(tzinfo=dt_timezone.utc)
+        matched = [
+            a for a in self.articles
+            if from_dt <= datetime.strptime(a['publishedAt'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=dt_timezone.utc) <= to_dt
+        ]
+        return {
+            'status': 'ok',
+            'totalResults': len(matched),
+            'articles': matched[(page - 1) * page_size:page * page_size],
+        }
+
+def make_scenarios(ticker_counts=DEFAULT_TICKER_COUNTS, days=DEFAULT_DAYS, article_counts=DEFAULT_ARTICLE_COUNTS):
+    """Returns the scaling grid as scenario dicts ('tickers', 'days', 'articles')."""
+    return [
+        {'tickers': t, 'days': d, 'articles': a}
+        for t in ticker_counts for d in days for a in article_counts
+    ]
+
+def _reset_stores():
+    # The suite runs against a throwaway database; every stage starts from the same state
+    for model in apps.get_app_config('dashboard').get_models():
+        model.objects.all().delete()
+    sentiment_analyzer.score_cache.clear()
+
+def _summary(samples):
+    ms = [s * 1000 for s in samples]
+    return {
+        'repeats': len(ms),
+        'min_ms': round(min(ms), 3),
+        'median_ms': round(statistics.median(ms), 3),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'max_ms': round(max(ms), 3),
+    }
+
+def _timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def _train_models(stock_data, ticker_sentiment):
+    # Models are trained by the refresher, outside the request path; here once per scenario, untimed
+    for ticker in stock_data.columns:
+        prices = stock_data[ticker].dropna()
+        sentiment = ticker_sentiment[ticker] if ticker in ticker_sentiment.columns else None
+        for horizon in settings.ML_HORIZONS:
+            if not ml_model.has_model(ticker, horizon, prices.index[-1].date()):
+                ml_model.train_model(ticker, prices, sentiment, horizon)
+
+def run_scenario(scenario, repeats=DEFAULT_REPEATS):
+    """Times every stage of the historic request path for one scenario.
+
+    Each repeat starts from empty stores, so 'fetch_*' stages always measure a
+    cold fetch and 'load_*' stages the warm read that follows it. Sentiment
+    analysis is timed on `scenario['articles']` fixture articles, independently
+    of how many NewsAPI's result cap lets the fetch stage store. Prediction is
+    timed with models trained beforehand, from a new registry ('predict_cold')
+    and again once it holds them ('predict_warm').
+
+    Returns:
+        dict: 'scenario', 'stages' (stage -> timing summary in ms) and 'counts'.
+    """
+    tickers = fixture_tickers(scenario['tickers'])
+    end_date = FIXTURE_END
+    start_date = end_date - timedelta(days=scenario['days'])
+    news_from = datetime.combine(end_date - timedelta(days=NEWS_LOOKBACK_DAYS), datetime.min.time(), tzinfo=dt_timezone.utc)
+    news_to = datetime.combine(end_date, datetime.min.time(), tzinfo=dt_timezone.utc)
+    raw_articles = fixture_articles(tickers, scenario['articles'], news_from, news_to)
+    newsapi = FixtureNewsApi(raw_articles)
+    samples = {stage: [] for stage in STAGES}
+
+    with mock.patch.object(price_store.yf, 'download', fixture_download), \
+            mock.patch.object(api_clients, 'get_newsapi_client', return_value=newsapi), \
+            mock.patch.object(model_registry.ModelRegistry, '_train_in_background'):
+        for _ in range(repeats):
+            _reset_stores()
+            stock_data, seconds = _timed(data_fetchers.get_historical_stock_data_by_date, tickers, start_date, end_date)
+            samples['fetch_prices'].append(seconds)
+            stock_data, seconds = _timed(data_fetchers.get_historical_stock_data_by_date, tickers, start_date, end_date)
+            samples['load_prices'].append(seconds)
+            stored, seconds = _timed(data_fetchers.get_news_headlines_by_date, tickers, end_date, NEWS_LOOKBACK_DAYS)
+            samples['fetch_news'].append(seconds)
+            stored, seconds = _timed(data_fetchers.get_news_headlines_by_date, tickers, end_date, NEWS_LOOKBACK_DAYS)
+            samples['load_news'].append(seconds)
+
+            articles = [clean_article(article) for article in raw_articles]
+            sentiment_analyzer.score_cache.clear()
+            analyzed, seconds = _timed(sentiment_analyzer.analyze_headlines_sentiment, articles)
+            samples['analyze_sentiment'].append(seconds)
+            daily, seconds = _timed(sentiment_analyzer.aggregate_sentiment_over_time, analyzed, freq='D')
+            samples['aggregate_over_time'].append(seconds)
+            by_ticker, seconds = _timed(sentiment_analyzer.aggregate_sentiment_by_ticker, analyzed, tickers, freq='D')
+            samples['aggregate_by_ticker'].append(seconds)
+
+            started = time.perf_counter()
+            price_chart = chart_data.price_payload(stock_data, start_date, end_date)
+            sentiment_chart = chart_data.sentiment_payload(daily, start_date, end_date, by_ticker)
+            samples['build_charts'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            payload_bytes = 0
+            for payload in (price_chart, sentiment_chart):
+                if payload is not None:
+                    payload = chart_data.downsample_payload(payload, settings.CHART_MAX_POINTS)
+                    payload_bytes += len(JsonResponse(payload).content)
+            samples['serialize'].append(time.perf_counter() - started)
+
+            _train_models(stock_data, by_ticker)
+            registry = model_registry.ModelRegistry()
+            predictions, seconds = _timed(registry.predict, stock_data, by_ticker, settings.ML_HORIZONS)
+            samples['predict_cold'].append(seconds)
+            predictions, seconds = _timed(registry.predict, stock_data, by_ticker, settings.ML_HORIZONS)
+            samples['predict_warm'].append(seconds)
+
+    counts = {
+        'price_rows': 0 if stock_data is None else int(stock_data.size),
+        'articles_stored': len(stored),
+        'articles_scored': len(analyzed),
+        'newsapi_calls': newsapi.calls,
+        'payload_bytes': payload_bytes,
+        'predictions': len(predictions),
+    }
+    return {
+        'scenario': dict(scenario),
+        'stages': {stage: _summary(samples[stage]) for stage in STAGES},
+        'counts': counts,
+    }
+
+def _environment():
+    packages = {}
+    for name in ('django', 'numpy', 'pandas', 'vaderSentiment', 'yfinance'):
+        try:
+            packages[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            packages[name] = None
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'sentiment_workers': getattr(settings, 'SENTIMENT_WORKERS', 1),
+        'packages': packages,
+    }
+
+def run_suite(scenarios, repeats=DEFAULT_REPEATS, progress=None):
+    """Runs every scenario against fixture data and returns a machine-readable report.
+
+    Network calls are answered by fixtures (see fixture_download and
+    FixtureNewsApi) and files go to a temporary VAR_DIR, but the stores are
+    written to the current database, which is emptied before each repeat: run
+    it inside isolated_database() (as the run_benchmarks command does) or a test.
+
+    Args:
+        scenarios (list): Scenario dicts (see make_scenarios).
+        repeats (int): Timed repeats per scenario.
+        progress (callable): Called with each scenario's result as it finishes.
+
+    Returns:
+        dict: 'schema', 'created_at', 'environment', 'config' and 'results'
+              (one run_scenario result per scenario).
+    """
+    report = {
+        'schema': SCHEMA_VERSION,
+        'created_at': timezone.now().isoformat(),
+        'environment': _environment(),
+        'config': {
+            'repeats': repeats,
+            'fixture_end': FIXTURE_END.isoformat(),
+            'news_lookback_days': NEWS_LOOKBACK_DAYS,
+            'chart_max_points': settings.CHART_MAX_POINTS,
+        },
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as var_dir, override_settings(
+        VAR_DIR=Path(var_dir), PREWARMED_DATA_ONLY=False, NEWS_API_KEY='fixture'
+    ):
+        for scenario in scenarios:
+            result = run_scenario(scenario, repeats)
+            report['results'].append(result)
+            if progress:
+                progress(result)
+    return report
+
+@contextmanager
+def isolated_database():
+    """Points the default connection at a fresh test database for the duration of the block."""
+    connection = connections['default']
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+def _scenario_key(scenario):
+    return (scenario['tickers'], scenario['days'], scenario['articles'])
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE, min_ms=MIN_REGRESSION_MS):
+    """Finds stages that got slower than in a baseline report.
+
+    Scenarios and stages missing from either report are ignored.
+
+    Returns:
+        list: Dicts with 'scenario', 'stage', 'baseline_ms', 'current_ms' and
+              'change' (relative), slowest change first.
+    """
+    baseline_results = {_scenario_key(r['scenario']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        base = baseline_results.get(_scenario_key(result['scenario']))
+        if base is None:
+            continue
+        for stage, timing in result['stages'].items():
+            if stage not in base['stages']:
+                continue
+            before = base['stages'][stage]['median_ms']
+            after = timing['median_ms']
+            if after > before * (1 + tolerance) and after - before >= min_ms:
+                regressions.append({
+                    'scenario': result['scenario'],
+                    'stage': stage,
+                    'baseline_ms': before,
+                    'current_ms': after,
+                    'change': round(after / before - 1, 3) if before else None,
+                })
+    regressions.sort(key=lambda r: r['change'] or 0, reverse=True)
+    return regressions
+
+def results_path():
+    """Returns a new timestamped results file path under VAR_DIR/benchmarks."""
+    path = settings.VAR_DIR / 'benchmarks'
+    path.mkdir(parents=True, exist_ok=True)
+    return path / f"benchmark-{timezone.now().strftime('%Y%m%d-%H%M%S')}.json"
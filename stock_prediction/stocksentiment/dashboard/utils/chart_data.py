@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+from .downsampling import downsample_indices
+
+# Decimal places kept in chart payloads; more is invisible on screen
+VALUE_DECIMALS = 4
+
+def _values(series):
+    """Converts a numeric Series to a JSON-ready list, with NaN as None."""
+    values = np.round(series.to_numpy(dtype=float), VALUE_DECIMALS)
+    return [None if np.isnan(v) else float(v) for v in values]
+
+def _dates(index):
+    return [ts.strftime('%Y-%m-%d') for ts in pd.DatetimeIndex(index)]
+
+def price_payload(stock_data, start_date, end_date):
+    """Builds the columnar chart payload for the historical price chart.
+
+    Args:
+        stock_data (pandas.DataFrame): Adj Close prices, one column per ticker.
+        start_date (datetime.date): Start of the analysed range (for the title).
+        end_date (datetime.date): End of the analysed range (for the title).
+
+    Returns:
+        dict: {'title', 'xaxis_title', 'yaxis_title', 'legend_title', 'dates',
+               'series': [{'name', 'mode', 'values'}]}, or None if there is no data.
+    """
+    if stock_data is None or stock_data.empty:
+        return None
+    return {
+        'title': f'Historical Adjusted Close Prices ({start_date} to {end_date})',
+        'xaxis_title': 'Date',
+        'yaxis_title': 'Price (USD)',
+        'legend_title': 'Tickers',
+        'dates': _dates(stock_data.index),
+        'series': [
+            {'name': str(ticker), 'mode': 'lines', 'values': _values(stock_data[ticker])}
+            for ticker in stock_data.columns
+        ],
+    }
+
+def sentiment_payload(daily_sentiment, start_date, end_date, ticker_sentiment=None):
+    """Builds the chart payload for the daily sentiment timeline.
+
+    Includes a 7-day rolling average once there are at least 7 days of data, and
+    one line per ticker when ticker_sentiment (dates x tickers) has more than one
+    ticker.
+
+    Returns:
+        dict: Same shape as price_payload, or None if no sentiment falls in the range.
+    """
+    if daily_sentiment is None or daily_sentiment.empty:
+        return None
+    # Filter sentiment data to match selected date range
+    filtered_sentiment = daily_sentiment[start_date:end_date]
+    if filtered_sentiment.empty:
+        return None
+    series = [
+        {'name': 'Avg Daily Sentiment', 'mode': 'lines+markers', 'values': _values(filtered_sentiment)},
+    ]
+    if len(filtered_sentiment) >= 7:
+        rolling_avg = filtered_sentiment.rolling(window=7).mean()
+        series.append({'name': '7-Day Rolling Avg', 'mode': 'lines', 'values': _values(rolling_avg)})
+    if ticker_sentiment is not None and len(ticker_sentiment.columns) > 1:
+        by_ticker = ticker_sentiment.reindex(filtered_sentiment.index)
+        series.extend(
+            {'name': str(ticker), 'mode': 'markers', 'values': _values(by_ticker[ticker])}
+            for ticker in by_ticker.columns
+        )
+    return {
+        'title': 'Average Daily News Sentiment (VADER Compound Score)',
+        'xaxis_title': 'Date',
+        'yaxis_title': 'Avg. Sentiment Score',
+        'legend_title': None,
+        'dates': _dates(filtered_sentiment.index),
+        'series': series,
+    }
+
+def downsample_payload(payload, max_points, method='lttb'):
+    """Bounds the number of points per series in a chart payload.
+
+    Series longer than max_points are reduced independently (see
+    downsampling.downsample_indices) and get their own 'dates' list; shorter
+    series keep using the payload's shared dates.
+
+    Args:
+        payload (dict): A payload from price_payload or sentiment_payload
+                        (payloads without 'dates', such as heatmaps, are returned as is).
+        max_points (int): Point budget per series; 0 or None disables downsampling.
+        method (str): 'lttb' or 'minmax'.
+
+    Returns:
+        dict: A new payload; the input is not modified.
+    """
+    if not max_points or 'dates' not in payload or len(payload['dates']) <= max_points:
+        return payload
+    dates = np.array(payload['dates'], dtype='datetime64[D]')
+    x = dates.astype(np.int64)
+    series = []
+    for s in payload['series']:
+        y = np.array([np.nan if v is None else v for v in s['values']], dtype=float)
+        kept = downsample_indices(x, y, max_points, method=method)
+        series.append(dict(
+            s,
+            dates=[payload['dates'][i] for i in kept],
+            values=[s['values'][i] for i in kept],
+        ))
+    return dict(payload, series=series)
+
+def lag_heatmap_payload(lagged):
+    """Builds the ticker x lag heatmap payload for the correlation page.
+
+    Returns:
+        dict: {'type': 'heatmap', 'title', 'xaxis_title', 'yaxis_title', 'x' (lags),
+               'y' (tickers), 'z' (one row of correlations per ticker)}, or None.
+    """
+    if lagged is None or lagged.empty:
+        return None
+    return {
+        'type': 'heatmap',
+        'title': 'Sentiment vs. Future Returns by Lag (Pearson)',
+        'xaxis_title': 'Lag (trading days, positive = sentiment leads)',
+        'yaxis_title': 'Ticker',
+        'x': [int(lag) for lag in lagged.columns],
+        'y': [str(ticker) for ticker in lagged.index],
+        'z': [_values(lagged.loc[ticker]) for ticker in lagged.index],
+    }
+
+def rolling_correlation_payload(pearson, spearman, window):
+    """Builds the rolling correlation chart payload (Pearson and Spearman per ticker).
+
+    Returns:
+        dict: Same shape as price_payload, or None if no window had enough data.
+    """
+    if pearson is None or pearson.dropna(how='all').empty:
+        return None
+    # Trim to the span where at least one correlation is defined
+    defined = pearson.notna().any(axis=1) | spearman.notna().any(axis=1)
+    first, last = defined.idxmax(), defined[::-1].idxmax()
+    pearson, spearman = pearson[first:last], spearman[first:last]
+    series = []
+    for ticker in pearson.columns:
+        series.append({'name': f'{ticker} Pearson', 'mode': 'lines', 'values': _values(pearson[ticker])})
+        series.append({'name': f'{ticker} Spearman', 'mode': 'lines', 'values': _values(spearman[ticker])})
+    return {
+        'title': f'{window}-Day Rolling Correlation of Sentiment and Daily Returns',
+        'xaxis_title': 'Date',
+        'yaxis_title': 'Correlation',
+        'legend_title': 'Ticker / Method',
+        'dates': _dates(pearson.index),
+        'series': series,
+    }
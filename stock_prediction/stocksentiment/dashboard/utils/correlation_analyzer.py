@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.stats import rankdata
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lags are in trading days; a positive lag means sentiment leads returns
+DEFAULT_MAX_LAG = 5
+DEFAULT_WINDOW = 20
+
+def _as_matrix(values):
+    """Returns a float (T x k) array for a Series/DataFrame/array (1-D becomes one column)."""
+    values = np.asarray(values, dtype=float)
+    return values[:, None] if values.ndim == 1 else values
+
+def _paired(x, y):
+    """Masks x and y so only positions where both are present count (pairwise-complete)."""
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return np.where(valid, x, np.nan), np.where(valid, y, np.nan), valid
+
+def _window_sums(values, window):
+    """Sums of every length-`window` window along axis 0, via one cumulative sum."""
+    csum = np.cumsum(values, axis=0)
+    csum = np.concatenate([np.zeros((1,) + values.shape[1:]), csum])
+    return csum[window:] - csum[:-window]
+
+def _pearson_from_sums(n, sx, sy, sxx, syy, sxy, min_periods):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        r = cov / np.sqrt(var_x * var_y)
+    # Constant windows have no defined correlation; clip float error just past +/-1
+    r[(n < min_periods) | (var_x <= 1e-12) | (var_y <= 1e-12)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+def rolling_pearson(x, y, window, min_periods=None):
+    """Rolling Pearson correlation of x and y, column by column.
+
+    All windows are computed at once from cumulative sums of x, y, x², y² and
+    xy (O(T) per column, whatever the window), using only the rows where both
+    series are present. Columns are centred first to keep the sums well conditioned.
+
+    Args:
+        x (array-like): T x k values (or length T).
+        y (array-like): Values of the same shape as x.
+        window (int): Window length in rows.
+        min_periods (int): Minimum paired observations per window (default window // 2, at least 3).
+
+    Returns:
+        numpy.ndarray: T x k correlations; the first window - 1 rows are NaN.
+    """
+    x, y = _as_matrix(x), _as_matrix(y)
+    n_rows = len(x)
+    min_periods = min_periods or max(window // 2, 3)
+    out = np.full(x.shape, np.nan)
+    if window < 2 or n_rows < window:
+        return out
+    x, y, valid = _paired(x, y)
+    with np.errstate(invalid='ignore'):
+        x = np.nan_to_num(x - np.nanmean(x, axis=0))
+        y = np.nan_to_num(y - np.nanmean(y, axis=0))
+    out[window - 1:] = _pearson_from_sums(
+        _window_sums(valid.astype(float), window),
+        _window_sums(x, window),
+        _window_sums(y, window),
+        _window_sums(x * x, window),
+        _window_sums(y * y, window),
+        _window_sums(x * y, window),
+        min_periods,
+    )
+    return out
+
+def _pearson_along(x, y, axis, min_periods):
+    """Pairwise-complete Pearson correlation along one axis of equally shaped arrays."""
+    x, y, valid = _paired(x, y)
+    x, y = np.nan_to_num(x), np.nan_to_num(y)
+    return _pearson_from_sums(
+        valid.sum(axis=axis).astype(float),
+        x.sum(axis=axis), y.sum(axis=axis),
+        (x * x).sum(axis=axis), (y * y).sum(axis=axis), (x * y).sum(axis=axis),
+        min_periods,
+    )
+
+def rolling_spearman(x, y, window, min_periods=None):
+    """Rolling Spearman rank correlation of x and y, column by column.
+
+    Every window is ranked at once through a strided (windows x window) view
+    (ties get their average rank, unpaired rows are ignored) and the ranks are
+    then correlated along the window axis.
+
+    Args:
+        x (array-like): T x k values (or length T).
+        y (array-like): Values of the same shape as x.
+        window (int): Window length in rows.
+        min_periods (int): Minimum paired observations per window (default window // 2, at least 3).
+
+    Returns:
+        numpy.ndarray: T x k correlations; the first window - 1 rows are NaN.
+    """
+    x, y = _as_matrix(x), _as_matrix(y)
+    min_periods = min_periods or max(window // 2, 3)
+    out = np.full(x.shape, np.nan)
+    if window < 2 or len(x) < window:
+        return out
+    x, y, _ = _paired(x, y)
+    # (windows x k x window) views; no data is copied until ranking
+    x_windows = sliding_window_view(x, window, axis=0)
+    y_windows = sliding_window_view(y, window, axis=0)
+    x_ranks = rankdata(x_windows, axis=-1, nan_policy='omit')
+    y_ranks = rankdata(y_windows, axis=-1, nan_policy='omit')
+    out[window - 1:] = _pearson_along(x_ranks, y_ranks, -1, min_periods)
+    return out
+
+def _shift(values, lag):
+    """Shifts rows of a T x k array back by `lag` (row t gets row t + lag), padding with NaN."""
+    shifted = np.full(values.shape, np.nan)
+    if lag >= 0:
+        shifted[:len(values) - lag] = values[lag:]
+    else:
+        shifted[-lag:] = values[:lag]
+    return shifted
+
+def lagged_correlation(sentiment, returns, lags, min_periods=10):
+    """Cross-correlation of sentiment with future returns for every ticker and lag.
+
+    All lags are stacked into one (lags x T x k) array and correlated in a single
+    pass: entry [lag, ticker] is corr(sentiment[t], returns[t + lag]).
+
+    Args:
+        sentiment (pandas.DataFrame): Sentiment per trading day (rows) and ticker (columns).
+        returns (pandas.DataFrame): Returns with the same index and columns.
+        lags (list): Lags in trading days (negative: returns lead sentiment).
+        min_periods (int): Minimum paired observations for a correlation.
+
+    Returns:
+        pandas.DataFrame: Correlations with tickers as rows and lags as columns.
+    """
+    lags = list(lags)
+    x = _as_matrix(sentiment)
+    y = _as_matrix(returns)
+    shifted = np.stack([_shift(y, lag) for lag in lags])
+    r = _pearson_along(np.broadcast_to(x, shifted.shape), shifted, 1, min_periods)
+    return pd.DataFrame(r.T, index=sentiment.columns, columns=lags)
+
+def align_inputs(prices, sentiment):
+    """Aligns daily returns and daily sentiment on trading days.
+
+    News published on a non-trading day (weekend or holiday) can only move the
+    price on the next trading day, so each calendar day's sentiment is assigned
+    to the next trading day and averaged there.
+
+    Args:
+        prices (pandas.DataFrame): Adjusted close prices, trading days x tickers.
+        sentiment (pandas.DataFrame): Mean sentiment, calendar days x tickers.
+
+    Returns:
+        tuple: (returns, sentiment) DataFrames with the same trading-day index
+               and the tickers present in both inputs. Sentiment is NaN on days
+               without news.
+    """
+    tickers = [t for t in prices.columns if t in sentiment.columns]
+    # A zero or missing price would give an infinite return; treat it as missing
+    returns = prices[tickers].pct_change().iloc[1:].replace([np.inf, -np.inf], np.nan)
+    if returns.empty or sentiment.empty:
+        return returns, pd.DataFrame(index=returns.index, columns=tickers, dtype=float)
+    trading_days = pd.DatetimeIndex(returns.index)
+    positions = trading_days.searchsorted(pd.DatetimeIndex(sentiment.index))
+    in_range = positions < len(trading_days)
+    assigned = sentiment[tickers][in_range]
+    assigned = assigned.groupby(trading_days[positions[in_range]]).mean()
+    return returns, assigned.reindex(trading_days)
+
+def analyze_correlation(prices, sentiment, max_lag=DEFAULT_MAX_LAG, window=DEFAULT_WINDOW):
+    """Runs the correlation analysis for the correlation page.
+
+    Args:
+        prices (pandas.DataFrame): Adjusted close prices, trading days x tickers.
+        sentiment (pandas.DataFrame): Mean daily sentiment, calendar days x tickers.
+        max_lag (int): Lags from -max_lag to +max_lag trading days are computed.
+        window (int): Rolling window in trading days.
+
+    Returns:
+        dict: 'lagged' (tickers x lags DataFrame), 'pearson' and 'spearman'
+              (rolling correlations, trading days x tickers), and 'observations'
+              (days with both a return and sentiment, per ticker). None if the
+              inputs share no tickers.
+    """
+    returns, aligned = align_inputs(prices, sentiment)
+    if returns.empty or aligned.columns.empty:
+        return None
+    index, columns = returns.index, returns.columns
+    return {
+        'lagged': lagged_correlation(aligned, returns, range(-max_lag, max_lag + 1)),
+        'pearson': pd.DataFrame(rolling_pearson(aligned, returns, window), index=index, columns=columns),
+        'spearman': pd.DataFrame(rolling_spearman(aligned, returns, window), index=index, columns=columns),
+        'observations': (aligned.notna() & returns.notna()).sum(),
+    }
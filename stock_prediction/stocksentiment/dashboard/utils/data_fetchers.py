@@ -1,9 +1,14 @@
 import yfinance as yf
 import pandas as pd
-from datetime import datetime, timedelta, date
-from newsapi import NewsApiClient
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, date, timezone as dt_timezone
 from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
 import logging # Added for logging errors
+from . import api_clients, instrumentation, price_cube, price_store, news_store
+from .rate_limiter import coalesce
+from .records import clean_article
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -11,6 +16,11 @@ logger = logging.getLogger(__name__)
 # Define the target stock tickers
 TARGET_STOCKS = ['AAPL', 'TSLA', 'AMZN', 'MSFT', 'GOOGL']
 
+# Shared pool that runs the per-source fetches of a request concurrently
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'FETCH_MAX_WORKERS', 8), thread_name_prefix='data-fetch'
+)
+
 def get_historical_stock_data(tickers, years=3):
     """Fetches historical stock data for given tickers for the specified number of years.
 
@@ -63,9 +73,16 @@ def get_historical_stock_data(tickers, years=3):
         print(f"Error fetching historical data for {tickers}: {e}")
         return None
 
+@instrumentation.span('fetch_prices')
 def get_historical_stock_data_by_date(tickers, start_date, end_date):
     """Fetches historical stock data for given tickers between specified dates.
 
+    Ranges covered by the shared price cube (see price_cube) are read from it
+    directly. Otherwise prices are served from the local price store; only date ranges that have
+    not been stored yet are downloaded from yfinance and merged in. With
+    settings.PREWARMED_DATA_ONLY, nothing is downloaded and only stored prices
+    (kept fresh by the refresh_market_data command) are returned.
+
     Args:
         tickers (list): A list of stock ticker symbols.
         start_date (datetime.date or str): Start date (YYYY-MM-DD or date object).
@@ -76,36 +93,23 @@ def get_historical_stock_data_by_date(tickers, start_date, end_date):
                           or None if fetching fails.
     """
     try:
-        # Ensure dates are in the correct string format if needed by yfinance
-        start_str = start_date.isoformat() if isinstance(start_date, date) else start_date
-        end_str = end_date.isoformat() if isinstance(end_date, date) else end_date
+        # The shared price cube (built by the refresher) serves covered ranges without
+        # copying; it is already sorted and filled.
+        data = price_cube.get_frame(tickers, start_date, end_date)
+        if data is not None:
+            instrumentation.count('price_cube_hit')
+            return data
 
-        # Fetch the full dataset first
-        full_data = yf.download(tickers, start=start_str, end=end_str)
+        data = price_store.get_prices(
+            tickers, start_date, end_date, fetch_missing=not settings.PREWARMED_DATA_ONLY
+        )
 
-        # Check if download was successful and data is available
-        if full_data.empty:
-            logger.warning(f"No data downloaded for {tickers} between {start_str} and {end_str}")
-            return None
-
-        # Select 'Adj Close', handle single vs multiple tickers
-        if isinstance(full_data.columns, pd.MultiIndex):
-            # Make sure 'Adj Close' exists at the top level
-            if 'Adj Close' not in full_data.columns.levels[0]:
-                 logger.error(f"'Adj Close' not found in MultiIndex columns for {tickers}. Available: {full_data.columns.levels[0]}")
-                 return None
-            data = full_data['Adj Close']
-            # Drop tickers with all NaN Adj Close
-            data = data.dropna(axis=1, how='all')
-        elif 'Adj Close' in full_data.columns:
-             data = full_data[['Adj Close']]
-             # Ensure column name matches ticker if single ticker requested
-             if len(tickers) == 1:
-                 data.columns = tickers
-        else:
-            logger.error(f"'Adj Close' column not found in downloaded data for {tickers}. Available: {full_data.columns}")
+        if data.empty:
+            logger.warning(f"No price data available for {tickers} between {start_date} and {end_date}")
             return None
 
+        # Drop tickers with all NaN Adj Close
+        data = data.dropna(axis=1, how='all')
         if data.empty:
              logger.warning(f"'Adj Close' data is empty after selection for {tickers}")
              return None
@@ -130,16 +134,15 @@ def get_news_headlines(tickers, days_lookback=30):
         days_lookback (int): Number of past days to fetch news for.
 
     Returns:
-        list: A list of dictionaries, where each dictionary represents an article
-              with keys like 'publishedAt', 'title', 'description', 'source', 'url'.
+        list: Article records with 'publishedAt', 'title', 'description', 'source'
+              and 'url' fields (readable with .get() like the article dicts).
               Returns an empty list if fetching fails or no API key is found.
     """
     if not settings.NEWS_API_KEY:
         logger.error("NewsAPI key not found in settings.")
         return []
 
-    newsapi = NewsApiClient(api_key=settings.NEWS_API_KEY)
-    all_articles = []
+    newsapi = api_clients.get_newsapi_client()
     to_date = datetime.now().date()
     from_date = to_date - timedelta(days=days_lookback)
 
@@ -147,57 +150,29 @@ def get_news_headlines(tickers, days_lookback=30):
     query = " OR ".join(tickers)
 
     try:
-        # Fetch news using the /everything endpoint
+        # Fetch news using the /everything endpoint, a page at a time; each page is
+        # cleaned into compact records as it arrives, so raw pages are not kept.
         # Note: Free tier might limit lookback range (e.g., 1 month) and requests
-        # For broader search, consider source filtering or /top-headlines
-        page = 1
-        total_results = 1 # Placeholder to start loop
-        fetched_results = 0
-
-        while fetched_results < total_results and fetched_results < 500: # Limit total fetches
-            response = newsapi.get_everything(
-                q=query,
-                from_param=from_date.isoformat(),
-                to=to_date.isoformat(),
-                language='en',
-                sort_by='publishedAt', # Or 'relevancy', 'popularity'
-                page_size=100, # Max page size
-                page=page
-            )
-
-            if response['status'] == 'ok':
-                articles = response.get('articles', [])
-                total_results = response.get('totalResults', 0)
-                all_articles.extend(articles)
-                fetched_results += len(articles)
-
-                # Break if no more articles or if total results limit reached
-                if not articles or fetched_results >= total_results:
-                    break
-                page += 1
-            else:
-                logger.error(f"NewsAPI error: {response.get('message')}")
-                break # Stop fetching on error
-
-        # Basic cleaning/structuring
-        cleaned_articles = [
-            {
-                'publishedAt': article.get('publishedAt'),
-                'title': article.get('title'),
-                'description': article.get('description'),
-                'source': article.get('source', {}).get('name'),
-                'url': article.get('url')
-            } for article in all_articles
-        ]
-        return cleaned_articles
+        pages = news_store.PageStream(
+            newsapi, query,
+            datetime.combine(from_date, datetime.min.time(), tzinfo=dt_timezone.utc),
+            datetime.combine(to_date, datetime.max.time().replace(microsecond=0), tzinfo=dt_timezone.utc),
+        )
+        return [clean_article(article) for page in pages for article in page]
 
     except Exception as e:
         logger.error(f"Error fetching news headlines for {tickers}: {e}", exc_info=True)
         return []
 
+@instrumentation.span('fetch_news')
 def get_news_headlines_by_date(tickers, end_date, days_lookback=28):
     """Fetches news headlines for given tickers up to end_date with a lookback.
 
+    Articles are kept in the local news store; NewsAPI is only asked for articles
+    newer than the stored high-water mark (or older than the stored range).
+    With settings.PREWARMED_DATA_ONLY, or once NewsAPI's daily quota is used up,
+    only stored articles are returned.
+
     Args:
         tickers (list): A list of stock ticker symbols (or relevant keywords).
         end_date (datetime.date or str): The latest date for news.
@@ -205,16 +180,13 @@ def get_news_headlines_by_date(tickers, end_date, days_lookback=28):
                            (Limited by NewsAPI plan, typically ~30 days for free tier).
 
     Returns:
-        list: A list of dictionaries representing articles.
+        list: Article records (see records.Article).
               Returns an empty list if fetching fails or no API key.
     """
-    if not settings.NEWS_API_KEY:
+    if not settings.NEWS_API_KEY and not settings.PREWARMED_DATA_ONLY:
         logger.error("NewsAPI key not found in settings.")
         return []
 
-    newsapi = NewsApiClient(api_key=settings.NEWS_API_KEY)
-    all_articles = []
-
     try:
         # Ensure end_date is a date object
         if isinstance(end_date, str):
@@ -224,61 +196,219 @@ def get_news_headlines_by_date(tickers, end_date, days_lookback=28):
 
         from_date_obj = to_date_obj - timedelta(days=days_lookback)
 
-        query = " OR ".join(tickers)
-
-        # Fetch news page by page
-        page = 1
-        total_results = 1
-        fetched_results = 0
-        max_fetch = 500 # Limit API calls
-
-        while fetched_results < total_results and fetched_results < max_fetch:
-            response = newsapi.get_everything(
-                q=query,
-                from_param=from_date_obj.isoformat(),
-                to=to_date_obj.isoformat(),
-                language='en',
-                sort_by='publishedAt',
-                page_size=100,
-                page=page
-            )
-
-            if response['status'] == 'ok':
-                articles = response.get('articles', [])
-                total_results = response.get('totalResults', 0)
-                all_articles.extend(articles)
-                fetched_results += len(articles)
-                if not articles or fetched_results >= total_results:
-                    break
-                page += 1
+        if not settings.PREWARMED_DATA_ONLY:
+            if api_clients.has_quota('newsapi'):
+                with instrumentation.span('refresh_news'):
+                    news_store.refresh_query(api_clients.get_newsapi_client(), tickers, from_date_obj, to_date_obj)
             else:
-                # Log the specific error from NewsAPI
-                api_error_code = response.get('code')
-                api_error_message = response.get('message')
-                logger.error(f"NewsAPI error (Code: {api_error_code}): {api_error_message}")
-                # Specific handling for date range issue
-                if api_error_code == 'parameterInvalid' and 'too far in the past' in api_error_message:
-                     logger.warning(f"NewsAPI lookback limit likely exceeded. Requested {days_lookback} days back from {to_date_obj}.")
-                break # Stop fetching on error
-
-        cleaned_articles = [
-            {
-                'publishedAt': article.get('publishedAt'),
-                'title': article.get('title'),
-                'description': article.get('description'),
-                'source': article.get('source', {}).get('name'),
-                'url': article.get('url')
-            } for article in all_articles
-        ]
-        return cleaned_articles
+                logger.warning(f"NewsAPI daily quota used up; serving stored news for {tickers}.")
+        with instrumentation.span('load_news'):
+            return news_store.load_articles(tickers, from_date_obj, to_date_obj)
 
     except Exception as e:
         # Catch potential strptime errors or other issues
         logger.error(f"Error fetching/processing news headlines for {tickers}: {e}", exc_info=True)
         return []
 
-# --- NewsAPI functions will go here later ---
+def _run_in_worker(func, *args):
+    """Runs a fetch function on a pool thread, closing that thread's DB connections afterwards."""
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+def fetch_historic_inputs(tickers, start_date, end_date, news_lookback_days):
+    """Fetches stock prices and news headlines concurrently for the historic view.
+
+    Each source runs on its own pool thread with its own timeout (settings.FETCH_TIMEOUTS,
+    in seconds). A source that times out or fails is returned as missing rather than
+    stalling the response; a timed-out fetch keeps running in the background and still
+    fills the local stores for the next request.
+
+    Args:
+        tickers (list): A list of stock ticker symbols.
+        start_date (datetime.date): Start date for prices.
+        end_date (datetime.date): End date for prices and news.
+        news_lookback_days (int): Number of days of news before end_date.
+
+    Returns:
+        tuple: (stock_data, news_articles) - a DataFrame or None, and a list of articles.
+    """
+    timeouts = getattr(settings, 'FETCH_TIMEOUTS', {})
+    # Submitted in this request's context, so the fetches record into its trace
+    price_future = instrumentation.submit_in_context(
+        _fetch_executor, _run_in_worker, get_historical_stock_data_by_date, tickers, start_date, end_date
+    )
+    news_future = instrumentation.submit_in_context(
+        _fetch_executor, _run_in_worker, get_news_headlines_by_date, tickers, end_date, news_lookback_days
+    )
+
+    try:
+        stock_data = price_future.result(timeout=timeouts.get('prices'))
+    except FutureTimeoutError:
+        logger.warning(f"Price fetch for {tickers} timed out after {timeouts.get('prices')}s.")
+        stock_data = None
+
+    try:
+        news_articles = news_future.result(timeout=timeouts.get('news'))
+    except FutureTimeoutError:
+        logger.warning(f"News fetch for {tickers} timed out after {timeouts.get('news')}s.")
+        news_articles = []
+
+    return stock_data, news_articles
+
+# --- Live sources (polled by utils/live_stream.py) ---
+
+def _fetch_alpha_vantage_quote(ticker):
+    config = api_clients.provider_config('alpha_vantage')
+    response = api_clients.get_session('alpha_vantage').get(
+        config['base_url'],
+        params={'function': 'GLOBAL_QUOTE', 'symbol': ticker, 'apikey': settings.ALPHA_VANTAGE_API_KEY},
+        timeout=10,
+    )
+    response.raise_for_status()
+    data = response.json()
+    quote = data.get('Global Quote') or {}
+    if not quote.get('05. price'):
+        # Alpha Vantage reports rate limits and bad symbols as a 200 with a 'Note'/'Information' body
+        message = data.get('Information') or data.get('Note') or ''
+        if 'rate limit' in message.lower() or 'requests per day' in message.lower():
+            api_clients.get_ledger('alpha_vantage').mark_exhausted()
+        logger.warning(f"No Alpha Vantage quote for {ticker}: {data}")
+        return None
+    return {
+        'price': float(quote['05. price']),
+        'change': float(quote.get('09. change') or 0),
+        'change_percent': float((quote.get('10. change percent') or '0').rstrip('%')),
+        'volume': int(quote.get('06. volume') or 0),
+        'latest_trading_day': quote.get('07. latest trading day'),
+    }
+
+def get_alpha_vantage_quote(ticker):
+    """Fetches the latest quote for a ticker from Alpha Vantage (GLOBAL_QUOTE).
+
+    Quotes are cached for settings.QUOTE_CACHE_SECONDS and concurrent requests for a
+    ticker share one call, so the free tier's small budget is spent once per
+    ticker rather than once per viewer. When the daily quota is used up or the
+    request fails, the last known quote is returned, marked 'stale'.
+
+    Args:
+        ticker (str): Stock ticker symbol.
+
+    Returns:
+        dict: 'price', 'change', 'change_percent', 'volume', 'latest_trading_day'
+              and 'stale', or None if the key is missing and no quote is known.
+    """
+    if not settings.ALPHA_VANTAGE_API_KEY:
+        logger.error("Alpha Vantage API key not found in settings.")
+        return None
+    cache = caches['default']
+    quote = cache.get(f"quote:{ticker}")
+    if quote is not None:
+        instrumentation.count('quote_cache_hit')
+        return quote
+    instrumentation.count('quote_cache_miss')
+    quote = None
+    if api_clients.has_quota('alpha_vantage'):
+        try:
+            quote = coalesce(('quote', ticker), _fetch_alpha_vantage_quote, ticker)
+        except Exception as e:
+            logger.error(f"Error fetching Alpha Vantage quote for {ticker}: {e}", exc_info=True)
+    if quote is None:
+        last = cache.get(f"quote:last:{ticker}")
+        return dict(last, stale=True) if last else None
+    quote = dict(quote, stale=False)
+    cache.set(f"quote:{ticker}", quote, getattr(settings, 'QUOTE_CACHE_SECONDS', 60))
+    cache.set(f"quote:last:{ticker}", quote, None)
+    return quote
+
+def get_reddit_posts(ticker, subreddits='stocks+investing+wallstreetbets', limit=25):
+    """Fetches recent Reddit posts mentioning a ticker.
+
+    Returns:
+        list: Article-like dicts ('publishedAt', 'title', 'description', 'source',
+              'url'), newest first. Empty if Reddit is unavailable.
+    """
+    reddit = api_clients.get_reddit_client()
+    if reddit is None:
+        return []
+    try:
+        posts = reddit.subreddit(subreddits).search(ticker, sort='new', time_filter='day', limit=limit)
+        return [
+            {
+                'publishedAt': datetime.fromtimestamp(post.created_utc, tz=dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'title': post.title,
+                'description': (post.selftext or '')[:500],
+                'source': f"Reddit r/{post.subreddit.display_name}",
+                'url': f"https://www.reddit.com{post.permalink}",
+            } for post in posts
+        ]
+    except Exception as e:
+        logger.error(f"Error fetching Reddit posts for {ticker}: {e}", exc_info=True)
+        return []
+
+def get_google_news_rss(ticker, limit=20):
+    """Fetches recent Google News RSS headlines for a ticker.
 
-# --- Alpha Vantage functions will go here later ---
+    Returns:
+        list: Article-like dicts ('publishedAt', 'title', 'description', 'source',
+              'url'). Empty if feedparser is not installed or the request fails.
+    """
+    try:
+        import feedparser
+    except ImportError:
+        logger.error("feedparser is not installed; Google News RSS is unavailable.")
+        return []
+    try:
+        config = api_clients.provider_config('google_news')
+        response = api_clients.get_session('google_news').get(
+            config['base_url'],
+            params={'q': f"{ticker} stock", 'hl': 'en-US', 'gl': 'US', 'ceid': 'US:en'},
+            timeout=10,
+        )
+        response.raise_for_status()
+        feed = feedparser.parse(response.content)
+        articles = []
+        for entry in feed.entries[:limit]:
+            published = entry.get('published_parsed')
+            articles.append({
+                'publishedAt': datetime(*published[:6], tzinfo=dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') if published else None,
+                'title': entry.get('title'),
+                'description': None,  # Google News descriptions only repeat the title as HTML
+                'source': (entry.get('source') or {}).get('title') or 'Google News',
+                'url': entry.get('link'),
+            })
+        return articles
+    except Exception as e:
+        logger.error(f"Error fetching Google News RSS for {ticker}: {e}", exc_info=True)
+        return []
 
-# --- Twitter/Reddit/RSS scraping functions will go here later ---
+def get_twitter_posts(ticker, limit=50):
+    """Fetches recent tweets mentioning a ticker's cashtag with snscrape.
+
+    Returns:
+        list: Article-like dicts ('publishedAt', 'title', 'description', 'source',
+              'url'), newest first. Empty if snscrape is not installed or scraping fails.
+    """
+    try:
+        import snscrape.modules.twitter as sntwitter
+    except ImportError:
+        logger.error("snscrape is not installed; Twitter data is unavailable.")
+        return []
+    try:
+        posts = []
+        for tweet in sntwitter.TwitterSearchScraper(f"${ticker} lang:en").get_items():
+            if len(posts) >= limit:
+                break
+            text = getattr(tweet, 'rawContent', None) or getattr(tweet, 'content', '')
+            posts.append({
+                'publishedAt': tweet.date.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'title': text[:280],
+                'description': None,
+                'source': f"Twitter @{tweet.user.username}",
+                'url': tweet.url,
+            })
+        return posts
+    except Exception as e:
+        logger.error(f"Error fetching tweets for {ticker}: {e}", exc_info=True)
+        return []
@@ -0,0 +1,109 @@
+import numpy as np
+
+# Downsampling methods accepted by downsample_indices
+METHODS = ('lttb', 'minmax')
+
+def lttb_indices(x, y, n_out):
+    """Selects points with Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept (and are all that is kept when
+    n_out is below 3); every bucket in between keeps the
+    point forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves the visual shape of the series
+    (including its peaks and troughs).
+
+    Args:
+        x (numpy.ndarray): Strictly increasing x values (e.g. dates as day numbers).
+        y (numpy.ndarray): y values, without NaNs.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        numpy.ndarray: Sorted indices of the kept points.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Bucket boundaries for the n - 2 interior points
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+
+    kept = np.empty(n_out, dtype=int)
+    kept[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    kept[-1] = n - 1
+    return kept
+
+def minmax_indices(y, n_out):
+    """Selects the minimum and maximum of each of n_out // 2 equal-width buckets.
+
+    Guarantees every local extreme that is a bucket extreme survives, at the cost
+    of a slightly noisier line than LTTB.
+
+    Returns:
+        numpy.ndarray: Sorted, unique indices (at most n_out, plus the endpoints;
+                       only the endpoints when n_out is below 2).
+    """
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n:
+        return np.arange(n)
+    if n_buckets < 1:
+        return np.array([0, n - 1])
+
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    # Pad the series into a (buckets x width) matrix so argmin/argmax run in one pass
+    width = int(np.diff(edges).max())
+    offsets = edges[:-1, None] + np.arange(width)
+    valid = offsets < edges[1:, None]
+    offsets = np.where(valid, offsets, edges[:-1, None])
+    values = y[offsets]
+    mins = np.where(valid, values, np.inf).argmin(axis=1)
+    maxs = np.where(valid, values, -np.inf).argmax(axis=1)
+    rows = np.arange(n_buckets)
+    kept = np.concatenate([[0, n - 1], offsets[rows, mins], offsets[rows, maxs]])
+    return np.unique(kept)
+
+def downsample_indices(x, y, max_points, method='lttb'):
+    """Returns the indices of at most ~max_points points to plot for a series.
+
+    NaN values are treated as gaps and never selected.
+
+    Args:
+        x (array-like): Increasing numeric x values.
+        y (array-like): y values (may contain NaN).
+        max_points (int): Point budget for the series.
+        method (str): 'lttb' or 'minmax'.
+
+    Returns:
+        numpy.ndarray: Sorted indices into the original arrays.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    y = np.asarray(y, dtype=float)
+    finite = np.flatnonzero(~np.isnan(y))
+    if len(finite) <= max_points:
+        return finite
+    if method == 'lttb':
+        picked = lttb_indices(np.asarray(x, dtype=float)[finite], y[finite], max_points)
+    else:
+        picked = minmax_indices(y[finite], max_points)
+    return finite[picked]
@@ -0,0 +1,344 @@
+import importlib.util
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+import logging
+
+from . import data_fetchers, sentiment_analyzer, sentiment_store
+from .news_store import article_hash
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls of each source, per ticker list
+POLL_INTERVALS = {
+    'reddit': 120,
+    'rss': 300,
+    'twitter': 120,
+}
+# Queue capacities. A full queue makes the stage feeding it wait (backpressure);
+# sources wait at most SOURCE_PUT_TIMEOUT and then drop the post.
+RAW_QUEUE_SIZE = 2000     # posts
+BATCH_QUEUE_SIZE = 8      # batches of up to BATCH_SIZE posts
+SCORED_QUEUE_SIZE = 8     # scored batches
+SOURCE_PUT_TIMEOUT = 5
+# Posts per scoring batch, and the longest a partial batch waits before it is scored
+BATCH_SIZE = 256
+BATCH_WAIT = 1.0
+# Width of the per-ticker aggregation windows, and how often they are written out
+WINDOW_SECONDS = 60
+FLUSH_SECONDS = 10
+# Post keys remembered in memory for deduplication (oldest forgotten first)
+SEEN_LIMIT = 100_000
+# Folded posts are also stored (see sentiment_store.fold_live_posts), so posts seen
+# before a restart are not counted again; stored posts older than this are pruned
+SEEN_RETENTION = timedelta(days=7)
+PRUNE_SECONDS = 3600
+# A running pipeline rewrites VAR_DIR/ingestion/heartbeat.json every FLUSH_SECONDS;
+# live streams treat it as running while the file is younger than this (seconds)
+HEARTBEAT_STALE_SECONDS = 3 * FLUSH_SECONDS
+# Latency samples kept per stage for percentiles
+LATENCY_SAMPLES = 1000
+
+# End-of-stream marker passed down the queues on shutdown
+_DONE = object()
+
+def _heartbeat_path():
+    path = settings.VAR_DIR / 'ingestion'
+    path.mkdir(parents=True, exist_ok=True)
+    return path / 'heartbeat.json'
+
+def write_heartbeat(sources, tickers):
+    """Records atomically that a pipeline is ingesting `sources` for `tickers` (see ingested_sources)."""
+    path = _heartbeat_path()
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'sources': sorted(sources), 'tickers': sorted(tickers), 'time': time.time()}, f)
+    os.replace(tmp_path, path)
+
+def clear_heartbeat():
+    _heartbeat_path().unlink(missing_ok=True)
+
+def ingested_sources(ticker):
+    """Returns the sources a running pipeline ingests for a ticker, or an empty list.
+
+    Read by live streams (see live_stream.IngestedFeed), which then use the stored
+    LivePost and LiveSentiment rows instead of polling those sources themselves.
+    """
+    try:
+        with open(_heartbeat_path()) as f:
+            heartbeat = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if time.time() - heartbeat.get('time', 0) > HEARTBEAT_STALE_SECONDS or ticker not in heartbeat.get('tickers', ()):
+        return []
+    return list(heartbeat.get('sources', ()))
+
+def available_sources():
+    """Returns the ingestion sources that are configured, mapped to their fetch functions."""
+    sources = {}
+    if settings.REDDIT_CLIENT_ID and settings.REDDIT_CLIENT_SECRET and importlib.util.find_spec('praw'):
+        sources['reddit'] = data_fetchers.get_reddit_posts
+    if importlib.util.find_spec('feedparser'):
+        sources['rss'] = data_fetchers.get_google_news_rss
+    if importlib.util.find_spec('snscrape'):
+        sources['twitter'] = data_fetchers.get_twitter_posts
+    return sources
+
+def poll_source(fetch, tickers, interval, stop):
+    """Yields (ticker, post) pairs from a fetch function, polling every ticker each `interval` seconds."""
+    while not stop.is_set():
+        for ticker in tickers:
+            if stop.is_set():
+                return
+            for post in fetch(ticker) or []:
+                yield ticker, post
+        stop.wait(interval)
+
+class StageStats:
+    """Thread-safe throughput and latency counters for one pipeline stage.
+
+    Latencies are measured from when a post entered the pipeline to when the
+    stage finished with it, so they include time spent waiting in queues.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.received = 0
+        self.emitted = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, received=0, emitted=0, dropped=0, seconds=0.0, latencies=()):
+        with self._lock:
+            self.received += received
+            self.emitted += emitted
+            self.dropped += dropped
+            self.busy_seconds += seconds
+            self._latencies.extend(latencies)
+
+    def snapshot(self, queue_depth=None):
+        """Returns the counters with per-second rates and latency percentiles (ms)."""
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            latencies = np.array(self._latencies) * 1000
+            return {
+                'stage': self.name,
+                'received': self.received,
+                'emitted': self.emitted,
+                'dropped': self.dropped,
+                'per_second': round(self.emitted / elapsed, 2),
+                'busy': round(self.busy_seconds / elapsed, 4),
+                'queue_depth': queue_depth,
+                'latency_ms': {
+                    'p50': round(float(np.percentile(latencies, 50)), 3),
+                    'p95': round(float(np.percentile(latencies, 95)), 3),
+                } if len(latencies) else None,
+            }
+
+class SeenSet:
+    """Bounded set of recently seen keys; the oldest keys are forgotten first.
+
+    Keeps repeats from being scored again within a run; the stored LivePost rows
+    are what keep them from being counted again across restarts.
+    """
+
+    def __init__(self, limit=SEEN_LIMIT):
+        self.limit = limit
+        self._keys = OrderedDict()
+
+    def add(self, key):
+        """Adds a key, returning False if it was already present."""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.limit:
+            self._keys.popitem(last=False)
+        return True
+
+def _window_start(post, received_at, window_seconds):
+    published = parse_datetime(post['publishedAt']) if post.get('publishedAt') else None
+    stamp = (published or received_at).timestamp()
+    return datetime.fromtimestamp(stamp - stamp % window_seconds, tz=dt_timezone.utc)
+
+class IngestionPipeline:
+    """Streams posts from live sources into per-ticker LiveSentiment windows.
+
+    Stages run on their own threads and are connected by bounded queues:
+
+        sources -> raw -> dedup/batch -> batches -> score -> scored -> aggregate -> DB
+
+    When a later stage falls behind, the queue in front of it fills up and the
+    stage before it waits, up to the sources, which drop posts after
+    SOURCE_PUT_TIMEOUT rather than buffering them. Memory is therefore bounded
+    by the queue sizes, the dedup set and one FLUSH_SECONDS interval of
+    scored posts, however bursty the sources are. The pipeline runs in its own
+    process (see the ingest_live_sentiment command), so it never holds up a web worker.
+    """
+
+    def __init__(self, sources, tickers, window_seconds=WINDOW_SECONDS, intervals=None):
+        self.sources = sources
+        self.tickers = list(tickers)
+        self.window_seconds = window_seconds
+        self.intervals = dict(POLL_INTERVALS, **(intervals or {}))
+        self.raw = queue.Queue(RAW_QUEUE_SIZE)
+        self.batches = queue.Queue(BATCH_QUEUE_SIZE)
+        self.scored = queue.Queue(SCORED_QUEUE_SIZE)
+        self.stats = {name: StageStats(name) for name in ('source', 'dedup', 'score', 'aggregate')}
+        self._stop_sources = threading.Event()
+        self._source_threads = []
+        self._stage_threads = []
+
+    def start(self):
+        self._beat()
+        for name, fetch in self.sources.items():
+            thread = threading.Thread(
+                target=self._run_source, args=(name, fetch), name=f"ingest-{name}", daemon=True
+            )
+            self._source_threads.append(thread)
+        for name, stage in (('dedup', self._run_dedup), ('score', self._run_score), ('aggregate', self._run_aggregate)):
+            self._stage_threads.append(threading.Thread(target=stage, name=f"ingest-{name}", daemon=True))
+        for thread in self._source_threads + self._stage_threads:
+            thread.start()
+
+    def _beat(self):
+        try:
+            write_heartbeat(self.sources, self.tickers)
+        except OSError as e:
+            logger.warning(f"Could not write the ingestion heartbeat: {e}")
+
+    def feed(self, name, posts):
+        """Pushes (ticker, post) pairs into the pipeline as if they came from source `name`."""
+        self._put_posts(name, posts)
+
+    def _put_posts(self, name, posts):
+        stats = self.stats['source']
+        for ticker, post in posts:
+            try:
+                self.raw.put((time.monotonic(), datetime.now(dt_timezone.utc), name, ticker, post), timeout=SOURCE_PUT_TIMEOUT)
+                stats.record(received=1, emitted=1)
+            except queue.Full:
+                # Counted in the stage report rather than logged one by one during a burst
+                stats.record(received=1, dropped=1)
+                logger.debug(f"Ingestion queue full; dropped a {name} post for {ticker}.")
+
+    def _run_source(self, name, fetch):
+        try:
+            self._put_posts(name, poll_source(fetch, self.tickers, self.intervals[name], self._stop_sources))
+        except Exception as e:
+            logger.error(f"Ingestion source '{name}' stopped: {e}", exc_info=True)
+
+    def _run_dedup(self):
+        stats = self.stats['dedup']
+        seen = SeenSet()
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self.raw.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _DONE:
+                received, _, _, ticker, post = item
+                latency = [time.monotonic() - received]
+                if seen.add((ticker, article_hash(post))):
+                    batch.append(item)
+                    deadline = deadline or time.monotonic() + BATCH_WAIT
+                    stats.record(received=1, latencies=latency)
+                else:
+                    stats.record(received=1, dropped=1, latencies=latency)
+            flush = item is None or item is _DONE or len(batch) >= BATCH_SIZE or (
+                deadline is not None and time.monotonic() >= deadline
+            )
+            if batch and flush:
+                self.batches.put(batch)  # Waits while scoring is behind
+                stats.record(emitted=len(batch))
+                batch, deadline = [], None
+            if item is _DONE:
+                self.batches.put(_DONE)
+                return
+
+    def _run_score(self):
+        stats = self.stats['score']
+        while True:
+            batch = self.batches.get()
+            if batch is _DONE:
+                self.scored.put(_DONE)
+                return
+            started = time.perf_counter()
+            try:
+                texts = [sentiment_analyzer.headline_text(post) for *_, post in batch]
+                compound = sentiment_analyzer.score_texts(texts)['compound'].to_numpy()
+            except Exception as e:
+                logger.error(f"Error scoring an ingestion batch: {e}", exc_info=True)
+                stats.record(received=len(batch), dropped=len(batch))
+                continue
+            scored = [(item, score) for item, score in zip(batch, compound) if not np.isnan(score)]
+            now = time.monotonic()
+            stats.record(received=len(batch), emitted=len(scored), dropped=len(batch) - len(scored),
+                         seconds=time.perf_counter() - started, latencies=[now - item[0] for item in batch])
+            self.scored.put(scored)
+
+    def _run_aggregate(self):
+        stats = self.stats['aggregate']
+        posts = []
+        next_flush = time.monotonic() + FLUSH_SECONDS
+        next_prune = time.monotonic()
+        try:
+            while True:
+                try:
+                    scored = self.scored.get(timeout=max(next_flush - time.monotonic(), 0))
+                except queue.Empty:
+                    scored = None
+                if scored is not None and scored is not _DONE:
+                    now = time.monotonic()
+                    for (received, received_at, source, ticker, post), score in scored:
+                        window_start = _window_start(post, received_at, self.window_seconds)
+                        posts.append((source, ticker, article_hash(post), window_start, float(score),
+                                      post.get('title'), post.get('url')))
+                    stats.record(received=len(scored), latencies=[now - item[0] for item, _ in scored])
+                if posts and (scored is _DONE or time.monotonic() >= next_flush):
+                    started = time.perf_counter()
+                    folded = sentiment_store.fold_live_posts(posts)
+                    stats.record(emitted=folded, dropped=len(posts) - folded,
+                                 seconds=time.perf_counter() - started)
+                    posts = []
+                if time.monotonic() >= next_flush:
+                    self._beat()
+                    next_flush = time.monotonic() + FLUSH_SECONDS
+                if time.monotonic() >= next_prune:
+                    sentiment_store.prune_live_posts(datetime.now(dt_timezone.utc) - SEEN_RETENTION)
+                    next_prune = time.monotonic() + PRUNE_SECONDS
+                if scored is _DONE:
+                    return
+        finally:
+            connections.close_all()
+
+    def stop(self, timeout=30):
+        """Stops the sources, drains what is queued into the database and waits for the stages."""
+        self._stop_sources.set()
+        for thread in self._source_threads:
+            thread.join(timeout)
+        self.raw.put(_DONE)
+        for thread in self._stage_threads:
+            thread.join(timeout)
+        clear_heartbeat()
+
+    def report(self):
+        """Returns each stage's counters (see StageStats.snapshot) with its input queue depth."""
+        depths = {'source': None, 'dedup': self.raw.qsize(), 'score': self.batches.qsize(),
+                  'aggregate': self.scored.qsize()}
+        return [stats.snapshot(depths[name]) for name, stats in self.stats.items()]
@@ -0,0 +1,187 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Duration samples kept per span (and per view) for the percentiles in metrics()
+LATENCY_SAMPLES = 1000
+
+class RequestTrace:
+    """Stage timings, counters and sizes recorded while serving one request.
+
+    Work a request hands to pool threads records into the same trace when the
+    task is submitted with contextvars.copy_context().run (see submit_in_context).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}     # name -> [count, seconds]
+        self.counters = {}  # name -> count
+        self.sizes = {}     # name -> bytes
+        self._lock = threading.Lock()
+
+    def add_span(self, name, seconds):
+        with self._lock:
+            count, total = self.spans.get(name, (0, 0.0))
+            self.spans[name] = [count + 1, total + seconds]
+
+    def add_count(self, name, n):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_size(self, name, nbytes):
+        with self._lock:
+            self.sizes[name] = self.sizes.get(name, 0) + nbytes
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total=None):
+        """Formats the trace as a Server-Timing header value.
+
+        Spans become 'name;dur=<ms>' (with the number of occurrences when more
+        than one); counters and sizes have no duration and carry their value in desc.
+        """
+        with self._lock:
+            metrics = [
+                f'{name};dur={seconds * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else '')
+                for name, (count, seconds) in self.spans.items()
+            ]
+            metrics += [f'{name};desc="{value}"' for name, value in self.counters.items()]
+            metrics += [f'{name};desc="{value}B"' for name, value in self.sizes.items()]
+        if total is not None:
+            metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+class _Series:
+    """Count, total, max and recent samples of one measurement."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def summary(self, scale=1.0, digits=3):
+        samples = np.array(self.samples) * scale
+        return {
+            'count': self.count,
+            'total': round(self.total * scale, digits),
+            'mean': round(self.total * scale / self.count, digits) if self.count else None,
+            'p50': round(float(np.percentile(samples, 50)), digits) if len(samples) else None,
+            'p95': round(float(np.percentile(samples, 95)), digits) if len(samples) else None,
+            'max': round(self.max * scale, digits),
+        }
+
+class Metrics:
+    """Process-wide aggregates of every span, counter, size and request recorded."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.spans = {}
+            self.counters = {}
+            self.sizes = {}
+            self.views = {}
+            self.started_at = time.time()
+
+    def _add(self, table, name, value):
+        with self._lock:
+            table.setdefault(name, _Series()).add(value)
+
+    def add_span(self, name, seconds):
+        self._add(self.spans, name, seconds)
+
+    def add_size(self, name, nbytes):
+        self._add(self.sizes, name, nbytes)
+
+    def add_request(self, view_name, seconds):
+        self._add(self.views, view_name, seconds)
+
+    def add_count(self, name, n):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        """Returns the aggregates for this worker process.
+
+        Returns:
+            dict: 'pid', 'uptime_seconds', 'views' and 'spans' (durations in ms:
+                  count, total, mean, p50, p95, max), 'counters', and 'sizes'
+                  (the same summary in bytes).
+        """
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'views': {name: s.summary(scale=1000) for name, s in sorted(self.views.items())},
+                'spans': {name: s.summary(scale=1000) for name, s in sorted(self.spans.items())},
+                'counters': dict(sorted(self.counters.items())),
+                'sizes': {name: s.summary(digits=0) for name, s in sorted(self.sizes.items())},
+            }
+
+metrics = Metrics()
+
+_current_trace = contextvars.ContextVar('request_trace', default=None)
+
+def current_trace():
+    """Returns the trace of the request being served, or None outside a request."""
+    return _current_trace.get()
+
+@contextmanager
+def trace_request():
+    """Starts a RequestTrace for the enclosed request handling and yields it."""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+@contextmanager
+def span(name):
+    """Times the enclosed block as stage `name`, for the current request and the process."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, seconds)
+        metrics.add_span(name, seconds)
+
+def count(name, n=1):
+    """Adds n to counter `name` (upstream calls, cache hits and misses, ...)."""
+    if not n:
+        return
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_count(name, n)
+    metrics.add_count(name, n)
+
+def record_size(name, nbytes):
+    """Records a payload size in bytes."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_size(name, nbytes)
+    metrics.add_size(name, nbytes)
+
+def submit_in_context(executor, func, *args):
+    """executor.submit that runs func in a copy of the caller's context, so it records into the caller's trace."""
+    return executor.submit(contextvars.copy_context().run, func, *args)
@@ -0,0 +1,302 @@
+import asyncio
+import importlib.util
+import json
+from collections import deque
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+import logging
+
+from . import data_fetchers, ingestion, llm_predictor, sentiment_analyzer, sentiment_store
+from .news_store import article_hash
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls of each source; override with settings.LIVE_POLL_INTERVALS
+POLL_INTERVALS = {
+    'quote': 60,    # Alpha Vantage free tier: 5 calls/minute shared by all streams
+    'reddit': 120,
+    'rss': 300,
+    'llm': 300,     # least time between LLM predictions; answers for unchanged inputs come from cache
+    'ingested': 15,  # database reads of what the ingestion pipeline stored (see IngestedFeed)
+}
+# Posts and sentiment windows stored by the ingestion pipeline that a new stream starts from
+INGESTED_LOOKBACK = timedelta(hours=1)
+# Longest a single poll may take before it is abandoned for this round
+SOURCE_TIMEOUT = 20
+# A comment line is sent when nothing else was sent for this long, to keep proxies from closing the stream
+HEARTBEAT_SECONDS = 15
+# Streams end after this long; EventSource reconnects by itself
+MAX_STREAM_SECONDS = 900
+# Scored headlines a stream keeps for its LLM snapshot
+RECENT_HEADLINES = 50
+
+def format_event(event, data):
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def available_sources():
+    """Returns the live sources that are configured, mapped to their fetch functions.
+
+    'llm' is not polled: it predicts from the stream's own snapshot (see stream_updates).
+    """
+    sources = {}
+    if settings.ALPHA_VANTAGE_API_KEY:
+        sources['quote'] = data_fetchers.get_alpha_vantage_quote
+    if settings.REDDIT_CLIENT_ID and settings.REDDIT_CLIENT_SECRET and importlib.util.find_spec('praw'):
+        sources['reddit'] = data_fetchers.get_reddit_posts
+    if importlib.util.find_spec('feedparser'):
+        sources['rss'] = data_fetchers.get_google_news_rss
+    if settings.OPENROUTER_API_KEY:
+        sources['llm'] = llm_predictor.predict
+    return sources
+
+class IngestedFeed:
+    """Reads what a running ingestion pipeline stored, in place of polling its sources.
+
+    The pipeline already polls, dedups and scores those sources once for every
+    ticker it covers (see ingestion.IngestionPipeline), so streams only read its
+    LivePost rows, newer than the last one they pushed, and the running
+    LiveSentiment totals.
+    """
+
+    def __init__(self, lookback=INGESTED_LOOKBACK):
+        self.lookback = lookback
+        self.last_id = None
+
+    def __call__(self, ticker):
+        since = timezone.now() - self.lookback
+        try:
+            posts = [
+                post for post in sentiment_store.recent_live_posts(ticker, self.last_id, limit=RECENT_HEADLINES)
+                if self.last_id is not None or post['window_start'] >= since
+            ]
+            score_sum, count = sentiment_store.live_window_totals(ticker, since)
+        finally:
+            # Runs in a worker thread; don't leave its connection open
+            connections.close_all()
+        if posts:
+            self.last_id = posts[-1]['id']
+        elif self.last_id is None:
+            self.last_id = 0
+        return {'posts': posts, 'score_sum': score_sum, 'count': count}
+
+class LiveSession:
+    """Tracks what one stream has already pushed, so only deltas are sent."""
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.last_price = None
+        self.last_quote = None
+        self.recent = deque(maxlen=RECENT_HEADLINES)
+        self.seen = set()
+        self.score_sum = 0.0
+        self.count = 0
+        # Totals of the ingestion pipeline's windows, replaced on every read (see ingested_update)
+        self.ingested_sum = 0.0
+        self.ingested_count = 0
+
+    def price_update(self, quote):
+        """Returns the 'price' event payload for a quote, or None if the price hasn't moved."""
+        if not quote or quote['price'] == self.last_price:
+            return None
+        delta = None if self.last_price is None else round(quote['price'] - self.last_price, 4)
+        self.last_price = quote['price']
+        self.last_quote = quote
+        return dict(quote, ticker=self.ticker, delta=delta, at=timezone.now())
+
+    def new_headlines(self, articles):
+        """Filters a source's articles down to those not pushed before."""
+        new = []
+        for article in articles or []:
+            key = article_hash(article)
+            if key not in self.seen:
+                self.seen.add(key)
+                new.append(article)
+        return new
+
+    def _mean(self):
+        count = self.count + self.ingested_count
+        return (self.score_sum + self.ingested_sum) / count if count else None
+
+    def _sentiment_event(self, source, analyzed, previous):
+        mean = self._mean()
+        return {
+            'ticker': self.ticker,
+            'source': source,
+            'articles': [
+                {key: article.get(key) for key in ('publishedAt', 'title', 'source', 'url', 'sentiment', 'sentiment_label')}
+                for article in analyzed
+            ],
+            'mean': round(mean, 4),
+            'count': self.count + self.ingested_count,
+            'delta': None if previous is None else round(mean - previous, 4),
+            'at': timezone.now(),
+        }
+
+    def sentiment_update(self, source, articles):
+        """Scores new headlines and returns the 'sentiment' event payload."""
+        analyzed = sentiment_analyzer.analyze_headlines_sentiment(articles)
+        previous = self._mean()
+        self.score_sum += sum(article['sentiment'] for article in analyzed)
+        self.count += len(analyzed)
+        self.recent.extend(analyzed)
+        return self._sentiment_event(source, analyzed, previous)
+
+    def ingested_update(self, result):
+        """Returns the 'sentiment' event payload for an IngestedFeed read, or None if nothing changed."""
+        if not result:
+            return None
+        posts = [post for post in result['posts'] if article_hash(post) not in self.seen]
+        if not posts and (result['score_sum'], result['count']) == (self.ingested_sum, self.ingested_count):
+            return None
+        previous = self._mean()
+        self.ingested_sum, self.ingested_count = result['score_sum'], result['count']
+        if not self.count + self.ingested_count:
+            return None
+        labels = sentiment_analyzer.sentiment_labels([post['score'] for post in posts])
+        analyzed = []
+        for post, label in zip(posts, labels):
+            self.seen.add(article_hash(post))
+            analyzed.append({
+                'publishedAt': post['window_start'], 'title': post['title'], 'source': post['source'],
+                'url': post['url'] or None, 'sentiment': post['score'], 'sentiment_label': str(label),
+            })
+        self.recent.extend(analyzed)
+        return self._sentiment_event('ingested', analyzed, previous)
+
+    def snapshot(self):
+        """Returns the stream's current inputs for llm_predictor, or None before any data arrived."""
+        if self.last_quote is None and not self.count + self.ingested_count:
+            return None
+        return {
+            'ticker': self.ticker,
+            'price': self.last_quote['price'] if self.last_quote else None,
+            'change_percent': self.last_quote['change_percent'] if self.last_quote else None,
+            'sentiment': self._mean(),
+            'headline_count': self.count + self.ingested_count,
+            'headlines': list(self.recent),
+        }
+
+async def _predict(predict, snapshot, queue):
+    """Runs one LLM prediction off the event loop.
+
+    Pieces of the answer are put on the queue as ('llm_token', text) while it
+    streams in, then the parsed answer as ('llm', result).
+    """
+    loop = asyncio.get_running_loop()
+
+    def on_token(text):
+        loop.call_soon_threadsafe(queue.put_nowait, ('llm_token', text))
+
+    try:
+        result = await asyncio.to_thread(predict, snapshot, on_token)
+    except Exception as e:
+        logger.error(f"Live LLM prediction failed for {snapshot['ticker']}: {e}", exc_info=True)
+        result = None
+    await queue.put(('llm', result))
+
+async def _poll(name, fetch, ticker, interval, queue, stop):
+    """Polls one source until stop is set, putting (name, result) on the queue after each poll."""
+    while not stop.is_set():
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(fetch, ticker), timeout=SOURCE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Live source '{name}' timed out for {ticker}.")
+            result = None
+        except Exception as e:
+            logger.error(f"Live source '{name}' failed for {ticker}: {e}", exc_info=True)
+            result = None
+        await queue.put((name, result))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+async def stream_updates(ticker, max_seconds=None):
+    """Yields Server-Sent Events with price and sentiment deltas for a ticker.
+
+    Every configured source is polled concurrently on its own interval, and each
+    result is pushed as soon as it arrives, so a slow source never holds back
+    the others. Blocking fetches and scoring run in worker threads.
+
+    Sources that a running ingestion pipeline covers for the ticker (see
+    ingestion.ingested_sources) are not polled per stream; the stream reads
+    the pipeline's stored posts and windows instead ('ingested').
+
+    When OpenRouter is configured, a price or sentiment update also triggers an
+    LLM prediction from the stream's snapshot, at most once per 'llm' interval.
+    The answer's text is pushed as it is generated, before it is parsed.
+
+    Events: 'ready' (ticker and sources), 'price' (quote with delta to the last
+    pushed price), 'sentiment' (newly seen headlines with scores and the running
+    mean), 'prediction_token' (a piece of the LLM answer being generated),
+    'prediction' (LLM direction, confidence and explanation) and 'close' when
+    the stream reaches its time limit.
+    """
+    sources = available_sources()
+    predict = sources.pop('llm', None)
+    ingested = ingestion.ingested_sources(ticker)
+    if ingested:
+        for name in ingested:
+            sources.pop(name, None)
+        sources['ingested'] = IngestedFeed()
+    intervals = dict(POLL_INTERVALS, **getattr(settings, 'LIVE_POLL_INTERVALS', {}))
+    max_seconds = max_seconds or getattr(settings, 'LIVE_STREAM_MAX_SECONDS', MAX_STREAM_SECONDS)
+    session = LiveSession(ticker)
+    queue = asyncio.Queue()
+    stop = asyncio.Event()
+    tasks = [
+        asyncio.create_task(_poll(name, fetch, ticker, intervals[name], queue, stop))
+        for name, fetch in sources.items()
+    ]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    prediction_task = None
+    last_prediction = None
+
+    names = list(sources) + (['llm'] if predict else [])
+    yield format_event('ready', {'ticker': ticker, 'sources': names, 'intervals': {n: intervals[n] for n in names}})
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or not tasks:
+                yield format_event('close', {'reason': 'time limit' if tasks else 'no sources configured'})
+                return
+            try:
+                name, result = await asyncio.wait_for(queue.get(), timeout=min(HEARTBEAT_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            update = None
+            if name == 'llm_token':
+                yield format_event('prediction_token', {'ticker': ticker, 'text': result})
+            elif name == 'llm':
+                if result:
+                    yield format_event('prediction', dict(result, at=timezone.now()))
+            elif name == 'quote':
+                update = session.price_update(result)
+                if update:
+                    yield format_event('price', update)
+            elif name == 'ingested':
+                update = session.ingested_update(result)
+                if update:
+                    yield format_event('sentiment', update)
+            else:
+                new = session.new_headlines(result)
+                if new:
+                    update = await asyncio.to_thread(session.sentiment_update, name, new)
+                    yield format_event('sentiment', update)
+            if update and predict and (prediction_task is None or prediction_task.done()):
+                if last_prediction is None or loop.time() - last_prediction >= intervals['llm']:
+                    last_prediction = loop.time()
+                    prediction_task = asyncio.create_task(_predict(predict, session.snapshot(), queue))
+    finally:
+        # Runs when the stream ends or the client disconnects
+        stop.set()
+        if prediction_task is not None:
+            tasks.append(prediction_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,94 @@
+import json
+import time
+from django.conf import settings
+import logging
+
+from . import api_clients
+
+logger = logging.getLogger(__name__)
+
+# Model used for live predictions; override with settings.OPENROUTER_MODEL
+DEFAULT_MODEL = 'mistralai/mistral-7b-instruct'
+# Seconds to wait for a completion
+REQUEST_TIMEOUT = 30
+
+def _headers():
+    return {
+        'Authorization': f"Bearer {settings.OPENROUTER_API_KEY}",
+        'Content-Type': 'application/json',
+        'X-Title': 'StockSentiment',
+    }
+
+def _stream_text(response):
+    """Yields the text pieces of a streamed chat completion (OpenRouter's SSE format)."""
+    for line in response.iter_lines(decode_unicode=True):
+        # Blank lines separate events; lines starting with ':' are keep-alive comments
+        if not line or line.startswith(':') or not line.startswith('data:'):
+            continue
+        payload = line[len('data:'):].strip()
+        if payload == '[DONE]':
+            return
+        chunk = json.loads(payload)
+        if 'error' in chunk:
+            raise ValueError(f"OpenRouter error: {chunk['error']}")
+        choices = chunk.get('choices') or [{}]
+        text = (choices[0].get('delta') or {}).get('content')
+        if text:
+            yield text
+
+def chat(messages, model=None, max_tokens=600, temperature=0.2, on_token=None):
+    """Returns a chat completion from OpenRouter, streamed as it is generated.
+
+    The request goes through the pooled 'openrouter' session, so it shares the
+    provider's connection pool and rate-limit budget. The completion is read
+    as a stream, and each piece is handed to `on_token` as it arrives, so
+    callers can show the answer before it is complete.
+
+    Args:
+        messages (list): Chat messages ({'role', 'content'} dicts).
+        model (str): OpenRouter model id (default: settings.OPENROUTER_MODEL).
+        max_tokens (int): Cap on the completion length.
+        temperature (float): Sampling temperature.
+        on_token (callable): Called with each text piece of the completion, or None.
+
+    Returns:
+        str: The completion text, or None if no API key is configured or the request fails.
+    """
+    if not settings.OPENROUTER_API_KEY:
+        logger.error("OpenRouter API key not found in settings.")
+        return None
+    model = model or getattr(settings, 'OPENROUTER_MODEL', DEFAULT_MODEL)
+    config = api_clients.provider_config('openrouter')
+    started = time.perf_counter()
+    first_token = None
+    parts = []
+    try:
+        with api_clients.get_session('openrouter').post(
+            f"{config['base_url']}chat/completions",
+            headers=_headers(),
+            json={
+                'model': model,
+                'messages': messages,
+                'max_tokens': max_tokens,
+                'temperature': temperature,
+                'stream': True,
+            },
+            timeout=REQUEST_TIMEOUT,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for text in _stream_text(response):
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                parts.append(text)
+                if on_token is not None:
+                    on_token(text)
+    except Exception as e:
+        logger.error(f"Error calling OpenRouter: {e}", exc_info=True)
+        return None
+    if first_token is not None:
+        logger.info(
+            f"OpenRouter {model}: first token after {first_token:.2f}s, "
+            f"completion after {time.perf_counter() - started:.2f}s."
+        )
+    return ''.join(parts)
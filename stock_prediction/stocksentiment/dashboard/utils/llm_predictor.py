@@ -0,0 +1,171 @@
+import hashlib
+import json
+import re
+from django.conf import settings
+from django.core.cache import caches
+import logging
+
+from . import llm_integration
+from .rate_limiter import coalesce
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prompt or the expected answer format changes
+PROMPT_VERSION = 3
+# Seconds a prediction is reused for the same snapshot bucket; override with settings.LLM_CACHE_SECONDS
+CACHE_SECONDS = 900
+# Snapshots are bucketed before caching, so small moves reuse the last answer
+PRICE_BUCKET_PCT = 0.5
+SENTIMENT_BUCKET = 0.1
+# Headlines included in the prompt
+TOP_K_HEADLINES = 5
+MAX_HEADLINE_CHARS = 200
+MAX_TOKENS = 150
+
+DIRECTIONS = ('up', 'down', 'flat')
+
+SYSTEM_PROMPT = (
+    "You are a cautious equity analyst. You are given a ticker's price move today, "
+    "the mean VADER sentiment of recent headlines and the most informative headlines. "
+    "Predict the price direction over the next trading day. Reply with only one JSON object: "
+    '{"ticker": str, "direction": "up" | "down" | "flat", "confidence": number between 0 and 1, '
+    '"explanation": one or two sentences}.'
+)
+
+def _bucket(value, size):
+    return None if value is None else round(round(value / size) * size, 4)
+
+def cache_key(snapshot, model=None):
+    """Builds the cache key for a snapshot: ticker, bucketed price move and sentiment, prompt version and model."""
+    model = model or getattr(settings, 'OPENROUTER_MODEL', llm_integration.DEFAULT_MODEL)
+    parts = [
+        snapshot['ticker'],
+        _bucket(snapshot.get('change_percent'), PRICE_BUCKET_PCT),
+        _bucket(snapshot.get('sentiment'), SENTIMENT_BUCKET),
+        model,
+    ]
+    digest = hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).hexdigest()
+    return f"llm:v{PROMPT_VERSION}:{digest}"
+
+def _normalize_title(title):
+    return ' '.join(re.findall(r'[a-z0-9]+', (title or '').lower()))
+
+def select_headlines(articles, k=TOP_K_HEADLINES):
+    """Picks the k most informative headlines: the strongest sentiment, newest first on ties.
+
+    Near-duplicates (the same title syndicated by several outlets) are kept once.
+
+    Args:
+        articles (list): Analyzed article dicts with 'title' and 'sentiment'.
+        k (int): Number of headlines to keep.
+
+    Returns:
+        list: Up to k article dicts.
+    """
+    ranked = sorted(
+        articles,
+        key=lambda a: (abs(a.get('sentiment') or 0), a.get('publishedAt') or ''),
+        reverse=True,
+    )
+    selected = {}
+    for article in ranked:
+        key = _normalize_title(article.get('title'))
+        if key and key not in selected:
+            selected[key] = article
+            if len(selected) == k:
+                break
+    return list(selected.values())
+
+def _format_snapshot(snapshot):
+    lines = [f"Ticker: {snapshot['ticker']}"]
+    if snapshot.get('price') is not None:
+        lines.append(f"Price: {snapshot['price']:.2f} ({snapshot.get('change_percent') or 0:+.2f}% today)")
+    if snapshot.get('sentiment') is not None:
+        lines.append(f"News sentiment: {snapshot['sentiment']:+.3f} mean over {snapshot.get('headline_count', 0)} headlines")
+    headlines = select_headlines(snapshot.get('headlines') or [])
+    if headlines:
+        lines.append("Headlines:")
+        for article in headlines:
+            title = (article.get('title') or '')[:MAX_HEADLINE_CHARS]
+            lines.append(f"- [{article.get('sentiment') or 0:+.2f}] {title} ({article.get('source') or 'unknown'})")
+    return '\n'.join(lines)
+
+def build_messages(snapshot):
+    """Builds the chat prompt for one ticker's snapshot."""
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': _format_snapshot(snapshot)},
+    ]
+
+def parse_prediction(text, ticker):
+    """Extracts the prediction from the model's JSON answer for a ticker.
+
+    Returns:
+        dict: 'direction', 'confidence' and 'explanation', or None if the answer
+              has no valid object for the ticker.
+    """
+    match = re.search(r'\{.*\}', text or '', re.DOTALL)
+    if not match:
+        logger.warning(f"No JSON object in LLM answer: {text!r}")
+        return None
+    try:
+        item = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        logger.warning(f"Unparseable LLM answer ({e}): {text!r}")
+        return None
+    if not isinstance(item, dict):
+        return None
+    direction = str(item.get('direction', '')).lower()
+    # A missing ticker is accepted: the prompt only asks about one
+    if str(item.get('ticker') or ticker).upper() != ticker or direction not in DIRECTIONS:
+        logger.warning(f"LLM answer does not match the expected format: {text!r}")
+        return None
+    try:
+        confidence = min(max(float(item.get('confidence', 0)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        confidence = None
+    return {
+        'direction': direction,
+        'confidence': confidence,
+        'explanation': str(item.get('explanation') or ''),
+    }
+
+def _request(snapshot, on_token=None):
+    text = llm_integration.chat(build_messages(snapshot), max_tokens=MAX_TOKENS, on_token=on_token)
+    return parse_prediction(text, snapshot['ticker'])
+
+def predict(snapshot, on_token=None):
+    """Returns the LLM prediction for one ticker's snapshot.
+
+    Snapshots whose bucketed inputs were answered within CACHE_SECONDS are served
+    from the 'results' cache, and concurrent requests for the same snapshot
+    bucket share one call. The answer is streamed: `on_token` receives its text
+    as it is generated (only the caller that makes the call gets the pieces;
+    cached and shared answers arrive whole).
+
+    Args:
+        snapshot (dict): 'ticker' and optionally 'price', 'change_percent',
+                         'sentiment', 'headline_count' and 'headlines' (analyzed articles).
+        on_token (callable): Called with each text piece of a fresh answer, or None.
+
+    Returns:
+        dict: 'ticker', 'direction', 'confidence', 'explanation' and 'cached', or
+              None if there is no snapshot or the model gave no valid answer.
+    """
+    if not snapshot:
+        return None
+    cache = caches['results']
+    key = cache_key(snapshot)
+    hit = cache.get(key)
+    if hit is not None:
+        return dict(hit, cached=True)
+    try:
+        answer = coalesce(('llm', key), _request, snapshot, on_token)
+    except Exception as e:
+        logger.error(f"Error predicting {snapshot['ticker']} with the LLM: {e}", exc_info=True)
+        return None
+    if answer is None:
+        return None
+    prediction = dict(answer, ticker=snapshot['ticker'])
+    cache.set(key, prediction, timeout=getattr(settings, 'LLM_CACHE_SECONDS', CACHE_SECONDS))
+    return dict(prediction, cached=False)
@@ -0,0 +1,294 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import joblib
+from django.conf import settings
+from sklearn.ensemble import RandomForestClassifier
+import logging
+
+from .correlation_analyzer import align_inputs
+
+logger = logging.getLogger(__name__)
+
+# Bump when features, targets or the model change, so stale cache files are ignored
+FEATURE_VERSION = 1
+
+RETURN_LAGS = (1, 2, 3, 5, 10)
+FEATURE_NAMES = (
+    [f'return_lag_{lag}' for lag in RETURN_LAGS]
+    + ['momentum_5', 'momentum_20', 'volatility_10', 'sentiment', 'sentiment_3d', 'has_news']
+)
+# Walk-forward evaluation: an expanding training window followed by
+# WALK_FORWARD_FOLDS consecutive out-of-sample test blocks
+WALK_FORWARD_FOLDS = 5
+MIN_TRAIN_ROWS = 60
+
+# Feature matrices kept per ticker, and models per ticker and horizon; older
+# versions are deleted
+CACHED_VERSIONS = 10
+MODELS_KEPT = 2
+# Price bars the latest feature row is built from (the longest lookback is 20 returns)
+LATEST_FEATURE_BARS = 30
+
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 5,
+    'min_samples_leaf': 5,
+    'random_state': 42,
+    'n_jobs': -1,
+}
+
+def _ml_dir(kind):
+    path = settings.VAR_DIR / 'ml' / kind
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def _atomic_write(path, write):
+    """Writes a file through a temporary file and a rename, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _prune(directory, pattern, keep=CACHED_VERSIONS):
+    """Deletes all but the `keep` most recently written files matching pattern."""
+    paths = sorted(directory.glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+def data_version(prices):
+    """Fingerprints a ticker's price series for a range.
+
+    The version only changes when bars are added (or revised), so feature
+    matrices keyed by it are rebuilt when new bars arrive and not on every training run.
+
+    Args:
+        prices (pandas.Series): Adjusted close prices indexed by date.
+
+    Returns:
+        str: A short hex digest.
+    """
+    prices = prices.dropna()
+    parts = [str(FEATURE_VERSION), str(len(prices))]
+    if len(prices):
+        parts += [str(prices.index[0].date()), str(prices.index[-1].date()), f"{prices.iloc[-1]:.6f}"]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+def build_features(prices, sentiment=None):
+    """Builds the feature matrix for one ticker.
+
+    Row t only uses what is known at the close of day t: returns up to t and
+    the news sentiment assigned to t (see correlation_analyzer.align_inputs).
+
+    Args:
+        prices (pandas.Series): Adjusted close prices, indexed by trading day.
+        sentiment (pandas.Series): Mean daily sentiment (calendar days), or None.
+
+    Returns:
+        tuple: (dates, features) - a DatetimeIndex and a float32 array of shape
+               (len(dates), len(FEATURE_NAMES)).
+    """
+    if sentiment is None:
+        sentiment = pd.Series(dtype=float)
+    returns, aligned = align_inputs(prices.to_frame('value'), sentiment.to_frame('value'))
+    returns, aligned = returns['value'], aligned['value']
+
+    columns = {f'return_lag_{lag}': returns.shift(lag - 1) for lag in RETURN_LAGS}
+    columns['momentum_5'] = returns.rolling(5).sum()
+    columns['momentum_20'] = returns.rolling(20).sum()
+    columns['volatility_10'] = returns.rolling(10).std()
+    columns['sentiment'] = aligned.fillna(0.0)
+    columns['sentiment_3d'] = aligned.rolling(3, min_periods=1).mean().fillna(0.0)
+    columns['has_news'] = aligned.notna().astype(float)
+    # Rows before the longest lookback is filled are dropped
+    features = pd.DataFrame(columns, index=returns.index)[FEATURE_NAMES].dropna()
+    return features.index, features.to_numpy(dtype=np.float32)
+
+def latest_features(prices, sentiment=None):
+    """Builds only the feature row for a series' last bar, from its last LATEST_FEATURE_BARS bars.
+
+    Returns:
+        tuple: (as_of, features) - the last bar's date and a 1 x features float32
+               array; None if the series is too short.
+    """
+    prices = prices.dropna().iloc[-LATEST_FEATURE_BARS:]
+    if sentiment is not None and len(prices):
+        sentiment = sentiment[sentiment.index > prices.index[0]]
+    dates, features = build_features(prices, sentiment)
+    if not len(dates) or dates[-1] != prices.index[-1]:
+        return None
+    return dates[-1], features[-1:]
+
+def load_features(ticker, prices, sentiment=None):
+    """Returns a ticker's feature matrix, building it once per (ticker, range, data version).
+
+    Matrices are cached as uncompressed float32 .npz files in VAR_DIR/ml/features.
+    Sentiment is read when the matrix is built; news arriving later is picked up
+    with the next bar.
+
+    Returns:
+        tuple: (dates, features, closes) - closes are the prices on the feature
+               rows' dates, from which targets are derived.
+    """
+    prices = prices.dropna()
+    path = _ml_dir('features') / f"{ticker}_{data_version(prices)}.npz"
+    if path.exists():
+        try:
+            with np.load(path) as cached:
+                return pd.DatetimeIndex(cached['dates']), cached['features'], cached['closes']
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable feature cache {path}: {e}")
+
+    dates, features = build_features(prices, sentiment)
+    closes = prices.reindex(dates).to_numpy(dtype=float)
+    _atomic_write(path, lambda f: np.savez(
+        f, dates=dates.values.astype('datetime64[D]'), features=features, closes=closes
+    ))
+    _prune(path.parent, f"{ticker}_*.npz")
+    return dates, features, closes
+
+def make_targets(closes, horizon):
+    """Labels each row 1 if the price is higher `horizon` trading days later, else 0.
+
+    Returns:
+        numpy.ndarray: Float labels; NaN for the last `horizon` rows, whose outcome is unknown.
+    """
+    targets = np.full(len(closes), np.nan)
+    if len(closes) > horizon:
+        targets[:-horizon] = (closes[horizon:] > closes[:-horizon]).astype(float)
+    return targets
+
+def walk_forward(features, targets, horizon, folds=WALK_FORWARD_FOLDS, min_train=MIN_TRAIN_ROWS):
+    """Evaluates the model out of sample with an expanding window.
+
+    Each fold trains on every labelled row before the test block and tests on
+    the block. `horizon` rows are left out between the two, since those rows'
+    labels look into the test period.
+
+    Returns:
+        dict: 'accuracy' (over all test rows), 'baseline' (always predicting
+              the majority class of each training set), 'folds' and 'test_rows';
+              None if there is too little labelled data.
+    """
+    labelled = np.flatnonzero(~np.isnan(targets))
+    n = len(labelled)
+    if n < min_train + folds:
+        return None
+    edges = np.linspace(min_train, n, folds + 1).astype(int)
+    correct = baseline = tested = 0
+    for start, end in zip(edges[:-1], edges[1:]):
+        train = labelled[:max(start - horizon, 0)]
+        test = labelled[start:end]
+        if len(train) < min_train // 2 or not len(test) or len(np.unique(targets[train])) < 2:
+            continue
+        model = RandomForestClassifier(**MODEL_PARAMS).fit(features[train], targets[train])
+        predicted = model.predict(features[test])
+        correct += int((predicted == targets[test]).sum())
+        majority = float(targets[train].mean() >= 0.5)
+        baseline += int((targets[test] == majority).sum())
+        tested += len(test)
+    if not tested:
+        return None
+    return {
+        'accuracy': correct / tested,
+        'baseline': baseline / tested,
+        'folds': folds,
+        'test_rows': tested,
+    }
+
+def _model_path(ticker, horizon, last_bar):
+    # The date sorts lexically, so the newest model has the greatest name
+    return _ml_dir('models') / f"{ticker}_h{horizon}_v{FEATURE_VERSION}_{last_bar:%Y%m%d}.joblib"
+
+def has_model(ticker, horizon, last_bar):
+    """Whether a model trained through `last_bar` is stored for a ticker and horizon."""
+    return _model_path(ticker, horizon, last_bar).exists()
+
+def latest_model_path(ticker, horizon, as_of=None):
+    """Returns the path of the newest stored model for a ticker and horizon, or None.
+
+    With `as_of`, only models whose last bar is on or before that date count, so
+    a past range is never predicted by a model that has seen what came after it.
+    """
+    paths = sorted(_ml_dir('models').glob(f"{ticker}_h{horizon}_v{FEATURE_VERSION}_*.joblib"))
+    if as_of is not None:
+        limit = _model_path(ticker, horizon, as_of).name
+        paths = [path for path in paths if path.name <= limit]
+    return paths[-1] if paths else None
+
+def train_model(ticker, prices, sentiment=None, horizon=1):
+    """Runs walk-forward evaluation, fits the final model and persists it with joblib.
+
+    Models are keyed by ticker, horizon and the date of the last price bar, so
+    training again before a new bar arrives is skipped (see refresher.refresh_models).
+
+    Args:
+        ticker (str): Stock ticker symbol.
+        prices (pandas.Series): The ticker's stored adjusted close prices.
+        sentiment (pandas.Series): Mean daily sentiment for the ticker, or None.
+        horizon (int): Prediction horizon in trading days.
+
+    Returns:
+        dict: The saved bundle - 'model', 'ticker', 'horizon', 'last_bar',
+              'feature_names', 'trained_through' and 'metrics' - or None if
+              there is not enough data.
+    """
+    prices = prices.dropna()
+    dates, features, closes = load_features(ticker, prices, sentiment)
+    targets = make_targets(closes, horizon)
+    labelled = ~np.isnan(targets)
+    if labelled.sum() < MIN_TRAIN_ROWS or len(np.unique(targets[labelled])) < 2:
+        logger.info(f"Not enough history to train a {horizon}-day model for {ticker}.")
+        return None
+
+    metrics = walk_forward(features, targets, horizon)
+    model = RandomForestClassifier(**MODEL_PARAMS).fit(features[labelled], targets[labelled])
+    last_bar = prices.index[-1].date()
+    bundle = {
+        'model': model,
+        'ticker': ticker,
+        'horizon': horizon,
+        'last_bar': last_bar,
+        'feature_names': FEATURE_NAMES,
+        'trained_through': dates[labelled][-1].date(),
+        'metrics': metrics,
+    }
+    path = _model_path(ticker, horizon, last_bar)
+    _atomic_write(path, lambda f: joblib.dump(bundle, f))
+    _prune(path.parent, f"{ticker}_h{horizon}_*.joblib", keep=MODELS_KEPT)
+    logger.info(f"Trained {horizon}-day model for {ticker} through {last_bar}: {metrics}")
+    return bundle
+
+def load_model(path):
+    """Loads a stored model bundle (see train_model); None if it cannot be read."""
+    try:
+        return joblib.load(path)
+    except Exception as e:
+        logger.warning(f"Failed to load model {path}: {e}")
+        return None
+
+def make_prediction(bundle, as_of, latest):
+    """Turns a model bundle and the latest feature row (1 x features) into a prediction dict."""
+    model = bundle['model']
+    probabilities = model.predict_proba(latest)[0]
+    probability_up = float(probabilities[list(model.classes_).index(1.0)]) if 1.0 in model.classes_ else 0.0
+    metrics = bundle['metrics'] or {}
+    return {
+        'ticker': bundle['ticker'],
+        'horizon': bundle['horizon'],
+        'as_of': as_of.date(),
+        'probability_up': probability_up,
+        'direction': 'Up' if probability_up >= 0.5 else 'Down',
+        'accuracy': metrics.get('accuracy'),
+        'baseline': metrics.get('baseline'),
+    }
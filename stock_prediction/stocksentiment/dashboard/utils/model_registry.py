@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.conf import settings
+from django.db import connections
+import logging
+
+from . import ml_model, refresher
+
+logger = logging.getLogger(__name__)
+
+# Models (ticker, horizon, last bar) kept in memory per worker process
+DEFAULT_REGISTRY_SIZE = 32
+# Recent per-prediction latencies kept for the percentiles in stats()
+LATENCY_SAMPLES = 1000
+
+class ModelRegistry:
+    """Per-process LRU of loaded model bundles.
+
+    Models are trained outside the request path (see refresher.refresh_models)
+    and stored per ticker, horizon and last price bar. Each model file is loaded
+    from disk the first time it is requested and then served from memory. A
+    range is predicted by the newest model whose last bar is not after the
+    range's last bar. A ticker with no stored model at all is queued for
+    training in the background, and predicted once that finishes.
+    """
+
+    def __init__(self, max_size=DEFAULT_REGISTRY_SIZE):
+        self.max_size = max_size
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per model file, so concurrent requests load each model only once
+        self._loading = {}
+        # Tickers queued for or in background training
+        self._training = set()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.evictions = 0
+        self.predictions = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def _get_cached(self, path):
+        with self._lock:
+            if path in self._models:
+                self._models.move_to_end(path)
+                return self._models[path]
+        return None
+
+    def _put(self, path, bundle):
+        with self._lock:
+            self._models[path] = bundle
+            self._models.move_to_end(path)
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+                self.evictions += 1
+
+    def get_model(self, ticker, horizon, as_of=None):
+        """Returns the newest stored model bundle for a ticker and horizon, loading it on a miss.
+
+        Args:
+            ticker (str): Stock ticker symbol.
+            horizon (int): Prediction horizon in trading days.
+            as_of (datetime.date): If given, only models trained on bars up to
+                                   this date are considered.
+
+        Returns:
+            dict: A bundle as returned by ml_model.train_model, or None if no
+                  such model has been trained.
+        """
+        path = ml_model.latest_model_path(ticker, horizon, as_of)
+        if path is None:
+            return None
+        bundle = self._get_cached(path)
+        if bundle is not None:
+            with self._lock:
+                self.hits += 1
+            return bundle
+
+        with self._lock:
+            self.misses += 1
+            key_lock = self._loading.setdefault(path, threading.Lock())
+        try:
+            with key_lock:
+                # Another thread may have loaded it while we waited
+                bundle = self._get_cached(path)
+                if bundle is None:
+                    started = time.perf_counter()
+                    bundle = ml_model.load_model(path)
+                    elapsed = time.perf_counter() - started
+                    with self._lock:
+                        self.loads += 1
+                        self.load_seconds += elapsed
+                    logger.info(f"Loaded {horizon}-day model for {ticker} in {elapsed:.3f}s.")
+                    if bundle is not None:
+                        # Single-row predictions are faster without joblib's worker pool
+                        bundle['model'].n_jobs = 1
+                        self._put(path, bundle)
+        finally:
+            with self._lock:
+                self._loading.pop(path, None)
+        return bundle
+
+    def _train_in_background(self, ticker, horizons):
+        with self._lock:
+            if ticker in self._training:
+                return
+            self._training.add(ticker)
+        logger.info(f"No stored model for {ticker}; training in the background.")
+        _training_executor.submit(self._train, ticker, horizons)
+
+    def _train(self, ticker, horizons):
+        try:
+            refresher.refresh_models([ticker], horizons)
+        except Exception as e:
+            logger.error(f"Error training models for {ticker}: {e}", exc_info=True)
+        finally:
+            connections.close_all()
+            with self._lock:
+                self._training.discard(ticker)
+
+    def training(self, tickers):
+        """Returns the tickers among `tickers` whose models are being trained in the background."""
+        with self._lock:
+            return [ticker for ticker in tickers if ticker in self._training]
+
+    def predict(self, stock_data, ticker_sentiment, horizons):
+        """Predicts every ticker column of stock_data for every horizon in one call.
+
+        Each ticker's latest feature row is built once, from the end of its
+        price series, and shared by its horizons. Only models trained on bars
+        up to that row's date are used, so past ranges get no prediction from
+        models that have seen their future. Tickers with no stored model for
+        some horizon are queued for background training.
+
+        Args:
+            stock_data (pandas.DataFrame): Adjusted close prices, one column per ticker.
+            ticker_sentiment (pandas.DataFrame): Mean daily sentiment per ticker (may be empty).
+            horizons (list): Prediction horizons in trading days.
+
+        Returns:
+            list: Prediction dicts as returned by ml_model.make_prediction;
+                  tickers or horizons without a usable model or enough data are skipped.
+        """
+        predictions = []
+        for ticker in stock_data.columns:
+            prices = stock_data[ticker].dropna()
+            sentiment = ticker_sentiment[ticker] if ticker in ticker_sentiment.columns else None
+            try:
+                latest = ml_model.latest_features(prices, sentiment)
+                if latest is None:
+                    continue
+                for horizon in horizons:
+                    bundle = self.get_model(ticker, horizon, latest[0].date())
+                    if bundle is None:
+                        if ml_model.latest_model_path(ticker, horizon) is None:
+                            self._train_in_background(ticker, horizons)
+                        continue
+                    started = time.perf_counter()
+                    predictions.append(ml_model.make_prediction(bundle, *latest))
+                    elapsed = time.perf_counter() - started
+                    with self._lock:
+                        self.predictions += 1
+                        self._latencies.append(elapsed)
+            except Exception as e:
+                logger.error(f"Error predicting {ticker}: {e}", exc_info=True)
+        return predictions
+
+    def stats(self):
+        """Returns the registry's counters for this worker process.
+
+        Returns:
+            dict: 'pid', 'size', 'max_size', 'models' (ticker:horizon:last bar), 'hits', 'misses', 'hit_rate', 'loads',
+                  'avg_load_ms', 'evictions', 'predictions' and 'predict_ms'
+                  (p50/p95/max over the last LATENCY_SAMPLES predictions).
+        """
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            lookups = self.hits + self.misses
+            return {
+                'pid': os.getpid(),
+                'size': len(self._models),
+                'max_size': self.max_size,
+                'models': [f"{b['ticker']}:{b['horizon']}d:{b['last_bar']}" for b in self._models.values()],
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'loads': self.loads,
+                'avg_load_ms': round(self.load_seconds * 1000 / self.loads, 3) if self.loads else None,
+                'evictions': self.evictions,
+                'predictions': self.predictions,
+                'predict_ms': {
+                    'p50': round(float(np.percentile(latencies, 50)), 3),
+                    'p95': round(float(np.percentile(latencies, 95)), 3),
+                    'max': round(float(latencies.max()), 3),
+                } if len(latencies) else None,
+            }
+
+    def clear(self):
+        """Drops all loaded models and resets the counters."""
+        with self._lock:
+            self._models.clear()
+            self._reset_stats()
+
+# Background training runs one job at a time per process
+_training_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-training')
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """Returns this process's ModelRegistry (sized by settings.MODEL_REGISTRY_SIZE)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(getattr(settings, 'MODEL_REGISTRY_SIZE', DEFAULT_REGISTRY_SIZE))
+        return _registry
+
+def predict(stock_data, ticker_sentiment, horizons):
+    """Batched prediction through the process-wide registry (see ModelRegistry.predict)."""
+    return get_registry().predict(stock_data, ticker_sentiment, horizons)
+
+def training(tickers):
+    """Tickers whose models the process-wide registry is training (see ModelRegistry.training)."""
+    return get_registry().training(tickers)
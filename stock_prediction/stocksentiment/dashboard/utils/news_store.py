@@ -0,0 +1,337 @@
+import hashlib
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timezone as dt_timezone
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from newsapi.newsapi_exception import NewsAPIException
+import logging
+
+from ..models import ArticleMention, NewsArticle, NewsQuery
+from .rate_limiter import RateLimitExceeded, coalesce
+from .records import Article
+from . import instrumentation, sentiment_store
+
+logger = logging.getLogger(__name__)
+
+NEWSAPI_DATETIME_FMT = '%Y-%m-%dT%H:%M:%S'
+PUBLISHED_AT_FMT = '%Y-%m-%dT%H:%M:%SZ'
+
+# Maximum number of results fetched for a single query window
+MAX_FETCH = 500
+PAGE_SIZE = 100  # NewsAPI's maximum page size
+
+# Pages requested ahead of the one being consumed; bounds memory however large max_fetch is
+PREFETCH_PAGES = 4
+
+# Shared pool for fetching the pages of a result set in parallel
+_page_executor = ThreadPoolExecutor(max_workers=PREFETCH_PAGES, thread_name_prefix='newsapi-page')
+
+def make_query(tickers):
+    """Builds the NewsAPI query string for a set of tickers.
+
+    Tickers are sorted so 'AAPL OR MSFT' and 'MSFT OR AAPL' share one store entry.
+    """
+    return " OR ".join(sorted(tickers))
+
+def article_hash(article):
+    """Returns the dedup key for a raw or cleaned article dict.
+
+    The URL identifies an article across queries and syndication; articles
+    without one fall back to a hash of their title, source and timestamp.
+    """
+    url = article.get('url')
+    if url:
+        key = url
+    else:
+        source = article.get('source')
+        if isinstance(source, dict):
+            source = source.get('name')
+        key = f"{article.get('title')}|{source}|{article.get('publishedAt')}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def _window(from_date, to_date):
+    """Converts an inclusive date range into aware UTC datetimes [start, end]."""
+    start = datetime.combine(from_date, time.min, tzinfo=dt_timezone.utc)
+    end = datetime.combine(to_date, time.max.replace(microsecond=0), tzinfo=dt_timezone.utc)
+    return start, end
+
+def _fetch_page(newsapi, query, from_dt, to_dt, page):
+    """Requests one page of NewsAPI /everything results, returning the response dict."""
+    instrumentation.count('newsapi_calls')
+    try:
+        return newsapi.get_everything(
+            q=query,
+            from_param=from_dt.strftime(NEWSAPI_DATETIME_FMT),
+            to=to_dt.strftime(NEWSAPI_DATETIME_FMT),
+            language='en',
+            sort_by='publishedAt',
+            page_size=PAGE_SIZE,
+            page=page
+        )
+    except NewsAPIException as e:
+        return e.get_exception()
+    except RateLimitExceeded as e:
+        return {'status': 'error', 'code': 'rateLimited', 'message': str(e)}
+
+def _log_api_error(response, query, from_dt):
+    # Log the specific error from NewsAPI
+    api_error_code = response.get('code')
+    api_error_message = response.get('message') or ''
+    logger.error(f"NewsAPI error (Code: {api_error_code}): {api_error_message}")
+    # Specific handling for date range issue
+    if api_error_code == 'parameterInvalid' and 'too far in the past' in api_error_message:
+        logger.warning(f"NewsAPI lookback limit likely exceeded. Requested news from {from_dt} for '{query}'.")
+
+class PageStream:
+    """Iterates over NewsAPI /everything results for one time window, a page at a time.
+
+    The first page is fetched on its own to learn totalResults; up to
+    PREFETCH_PAGES following pages are then requested in parallel and yielded in
+    page order as they complete, so only a few pages are held in memory at once.
+    After iteration, `status` is 'complete', 'truncated' (hit max_fetch or the
+    plan's result limit, so the oldest part of the window is missing) or 'error'.
+
+    Args:
+        newsapi (NewsApiClient): The client to use.
+        query (str): NewsAPI query string.
+        from_dt (datetime): Oldest publishedAt to request (UTC).
+        to_dt (datetime): Newest publishedAt to request (UTC).
+        max_fetch (int): Cap on the number of articles fetched.
+    """
+
+    def __init__(self, newsapi, query, from_dt, to_dt, max_fetch=MAX_FETCH):
+        self.newsapi = newsapi
+        self.query = query
+        self.from_dt = from_dt
+        self.to_dt = to_dt
+        self.max_fetch = max_fetch
+        self.status = None
+        self.fetched = 0
+
+    def _page(self, page):
+        return _fetch_page(self.newsapi, self.query, self.from_dt, self.to_dt, page)
+
+    def _prefetch(self, page):
+        """Fetches a page on a pool thread, closing the DB connections its quota accounting opened."""
+        try:
+            return self._page(page)
+        finally:
+            connections.close_all()
+
+    def _take(self, articles):
+        articles = articles[:self.max_fetch - self.fetched]
+        self.fetched += len(articles)
+        return articles
+
+    def __iter__(self):
+        first = self._page(1)
+        if first.get('status') != 'ok':
+            _log_api_error(first, self.query, self.from_dt)
+            self.status = 'error'
+            return
+        total_results = first.get('totalResults', 0)
+        last_page = math.ceil(min(total_results, self.max_fetch) / PAGE_SIZE)
+        articles = self._take(first.get('articles', []))
+        if articles:
+            yield articles
+
+        pending = deque()
+        next_page = 2
+        try:
+            while articles:
+                while next_page <= last_page and len(pending) < PREFETCH_PAGES:
+                    pending.append(instrumentation.submit_in_context(_page_executor, self._prefetch, next_page))
+                    next_page += 1
+                if not pending:
+                    break
+                response = pending.popleft().result()
+                if response.get('status') != 'ok':
+                    if response.get('code') == 'maximumResultsReached':
+                        # Plan limit on results per query: what we have is the newest slice
+                        logger.warning(f"NewsAPI result limit reached for '{self.query}' after {self.fetched} articles.")
+                        self.status = 'truncated'
+                    else:
+                        _log_api_error(response, self.query, self.from_dt)
+                        # Only the contiguous pages received before the failure were yielded
+                        self.status = 'error'
+                    return
+                articles = self._take(response.get('articles', []))
+                if articles:
+                    yield articles
+        finally:
+            for future in pending:
+                future.cancel()
+        self.status = 'truncated' if self.fetched < total_results else 'complete'
+
+def save_articles(raw_articles, news_query=None):
+    """Upserts raw NewsAPI articles, one row per URL hash.
+
+    Args:
+        raw_articles (list): Article dicts as returned by NewsAPI.
+        news_query (NewsQuery): If given, the articles are linked to this query,
+                                attributed to its tickers and scored.
+
+    Returns:
+        list: Ids of the distinct articles in the batch.
+    """
+    by_hash = {}
+    for article in raw_articles:
+        by_hash.setdefault(article_hash(article), article)
+    if not by_hash:
+        return []
+
+    articles = [
+        NewsArticle(
+            url_hash=key,
+            url=article.get('url') or '',
+            title=article.get('title') or '',
+            description=article.get('description') or '',
+            source=(article.get('source') or {}).get('name') or '',
+            published_at=parse_datetime(article['publishedAt']) if article.get('publishedAt') else None,
+        )
+        for key, article in by_hash.items()
+    ]
+    NewsArticle.objects.bulk_create(
+        articles,
+        update_conflicts=True,
+        unique_fields=['url_hash'],
+        update_fields=['url', 'title', 'description', 'source', 'published_at'],
+    )
+
+    ids = list(NewsArticle.objects.filter(url_hash__in=list(by_hash)).values_list('pk', flat=True))
+    if news_query is not None:
+        Through = NewsQuery.articles.through
+        Through.objects.bulk_create(
+            [Through(newsquery_id=news_query.pk, newsarticle_id=pk) for pk in ids],
+            ignore_conflicts=True,
+        )
+        sentiment_store.ingest_articles(ids, news_query.tickers)
+    return ids
+
+def _newest(raw_articles):
+    stamps = [parse_datetime(a['publishedAt']) for a in raw_articles if a.get('publishedAt')]
+    return max(stamps) if stamps else None
+
+def _oldest(raw_articles):
+    stamps = [parse_datetime(a['publishedAt']) for a in raw_articles if a.get('publishedAt')]
+    return min(stamps) if stamps else None
+
+def refresh_query(newsapi, tickers, from_date, to_date):
+    """Fetches from NewsAPI only the parts of a window not already stored.
+
+    Two gaps can exist around the stored range: articles newer than the query's
+    publishedAt high-water mark, and articles older than covered_from. A third,
+    the pending span inside it, exists when an earlier forward fetch was
+    truncated by the result cap.
+    Concurrent refreshes of the same query and window (e.g. several users
+    opening the same page) share one fetch.
+
+    Args:
+        newsapi (NewsApiClient): The client to use.
+        tickers (list): Tickers making up the query.
+        from_date (datetime.date): First day of the window.
+        to_date (datetime.date): Last day of the window (inclusive).
+
+    Returns:
+        int: Number of NewsAPI windows fetched (0 if fully served from the store).
+    """
+    query = make_query(tickers)
+    return coalesce(('news', query, from_date, to_date), _refresh_query, newsapi, query, from_date, to_date)
+
+def _refresh_query(newsapi, query, from_date, to_date):
+    start, end = _window(from_date, to_date)
+    news_query, _ = NewsQuery.objects.get_or_create(query=query)
+    fetches = 0
+
+    if news_query.covered_from is None:
+        gaps = [(start, end)]
+    else:
+        gaps = []
+        # A span left missing by an earlier truncated fetch comes first, so a
+        # truncated forward gap below can record a new one
+        if news_query.pending_from is not None and news_query.pending_from < end and news_query.pending_to > start:
+            gaps.append((news_query.pending_from, news_query.pending_to))
+        high_water = news_query.newest_published_at or news_query.covered_from
+        if end > high_water:
+            gaps.append((high_water, end))
+        if start < news_query.covered_from:
+            gaps.append((start, news_query.covered_from))
+
+    for gap_start, gap_end in gaps:
+        logger.info(f"News store: fetching '{query}' from {gap_start} to {gap_end}")
+        pages = PageStream(newsapi, query, gap_start, gap_end)
+        newest = oldest = None
+        # Each page is stored as it arrives, so memory stays flat as the result cap grows
+        for raw_articles in pages:
+            with transaction.atomic():
+                save_articles(raw_articles, news_query)
+            page_newest, page_oldest = _newest(raw_articles), _oldest(raw_articles)
+            if page_newest and (newest is None or page_newest > newest):
+                newest = page_newest
+            if page_oldest and (oldest is None or page_oldest < oldest):
+                oldest = page_oldest
+        fetches += 1
+        if pages.status == 'error':
+            continue
+        is_pending = (gap_start, gap_end) == (news_query.pending_from, news_query.pending_to)
+        # Results are newest-first, so a truncated fetch is complete from `oldest` up
+        received_from = (oldest or gap_end) if pages.status == 'truncated' else gap_start
+        if is_pending:
+            news_query.pending_to = received_from if received_from > gap_start else None
+            news_query.pending_from = gap_start if news_query.pending_to else None
+        elif news_query.covered_from is None or gap_end <= news_query.covered_from:
+            # The first fetch, or the gap before covered_from: the received span adjoins the stored range
+            if news_query.covered_from is None or received_from < news_query.covered_from:
+                news_query.covered_from = received_from
+        elif received_from > gap_start:
+            # A truncated forward gap: [gap_start, received_from) is missing below the new articles
+            if news_query.pending_from is not None:
+                gap_start = min(gap_start, news_query.pending_from)
+                received_from = max(received_from, news_query.pending_to)
+            news_query.pending_from, news_query.pending_to = gap_start, received_from
+            logger.warning(f"News store: '{query}' is missing {gap_start} to {received_from}; fetching it next refresh.")
+        if newest and (news_query.newest_published_at is None or newest > news_query.newest_published_at):
+            news_query.newest_published_at = newest
+        news_query.last_fetched_at = timezone.now()
+        news_query.save()
+    return fetches
+
+def iter_articles(tickers, from_date, to_date, chunk_size=500):
+    """Streams stored articles for a query window, newest first.
+
+    An 'A OR B' query matches the union of the 'A' and 'B' queries, so articles
+    stored under the combined query, under any single-ticker query, or attributed
+    to one of the tickers from another combined query (such as the one kept warm
+    by the refresh_market_data command) are all returned, once each. Rows are
+    read from the database `chunk_size` at a time.
+
+    Yields:
+        Article: Cleaned article records ('publishedAt', 'title', 'description',
+                 'source' and 'url'), matching what NewsAPI callers expect.
+    """
+    start, end = _window(from_date, to_date)
+    queries = {make_query(tickers)} | set(tickers)
+    mentioned = ArticleMention.objects.filter(ticker__in=tickers).values('article_id')
+    rows = NewsArticle.objects.filter(
+        Q(queries__query__in=queries) | Q(pk__in=mentioned), published_at__gte=start, published_at__lte=end
+    ).distinct().order_by('-published_at').values_list('published_at', 'title', 'description', 'source', 'url')
+    for published_at, title, description, source, url in rows.iterator(chunk_size=chunk_size):
+        yield Article(
+            publishedAt=published_at.astimezone(dt_timezone.utc).strftime(PUBLISHED_AT_FMT) if published_at else None,
+            title=title,
+            description=description,
+            source=source,
+            url=url,
+        )
+
+def load_articles(tickers, from_date, to_date):
+    """Reads stored articles for a query window, newest first (see iter_articles).
+
+    Returns:
+        list: Article records.
+    """
+    return list(iter_articles(tickers, from_date, to_date))
@@ -0,0 +1,253 @@
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+import logging
+
+from ..models import PriceBar
+from . import price_store
+
+logger = logging.getLogger(__name__)
+
+# Fields stored in the cube, in axis order (PriceBar field names)
+FIELDS = tuple(price_store.FIELD_MAP.values())
+# Rows read from the price store at a time while building
+BUILD_CHUNK_SIZE = 20000
+# Built cubes kept on disk; older files are removed (processes still mapping them keep their copy)
+KEEP_VERSIONS = 2
+
+def _cube_dir():
+    path = settings.VAR_DIR / 'price_cube'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def _pointer_path():
+    return _cube_dir() / 'current.json'
+
+def _save_array(path, array):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def _forward_fill(values):
+    """Forward-fills NaNs along axis 0 of a 2D array in place; leading NaNs are kept."""
+    rows = np.where(np.isnan(values), 0, np.arange(values.shape[0])[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    values[:] = values[rows, np.arange(values.shape[1])]
+
+class PriceCube:
+    """Read-only (field x date x ticker) float64 price array, memory-mapped from disk.
+
+    Every worker process maps the same file, so the prices share one copy in the
+    OS page cache however many workers there are. Prices are forward-filled
+    along the date axis when the cube is built, and `observed` marks the
+    (date, ticker) cells that had a bar of their own. The cube covers
+    [start, complete_through) for its `universe` of tickers. Values are kept in
+    float64, like the price store, so a range read from either gives the same
+    prices (and the same ml_model.data_version).
+    """
+
+    def __init__(self, meta, values, observed):
+        self.version = meta['version']
+        self.universe = set(meta['universe'])
+        self.tickers = meta['tickers']
+        self.fields = meta['fields']
+        self.start = pd.Timestamp(meta['start'])
+        self.complete_through = pd.Timestamp(meta['complete_through'])
+        self.dates = pd.DatetimeIndex(meta['dates'], name='Date')
+        self.values = values
+        self.observed = observed
+        self._ticker_index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+
+    @classmethod
+    def load(cls, meta):
+        directory = _cube_dir()
+        values = np.load(directory / f"{meta['version']}.npy", mmap_mode='r')
+        observed = np.load(directory / f"{meta['version']}-observed.npy", mmap_mode='r')
+        return cls(meta, values, observed)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.observed.nbytes
+
+    def covers(self, tickers, start_date, end_date):
+        """Whether the cube holds everything stored for tickers in [start_date, end_date).
+
+        Every ticker must also have bars of its own in the range: a ticker whose
+        fetch failed when the cube was built is in the universe but has no data,
+        and is read from the price store instead.
+        """
+        if not (
+            all(ticker in self.universe for ticker in tickers)
+            and self.start <= pd.Timestamp(start_date)
+            and pd.Timestamp(end_date) <= self.complete_through
+        ):
+            return False
+        first, last = self.dates.searchsorted(pd.Timestamp(start_date)), self.dates.searchsorted(pd.Timestamp(end_date))
+        if first >= last:
+            return False
+        for ticker in tickers:
+            position = self._ticker_index.get(ticker)
+            if position is None or not self.observed[first:last, position].any():
+                return False
+        return True
+
+    def frame(self, tickers, start_date, end_date, field='adj_close'):
+        """Returns a wide (dates x tickers) frame for [start_date, end_date).
+
+        The frame is a view onto the mapped file when the tickers are adjacent
+        in the cube and every date in the range has a bar for one of them (the
+        usual case); otherwise only the requested cells are copied. Dates none
+        of the tickers traded on and tickers with no bar in the range are
+        dropped, and leading gaps are back-filled, as for stored prices.
+
+        Returns:
+            pandas.DataFrame: Read-only float64 prices, or None if there are none.
+        """
+        columns = [ticker for ticker in tickers if ticker in self._ticker_index]
+        first, last = self.dates.searchsorted(pd.Timestamp(start_date)), self.dates.searchsorted(pd.Timestamp(end_date))
+        if not columns or first >= last:
+            return None
+        positions = [self._ticker_index[ticker] for ticker in columns]
+        # Keep only tickers with a bar of their own in the range
+        traded = self.observed[first:last, positions].any(axis=0)
+        positions = [p for p, keep in zip(positions, traded) if keep]
+        columns = [c for c, keep in zip(columns, traded) if keep]
+        if not positions:
+            return None
+        if positions == list(range(positions[0], positions[0] + len(positions))):
+            cols = slice(positions[0], positions[-1] + 1)
+        else:
+            cols = positions
+        # Cubes written by older versions hold float32; those are copied to float64
+        block = self.values[self._field_index[field]][first:last, cols].astype(np.float64, copy=False)
+        index = self.dates[first:last]
+        rows = self.observed[first:last, cols].any(axis=1)
+        if not rows.all():
+            block, index = block[rows], index[rows]
+        data = pd.DataFrame(block, index=index, columns=columns, copy=False)
+        if np.isnan(block[0]).any():
+            data = data.bfill()
+        return data
+
+_current = None
+_current_mtime = None
+_lock = threading.Lock()
+
+def get_cube():
+    """Returns this process's mapping of the latest cube, or None if none was built.
+
+    The pointer file is checked on every call (one stat), so workers pick up a
+    cube the refresher has just written without restarting.
+    """
+    global _current, _current_mtime
+    try:
+        mtime = os.stat(_pointer_path()).st_mtime_ns
+    except OSError:
+        return None
+    with _lock:
+        if mtime != _current_mtime:
+            try:
+                with open(_pointer_path()) as f:
+                    _current = PriceCube.load(json.load(f))
+                _current_mtime = mtime
+            except Exception as e:
+                logger.error(f"Error mapping the price cube: {e}", exc_info=True)
+                return None
+        return _current
+
+def get_frame(tickers, start_date, end_date, field='adj_close'):
+    """Returns prices from the cube if it covers the request, else None (read the price store instead).
+
+    Args:
+        tickers (list): A list of stock ticker symbols.
+        start_date (datetime.date or str): Inclusive start date.
+        end_date (datetime.date or str): Exclusive end date.
+        field (str): PriceBar field to return.
+    """
+    cube = get_cube()
+    start_date, end_date = price_store._to_date(start_date), price_store._to_date(end_date)
+    if cube is None or not cube.covers(tickers, start_date, end_date):
+        return None
+    return cube.frame(tickers, start_date, end_date, field=field)
+
+def build(tickers, start_date, end_date):
+    """Writes a new cube of the stored prices for tickers in [start_date, end_date) and publishes it.
+
+    Only completed days are included (see price_store's coverage limit), so a
+    cube never serves a bar that is still changing. The arrays are written next
+    to the previous cube and then swapped in by replacing the pointer file, so
+    readers never see a partial cube.
+
+    Returns:
+        dict: The cube's metadata ('version', 'tickers', 'dates', 'nbytes', ...).
+    """
+    start_date, end_date = price_store._to_date(start_date), price_store._to_date(end_date)
+    end_date = min(end_date, price_store._coverage_limit())
+    rows = PriceBar.objects.filter(
+        ticker__in=tickers, date__gte=start_date, date__lt=end_date
+    ).values_list('ticker', 'date', *FIELDS).iterator(chunk_size=BUILD_CHUNK_SIZE)
+    df = pd.DataFrame.from_records(rows, columns=['ticker', 'date', *FIELDS])
+    df = df[df['adj_close'].notna()]
+
+    cube_tickers = sorted(df['ticker'].unique())
+    dates = pd.DatetimeIndex(sorted(df['date'].unique()))
+    values = np.full((len(FIELDS), len(dates), len(cube_tickers)), np.nan, dtype=np.float64)
+    observed = np.zeros((len(dates), len(cube_tickers)), dtype=bool)
+    if len(df):
+        date_pos = dates.searchsorted(pd.DatetimeIndex(df['date']))
+        ticker_pos = pd.Index(cube_tickers).get_indexer(df['ticker'])
+        observed[date_pos, ticker_pos] = True
+        for i, field in enumerate(FIELDS):
+            values[i, date_pos, ticker_pos] = df[field].to_numpy(dtype=np.float64, na_value=np.nan)
+            _forward_fill(values[i])
+
+    version = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    directory = _cube_dir()
+    _save_array(directory / f"{version}.npy", values)
+    _save_array(directory / f"{version}-observed.npy", observed)
+    meta = {
+        'version': version,
+        'universe': sorted(set(tickers)),
+        'tickers': cube_tickers,
+        'fields': list(FIELDS),
+        'start': start_date.isoformat(),
+        'complete_through': end_date.isoformat(),
+        'dates': [d.date().isoformat() for d in dates],
+        'nbytes': values.nbytes + observed.nbytes,
+        'built_at': timezone.now().isoformat(),
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _pointer_path())
+    _remove_old_versions(version)
+    logger.info(f"Price cube {version}: {len(cube_tickers)} tickers x {len(dates)} dates ({meta['nbytes']} bytes).")
+    return meta
+
+def _remove_old_versions(current):
+    versions = sorted({path.name.split('-')[0].split('.')[0] for path in _cube_dir().glob('*.npy')})
+    old = [v for v in versions if v != current][:-(KEEP_VERSIONS - 1) or None]
+    for version in old:
+        for path in _cube_dir().glob(f"{version}*.npy"):
+            path.unlink(missing_ok=True)
+
+def stats():
+    """Returns the mapped cube's version, shape and size for the metrics endpoint."""
+    cube = get_cube()
+    if cube is None:
+        return {'version': None}
+    return {
+        'version': cube.version,
+        'tickers': len(cube.tickers),
+        'dates': len(cube.dates),
+        'start': cube.start.date().isoformat(),
+        'complete_through': cube.complete_through.date().isoformat(),
+        'nbytes': cube.nbytes,
+    }
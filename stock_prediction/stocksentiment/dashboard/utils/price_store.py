@@ -0,0 +1,314 @@
+import yfinance as yf
+import pandas as pd
+import math
+from datetime import datetime, date, timedelta
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from ..models import PriceBar, PriceCoverage
+from . import instrumentation
+from .rate_limiter import coalesce
+
+logger = logging.getLogger(__name__)
+
+# yfinance column name -> PriceBar field
+FIELD_MAP = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Adj Close': 'adj_close',
+    'Volume': 'volume',
+}
+
+# An empty download for a gap longer than this is treated as a provider failure
+# rather than a stretch of weekends/holidays, and is not recorded as covered.
+MAX_EMPTY_GAP_DAYS = 4
+
+# Each gap download also re-fetches the nearest stored bar on either side (within
+# this many days) to check it was not revised. A dividend or split after the last
+# refresh re-adjusts the whole history, so a changed bar means the ticker's stored
+# bars are stale. Actions dated inside the gap are already reflected in the stored prices.
+OVERLAP_LOOKBACK_DAYS = 10
+# Relative difference below which a re-downloaded price counts as unchanged
+REVISION_TOLERANCE = 1e-6
+
+
+def _to_date(value):
+    """Converts a 'YYYY-MM-DD' string, datetime or date into a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _coverage_limit():
+    """Returns the exclusive upper bound of dates that can be marked as covered.
+
+    Today's bar is still changing while the market is open, so only completed
+    days are recorded; requests that include today always re-fetch that day.
+    """
+    return timezone.now().date()
+
+
+def missing_ranges(ticker, start_date, end_date):
+    """Returns the parts of [start_date, end_date) not yet stored for a ticker.
+
+    Args:
+        ticker (str): Stock ticker symbol.
+        start_date (datetime.date): Inclusive start of the requested range.
+        end_date (datetime.date): Exclusive end of the requested range.
+
+    Returns:
+        list: A list of (start, end) date tuples, half-open, in ascending order.
+    """
+    gaps = []
+    cursor = start_date
+    covered = PriceCoverage.objects.filter(
+        ticker=ticker, end_date__gt=start_date, start_date__lt=end_date
+    ).order_by('start_date')
+    for cov in covered:
+        if cov.start_date > cursor:
+            gaps.append((cursor, cov.start_date))
+        cursor = max(cursor, cov.end_date)
+        if cursor >= end_date:
+            break
+    if cursor < end_date:
+        gaps.append((cursor, end_date))
+    return gaps
+
+
+def _record_coverage(ticker, start_date, end_date):
+    """Marks [start_date, end_date) as covered, merging with overlapping/adjacent ranges."""
+    end_date = min(end_date, _coverage_limit())
+    if start_date >= end_date:
+        return
+    with transaction.atomic():
+        touching = list(PriceCoverage.objects.select_for_update().filter(
+            ticker=ticker, end_date__gte=start_date, start_date__lte=end_date
+        ))
+        for cov in touching:
+            start_date = min(start_date, cov.start_date)
+            end_date = max(end_date, cov.end_date)
+        PriceCoverage.objects.filter(pk__in=[cov.pk for cov in touching]).delete()
+        PriceCoverage.objects.create(ticker=ticker, start_date=start_date, end_date=end_date)
+
+
+def _split_download(full_data, tickers):
+    """Splits a yf.download result into one OHLCV frame per ticker.
+
+    Handles both the MultiIndex (field, ticker) layout and the flat layout
+    older yfinance versions return for a single ticker.
+    """
+    frames = {}
+    if full_data is None or full_data.empty:
+        return frames
+    if isinstance(full_data.columns, pd.MultiIndex):
+        available = full_data.columns.get_level_values(1)
+        for ticker in tickers:
+            if ticker in available:
+                frames[ticker] = full_data.xs(ticker, axis=1, level=1)
+    elif len(tickers) == 1:
+        frames[tickers[0]] = full_data
+    return frames
+
+
+def _save_bars(ticker, frame):
+    """Upserts the rows of a single-ticker OHLCV frame into PriceBar.
+
+    Returns:
+        int: Number of bars written (rows with no Adj Close are skipped).
+    """
+    if 'Adj Close' not in frame.columns:
+        logger.error(f"'Adj Close' column not found in downloaded data for {ticker}. Available: {frame.columns}")
+        return 0
+    frame = frame.dropna(subset=['Adj Close'])
+    columns = [column for column in FIELD_MAP if column in frame.columns]
+    fields = [FIELD_MAP[column] for column in columns]
+    # Convert once per frame; NaN -> None so missing values are stored as NULL
+    values = frame[columns].astype(object).where(frame[columns].notna(), None)
+    bars = []
+    for ts, row in zip(frame.index, values.itertuples(index=False, name=None)):
+        bar = dict(zip(fields, row))
+        if bar.get('volume') is not None:
+            bar['volume'] = int(bar['volume'])
+        bars.append(PriceBar(ticker=ticker, date=ts.date(), **bar))
+    if bars:
+        PriceBar.objects.bulk_create(
+            bars,
+            update_conflicts=True,
+            unique_fields=['ticker', 'date'],
+            update_fields=list(FIELD_MAP.values()),
+        )
+    return len(bars)
+
+
+def _download(tickers, start_date, end_date):
+    """Calls yf.download for [start_date, end_date)."""
+    instrumentation.count('yfinance_calls')
+    return yf.download(
+        tickers,
+        start=start_date.isoformat(),
+        end=end_date.isoformat(),
+        auto_adjust=False,  # keep 'Adj Close' alongside the raw OHLC columns
+        progress=False,
+    )
+
+
+def _overlap_bars(ticker, start_date, end_date):
+    """Returns the stored bars nearest to a gap on either side, within OVERLAP_LOOKBACK_DAYS."""
+    window = timedelta(days=OVERLAP_LOOKBACK_DAYS)
+    bars = PriceBar.objects.filter(ticker=ticker)
+    before = bars.filter(date__lt=start_date, date__gte=start_date - window).order_by('-date').first()
+    after = bars.filter(date__gte=end_date, date__lt=end_date + window).order_by('date').first()
+    return [bar for bar in (before, after) if bar is not None]
+
+
+def _is_revised(bar, frame):
+    """Whether the provider now has other prices for a stored bar than the ones stored."""
+    if frame is None or frame.empty:
+        return False
+    row = frame[frame.index.date == bar.date]
+    if row.empty:
+        return False
+    for column, field in (('Adj Close', 'adj_close'), ('Close', 'close')):
+        fetched, stored = row[column].iloc[0] if column in row.columns else None, getattr(bar, field)
+        if fetched is None or pd.isna(fetched) or stored is None:
+            continue
+        if not math.isclose(float(fetched), stored, rel_tol=REVISION_TOLERANCE):
+            return True
+    return False
+
+
+def _refetch_history(ticker, end_date):
+    """Deletes a ticker's stored bars and coverage and downloads the same span again.
+
+    Returns:
+        int: Number of bars written.
+    """
+    coverage = list(PriceCoverage.objects.filter(ticker=ticker).values_list('start_date', 'end_date'))
+    if not coverage:
+        return 0
+    start_date = min(start for start, _ in coverage)
+    end_date = max([end_date] + [end for _, end in coverage])
+    logger.warning(f"Price store: {ticker} was revised (split or dividend); re-downloading [{start_date}, {end_date})")
+    frames = _split_download(_download([ticker], start_date, end_date), [ticker])
+    if ticker not in frames:
+        logger.error(f"Re-download of {ticker} returned no data; keeping its stored bars.")
+        return 0
+    with transaction.atomic():
+        PriceBar.objects.filter(ticker=ticker).delete()
+        PriceCoverage.objects.filter(ticker=ticker).delete()
+        written = _save_bars(ticker, frames[ticker])
+    if written:
+        _record_coverage(ticker, start_date, end_date)
+    return written
+
+
+def _fetch_gap(tickers, start_date, end_date):
+    """Downloads one date gap for a group of tickers and stores the result.
+
+    The download is widened to the stored bars next to the gap; if one of them
+    has changed, the ticker's whole stored history is downloaded again so its
+    adjusted prices have no seam.
+
+    Returns:
+        int: Number of bars written.
+    """
+    logger.info(f"Price store: downloading {tickers} for [{start_date}, {end_date})")
+    overlaps = {ticker: _overlap_bars(ticker, start_date, end_date) for ticker in tickers}
+    overlap_dates = [bar.date for bars in overlaps.values() for bar in bars]
+    full_data = _download(
+        tickers,
+        min([start_date] + overlap_dates),
+        max([end_date] + [day + timedelta(days=1) for day in overlap_dates]),
+    )
+    frames = _split_download(full_data, tickers)
+    short_gap = (end_date - start_date).days <= MAX_EMPTY_GAP_DAYS
+    total = 0
+    for ticker in tickers:
+        frame = frames.get(ticker)
+        if any(_is_revised(bar, frame) for bar in overlaps[ticker]):
+            total += _refetch_history(ticker, end_date)
+            continue
+        if frame is not None:
+            frame = frame[(frame.index.date >= start_date) & (frame.index.date < end_date)]
+        written = _save_bars(ticker, frame) if frame is not None else 0
+        total += written
+        if written or short_gap:
+            _record_coverage(ticker, start_date, end_date)
+        else:
+            logger.warning(f"No price data downloaded for {ticker} in [{start_date}, {end_date}); not marking as covered.")
+    return total
+
+
+def ensure_coverage(tickers, start_date, end_date):
+    """Fetches from the provider only the date ranges not already stored.
+
+    Tickers sharing the same gap are downloaded together in one yf.download call,
+    and concurrent requests for the same download share it.
+
+    Args:
+        tickers (list): A list of stock ticker symbols.
+        start_date (datetime.date or str): Inclusive start date.
+        end_date (datetime.date or str): Exclusive end date (as in yfinance).
+
+    Returns:
+        int: Number of bars downloaded and written.
+    """
+    start_date, end_date = _to_date(start_date), _to_date(end_date)
+    gaps_to_tickers = {}
+    for ticker in tickers:
+        for gap in missing_ranges(ticker, start_date, end_date):
+            gaps_to_tickers.setdefault(gap, []).append(ticker)
+    written = 0
+    for (gap_start, gap_end), gap_tickers in gaps_to_tickers.items():
+        key = ('prices', tuple(sorted(gap_tickers)), gap_start, gap_end)
+        written += coalesce(key, _fetch_gap, gap_tickers, gap_start, gap_end)
+    return written
+
+
+def load_prices(tickers, start_date, end_date, field='adj_close'):
+    """Reads stored prices as a wide DataFrame (dates x tickers).
+
+    Args:
+        tickers (list): A list of stock ticker symbols.
+        start_date (datetime.date or str): Inclusive start date.
+        end_date (datetime.date or str): Exclusive end date.
+        field (str): PriceBar field to return (default 'adj_close').
+
+    Returns:
+        pandas.DataFrame: One column per ticker that has data, indexed by date.
+                          Empty if nothing is stored for the range.
+    """
+    start_date, end_date = _to_date(start_date), _to_date(end_date)
+    rows = PriceBar.objects.filter(
+        ticker__in=tickers, date__gte=start_date, date__lt=end_date
+    ).values_list('date', 'ticker', field)
+    df = pd.DataFrame.from_records(list(rows), columns=['Date', 'Ticker', field])
+    if df.empty:
+        return pd.DataFrame()
+    data = df.pivot(index='Date', columns='Ticker', values=field)
+    data.index = pd.DatetimeIndex(data.index, name='Date')
+    data.columns.name = None
+    return data[[t for t in tickers if t in data.columns]]
+
+
+def get_prices(tickers, start_date, end_date, field='adj_close', fetch_missing=True):
+    """Returns stored prices for a range, downloading only the missing gaps first.
+
+    Args:
+        tickers (list): A list of stock ticker symbols.
+        start_date (datetime.date or str): Inclusive start date.
+        end_date (datetime.date or str): Exclusive end date.
+        field (str): PriceBar field to return.
+        fetch_missing (bool): If False, serve whatever is stored without network calls.
+
+    Returns:
+        pandas.DataFrame: Wide price frame (see load_prices).
+    """
+    if fetch_missing:
+        ensure_coverage(tickers, start_date, end_date)
+    return load_prices(tickers, start_date, end_date, field=field)
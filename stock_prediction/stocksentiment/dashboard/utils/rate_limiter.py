@@ -0,0 +1,156 @@
+import threading
+import time
+from concurrent.futures import Future
+import requests
+from django.db.models import F
+from django.utils import timezone
+import logging
+
+from ..models import ApiQuotaUsage
+
+logger = logging.getLogger(__name__)
+
+class RateLimitExceeded(requests.RequestException):
+    """Raised when a provider's call budget has no room within the allowed wait."""
+
+class QuotaExhausted(RateLimitExceeded):
+    """Raised when a provider's daily quota is used up; callers should fall back to stored data."""
+
+class TokenBucket:
+    """Thread-safe token bucket: `capacity` calls in a burst, refilled at `rate` calls per second."""
+
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, max_wait):
+        """Takes one token, waiting up to max_wait seconds for the bucket to refill.
+
+        Raises:
+            RateLimitExceeded: If no token becomes available within max_wait.
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                raise RateLimitExceeded(f"Rate limit for {self.name} reached ({self.rate * 60:g} calls per minute).")
+            time.sleep(wait)
+
+    def available(self):
+        """Returns the number of whole tokens currently in the bucket."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return int(self._tokens)
+
+class QuotaLedger:
+    """Persisted daily call counter for one provider (see ApiQuotaUsage).
+
+    Days are UTC days. A limit of None means the provider has no daily quota;
+    calls are still counted so usage can be reported.
+    """
+
+    def __init__(self, provider, daily_limit):
+        self.provider = provider
+        self.daily_limit = daily_limit
+
+    def _today(self):
+        return timezone.now().date()
+
+    def consume(self):
+        """Records one call, refusing it if today's quota is used up.
+
+        Raises:
+            QuotaExhausted: If the daily limit is reached or the provider reported exhaustion.
+        """
+        usage, _ = ApiQuotaUsage.objects.get_or_create(provider=self.provider, day=self._today())
+        calls = ApiQuotaUsage.objects.filter(pk=usage.pk, exhausted=False)
+        if self.daily_limit is not None:
+            # Conditional increment, so concurrent workers can't overshoot the limit
+            calls = calls.filter(used__lt=self.daily_limit)
+        if not calls.update(used=F('used') + 1, updated_at=timezone.now()):
+            raise QuotaExhausted(f"Daily quota for {self.provider} is used up ({self.daily_limit} calls).")
+
+    def mark_exhausted(self):
+        """Records that the provider reported today's quota as used up (e.g. an HTTP 429)."""
+        usage, _ = ApiQuotaUsage.objects.get_or_create(provider=self.provider, day=self._today())
+        if not usage.exhausted:
+            logger.warning(f"{self.provider} reports its daily quota as exhausted; serving stored data until tomorrow (UTC).")
+            ApiQuotaUsage.objects.filter(pk=usage.pk).update(exhausted=True, updated_at=timezone.now())
+
+    def status(self):
+        """Returns today's usage: 'provider', 'day', 'used', 'limit', 'remaining' and 'exhausted'."""
+        usage = ApiQuotaUsage.objects.filter(provider=self.provider, day=self._today()).first()
+        used = usage.used if usage else 0
+        exhausted = bool(usage and usage.exhausted) or (self.daily_limit is not None and used >= self.daily_limit)
+        return {
+            'provider': self.provider,
+            'day': self._today(),
+            'used': used,
+            'limit': self.daily_limit,
+            'remaining': None if self.daily_limit is None else (0 if exhausted else self.daily_limit - used),
+            'exhausted': exhausted,
+        }
+
+    def has_quota(self):
+        return not self.status()['exhausted']
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in flight
+    wait for it and receive the same result (or exception). Only calls that
+    overlap in time are merged; nothing is cached afterwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            logger.debug(f"Joining in-flight call {key}.")
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+_single_flight = SingleFlight()
+
+def coalesce(key, func, *args, **kwargs):
+    """Runs func(*args, **kwargs), sharing the call with concurrent callers using the same key."""
+    return _single_flight.do(key, func, *args, **kwargs)
+
+def coalescing_stats():
+    """Returns how many upstream calls ran and how many duplicate callers joined them."""
+    return {'calls': _single_flight.calls, 'coalesced': _single_flight.coalesced}
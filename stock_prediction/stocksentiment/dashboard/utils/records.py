@@ -0,0 +1,41 @@
+from collections import namedtuple
+
+# Fields of a cleaned article, named as in NewsAPI responses
+ARTICLE_FIELDS = ('publishedAt', 'title', 'description', 'source', 'url')
+
+class _RecordMixin:
+    """Dict-style read access, so records can be passed where article dicts are expected."""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return self._asdict()
+
+class Article(_RecordMixin, namedtuple('Article', ARTICLE_FIELDS)):
+    """Compact, immutable cleaned article: only the fields views and scoring read."""
+    __slots__ = ()
+
+class ScoredArticle(_RecordMixin, namedtuple('ScoredArticle', ARTICLE_FIELDS + ('sentiment', 'sentiment_label'))):
+    """An Article with its VADER compound score and label."""
+    __slots__ = ()
+
+def clean_article(raw):
+    """Builds an Article from a raw NewsAPI article dict."""
+    source = raw.get('source')
+    return Article(
+        publishedAt=raw.get('publishedAt'),
+        title=raw.get('title'),
+        description=raw.get('description'),
+        source=source.get('name') if isinstance(source, dict) else source,
+        url=raw.get('url'),
+    )
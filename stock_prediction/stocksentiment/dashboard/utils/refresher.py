@@ -0,0 +1,109 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+import logging
+
+from . import api_clients, ml_model, price_cube, price_store, news_store, sentiment_store
+
+logger = logging.getLogger(__name__)
+
+def refresh_prices(tickers, years=3):
+    """Brings the price store up to date for the last `years` years (including today).
+
+    Returns:
+        int: Number of ticker gaps that still had to be downloaded.
+    """
+    today = timezone.now().date()
+    start_date = today - timedelta(days=years * 365)
+    end_date = today + timedelta(days=1)  # yfinance's end is exclusive
+    gaps = sum(len(price_store.missing_ranges(t, start_date, end_date)) for t in tickers)
+    price_store.ensure_coverage(tickers, start_date, end_date)
+    return gaps
+
+def refresh_news(tickers, days_lookback=28):
+    """Brings the news store up to date with one combined query for all tickers.
+
+    Stored articles are attributed to the tickers their headlines mention, so a
+    single fetch serves per-ticker sentiment and page views for any subset of
+    the tickers. NewsAPI calls go through the shared 'newsapi' client, so they
+    draw on the same rate-limit budget as page views.
+
+    Returns:
+        int: Number of NewsAPI query windows fetched.
+    """
+    newsapi = api_clients.get_newsapi_client()
+    if newsapi is None:
+        logger.error("NewsAPI key not found in settings; skipping news refresh.")
+        return 0
+    if not api_clients.has_quota('newsapi'):
+        logger.warning("NewsAPI daily quota used up; skipping news refresh.")
+        return 0
+    to_date = timezone.now().date()
+    from_date = to_date - timedelta(days=days_lookback)
+    try:
+        return news_store.refresh_query(newsapi, tickers, from_date, to_date)
+    except Exception as e:
+        logger.error(f"Error refreshing news for {tickers}: {e}", exc_info=True)
+        return 0
+
+def refresh_models(tickers, horizons=None):
+    """Trains a model per ticker and horizon on the stored history, if a new bar arrived since the last one.
+
+    Models are trained on the last settings.ML_TRAINING_YEARS years of stored
+    prices and news sentiment, and page views only load them (see model_registry).
+
+    Returns:
+        int: Number of models trained.
+    """
+    horizons = horizons or settings.ML_HORIZONS
+    today = timezone.now().date()
+    start_date = today - timedelta(days=getattr(settings, 'ML_TRAINING_YEARS', 3) * 365)
+    prices = price_store.load_prices(tickers, start_date, today + timedelta(days=1))
+    sentiment = sentiment_store.load_daily_sentiment(tickers, start_date, today)
+    trained = 0
+    for ticker in prices.columns:
+        series = prices[ticker].dropna()
+        if series.empty:
+            continue
+        last_bar = series.index[-1].date()
+        ticker_sentiment = sentiment[ticker] if ticker in sentiment.columns else None
+        for horizon in horizons:
+            if ml_model.has_model(ticker, horizon, last_bar):
+                continue
+            try:
+                if ml_model.train_model(ticker, series, ticker_sentiment, horizon) is not None:
+                    trained += 1
+            except Exception as e:
+                logger.error(f"Error training a {horizon}-day model for {ticker}: {e}", exc_info=True)
+    return trained
+
+def refresh_all(tickers, years=3, news_days=28):
+    """Refreshes prices and news for tickers, rebuilds the shared price cube, retrains
+    models on new bars and drops cached page results.
+
+    Returns:
+        dict: 'price_gaps', 'news_fetches', 'cube_bytes', 'models_trained' and 'seconds' for the run.
+    """
+    started = time.monotonic()
+    stats = {'price_gaps': 0, 'news_fetches': 0, 'cube_bytes': 0, 'models_trained': 0}
+    try:
+        stats['price_gaps'] = refresh_prices(tickers, years)
+    except Exception as e:
+        logger.error(f"Error refreshing prices for {tickers}: {e}", exc_info=True)
+    try:
+        today = timezone.now().date()
+        meta = price_cube.build(tickers, today - timedelta(days=years * 365), today)
+        stats['cube_bytes'] = meta['nbytes']
+    except Exception as e:
+        logger.error(f"Error building the price cube for {tickers}: {e}", exc_info=True)
+    stats['news_fetches'] = refresh_news(tickers, news_days)
+    try:
+        stats['models_trained'] = refresh_models(tickers)
+    except Exception as e:
+        logger.error(f"Error training models for {tickers}: {e}", exc_info=True)
+    # Cached results were computed from the previous data
+    caches['results'].clear()
+    stats['seconds'] = round(time.monotonic() - started, 2)
+    return stats
@@ -0,0 +1,63 @@
+import hashlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+from django.core.cache import caches
+from django.utils import timezone
+import logging
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_CLOSE = time(16, 0)
+# Time allowed after the close for the day's bars and news to reach the providers
+SETTLE_DELAY = timedelta(minutes=30)
+
+# Bump when the shape of cached results changes
+RESULT_VERSION = 6
+
+def _cache():
+    return caches['results']
+
+def make_key(view_name, tickers, start_date, end_date, **params):
+    """Builds a cache key from a normalized request.
+
+    Ticker order and duplicates don't matter, and dates are compared as ISO strings,
+    so equivalent requests (including shared links) hit the same entry.
+    """
+    parts = [
+        view_name,
+        ','.join(sorted(set(tickers))),
+        str(start_date),
+        str(end_date),
+    ] + [f"{name}={params[name]}" for name in sorted(params)]
+    digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+    return f"{view_name}:v{RESULT_VERSION}:{digest}"
+
+def seconds_until_refresh(now=None):
+    """Returns how long a result stays valid: until the next market close has settled.
+
+    Data only changes once a trading day's bars and news are in, so results expire
+    SETTLE_DELAY after the next weekday 16:00 New York close (holidays are treated
+    as trading days, which only costs an early refresh).
+    """
+    now = (now or timezone.now()).astimezone(MARKET_TZ)
+    refresh_at = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TZ) + SETTLE_DELAY
+    while refresh_at <= now or refresh_at.weekday() >= 5:
+        refresh_at += timedelta(days=1)
+    # Subtract in UTC: same-zone aware arithmetic ignores DST changes in between
+    remaining = refresh_at.astimezone(dt_timezone.utc) - now.astimezone(dt_timezone.utc)
+    return max(int(remaining.total_seconds()), 1)
+
+def load(key):
+    """Returns the cached result for a key, or None."""
+    result = _cache().get(key)
+    instrumentation.count('result_cache_hit' if result is not None else 'result_cache_miss')
+    return result
+
+def store(key, result):
+    """Caches a result until the next market close has settled."""
+    timeout = seconds_until_refresh()
+    logger.info(f"Caching result {key} for {timeout}s.")
+    _cache().set(key, result, timeout=timeout)
@@ -1,12 +1,139 @@
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+import hashlib
+import threading
+import numpy as np
 import pandas as pd
 import logging
 
+from . import instrumentation, ticker_matcher
+from .records import Article, ScoredArticle
+
 logger = logging.getLogger(__name__)
 
 # Initialize VADER analyzer
 analyzer = SentimentIntensityAnalyzer()
 
+# Columns of the frame returned by score_texts, in VADER's order
+SCORE_COLUMNS = ['neg', 'neu', 'pos', 'compound']
+
+# Articles scored per batch when scoring a stream (see iter_analyzed)
+SCORE_BATCH_SIZE = 1000
+
+# Number of distinct texts whose scores are kept in memory
+SCORE_CACHE_SIZE = 50000
+
+class ScoreCache:
+    """Thread-safe bounded LRU cache of VADER scores keyed by a hash of the text."""
+
+    def __init__(self, maxsize=SCORE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """Returns a dict of the cached score rows for the given keys."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                row = self._data.get(key)
+                if row is not None:
+                    self._data.move_to_end(key)
+                    found[key] = row
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Stores score rows, evicting the least recently used ones beyond maxsize."""
+        with self._lock:
+            for key, row in items.items():
+                self._data[key] = row
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+score_cache = ScoreCache()
+
+# Per-process analyzer used by the parallel scoring workers
+_worker_analyzer = None
+
+def _init_worker():
+    """ProcessPoolExecutor initializer: builds one VADER analyzer per worker process."""
+    global _worker_analyzer
+    _worker_analyzer = SentimentIntensityAnalyzer()
+
+def _score_chunk(texts):
+    """Scores a chunk of texts inside a worker process.
+
+    Returns:
+        list: One (neg, neu, pos, compound) tuple per text, or None where analysis failed.
+    """
+    rows = []
+    for text in texts:
+        try:
+            vs = _worker_analyzer.polarity_scores(text)
+            rows.append(tuple(vs[col] for col in SCORE_COLUMNS))
+        except Exception:
+            rows.append(None)
+    return rows
+
+def _score_serial(texts):
+    rows = []
+    for text in texts:
+        vs = analyze_sentiment_vader(text)
+        rows.append(None if vs is None else tuple(vs[col] for col in SCORE_COLUMNS))
+    return rows
+
+def _score_parallel(texts, workers, chunk_size):
+    """Scores texts across a process pool, preserving input order."""
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    logger.info(f"Scoring {len(texts)} texts in {len(chunks)} chunks over {workers} processes.")
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for chunk_rows in pool.map(_score_chunk, chunks):
+            rows.extend(chunk_rows)
+    return rows
+
+def _score_uncached(texts, workers=None, chunk_size=None):
+    """Scores texts with VADER, in parallel when the batch is large enough.
+
+    Args:
+        texts (list): Distinct strings to score.
+        workers (int): Worker processes; defaults to settings.SENTIMENT_WORKERS.
+                       1 (the default) always scores in this process.
+        chunk_size (int): Texts per task; defaults to settings.SENTIMENT_CHUNK_SIZE.
+
+    Returns:
+        list: One score tuple (or None on failure) per text, in input order.
+    """
+    workers = workers or getattr(settings, 'SENTIMENT_WORKERS', 1)
+    chunk_size = chunk_size or getattr(settings, 'SENTIMENT_CHUNK_SIZE', 500)
+    # Small batches are cheaper to score here than to ship to a pool
+    if workers <= 1 or len(texts) <= chunk_size:
+        return _score_serial(texts)
+    try:
+        return _score_parallel(texts, workers, chunk_size)
+    except Exception as e:
+        logger.error(f"Parallel sentiment scoring failed, falling back to serial: {e}", exc_info=True)
+        return _score_serial(texts)
+
+def text_key(text):
+    """Returns the cache key for a text (SHA-1 digest of its UTF-8 bytes)."""
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
 def analyze_sentiment_vader(text):
     """Analyzes the sentiment of a single text using VADER.
 
@@ -26,61 +153,144 @@ def analyze_sentiment_vader(text):
         logger.error(f"Error analyzing sentiment for text: '{text[:50]}...': {e}", exc_info=True)
         return None
 
-def analyze_headlines_sentiment(articles):
-    """Analyzes sentiment for a list of news articles (dictionaries).
+def score_texts(texts, workers=None, chunk_size=None):
+    """Scores a batch of texts with VADER, scoring each distinct text only once.
 
-    Adds 'sentiment' (VADER compound score) and 'sentiment_label' (Positive/Negative/Neutral)
-    to each article dictionary.
+    Duplicate texts within the batch are collapsed before scoring, and texts seen
+    in earlier batches are served from the in-memory score cache. The remaining
+    texts are spread over a process pool when `workers` > 1; results are
+    identical to the serial path.
 
     Args:
-        articles (list): A list of article dictionaries (expecting 'title' and 'description').
+        texts (list or pandas.Series): The texts to analyze. Non-string entries
+                                       (None, NaN) are allowed and yield NaN scores.
+        workers (int): Worker processes for uncached texts (see _score_uncached).
+        chunk_size (int): Texts per worker task.
 
     Returns:
-        list: The list of articles with added sentiment information.
-              Returns an empty list if input is invalid.
+        pandas.DataFrame: One row per input text (same index as a Series input)
+                          with float columns 'neg', 'neu', 'pos' and 'compound'.
+                          Rows are NaN where the input was not a string or
+                          analysis failed.
     """
-    if not isinstance(articles, list):
-        logger.error("Invalid input: articles must be a list.")
-        return []
+    texts = texts if isinstance(texts, pd.Series) else pd.Series(list(texts), dtype=object)
+    result = np.full((len(texts), len(SCORE_COLUMNS)), np.nan)
 
-    analyzed_articles = []
-    for article in articles:
-        if not isinstance(article, dict):
-            logger.warning("Skipping non-dictionary item in articles list.")
-            continue
+    is_text = texts.map(lambda t: isinstance(t, str)).to_numpy(dtype=bool)
+    if is_text.any():
+        codes, uniques = pd.factorize(texts[is_text])
+        keys = [text_key(t) for t in uniques]
+        unique_scores = np.full((len(uniques), len(SCORE_COLUMNS)), np.nan)
 
-        # Combine title and description for better context, handle missing values
-        title = article.get('title', '') or ''
-        description = article.get('description', '') or ''
-        text_to_analyze = f"{title}. {description}".strip()
+        cached = score_cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        instrumentation.count('score_cache_hit', len(cached))
+        instrumentation.count('score_cache_miss', len(missing))
+        with instrumentation.span('vader'):
+            fresh_rows = _score_uncached([uniques[i] for i in missing], workers, chunk_size)
+        fresh = {}
+        for i, row in zip(missing, fresh_rows):
+            if row is not None:
+                fresh[keys[i]] = row
+        score_cache.put_many(fresh)
 
-        if not text_to_analyze or text_to_analyze == '.':
-            article['sentiment'] = 0.0 # Default to neutral if no text
-            article['sentiment_label'] = 'Neutral'
-            analyzed_articles.append(article)
-            continue
+        for i, key in enumerate(keys):
+            row = cached.get(key) or fresh.get(key)
+            if row is not None:
+                unique_scores[i] = row
+
+        result[is_text] = unique_scores[codes]
+
+    return pd.DataFrame(result, index=texts.index, columns=SCORE_COLUMNS)
+
+def sentiment_labels(compound):
+    """Maps compound scores to 'Positive'/'Negative'/'Neutral' labels.
 
-        sentiment_scores = analyze_sentiment_vader(text_to_analyze)
-
-        if sentiment_scores:
-            compound_score = sentiment_scores['compound']
-            article['sentiment'] = compound_score
-            # Simple labeling based on compound score thresholds
-            if compound_score >= 0.05:
-                article['sentiment_label'] = 'Positive'
-            elif compound_score <= -0.05:
-                article['sentiment_label'] = 'Negative'
-            else:
-                article['sentiment_label'] = 'Neutral'
+    Args:
+        compound (array-like): VADER compound scores.
+
+    Returns:
+        numpy.ndarray: Label strings, using the usual +/-0.05 thresholds.
+    """
+    compound = np.asarray(compound, dtype=float)
+    return np.select([compound >= 0.05, compound <= -0.05], ['Positive', 'Negative'], default='Neutral')
+
+def headline_text(article):
+    """Returns the text scored for an article: its title and description combined.
+
+    Returns None when the article has neither.
+    """
+    title = article.get('title', '') or ''
+    description = article.get('description', '') or ''
+    text_to_analyze = f"{title}. {description}".strip()
+    if not text_to_analyze or text_to_analyze == '.':
+        return None
+    return text_to_analyze
+
+def _analyze_batch(articles, workers, chunk_size):
+    # Articles with no text or a failed analysis default to neutral
+    scores = score_texts([headline_text(article) for article in articles], workers, chunk_size)
+    compound = scores['compound'].fillna(0.0).to_numpy()
+    labels = sentiment_labels(compound)
+    for article, compound_score, label in zip(articles, compound, labels):
+        if isinstance(article, Article):
+            yield ScoredArticle(*article, float(compound_score), str(label))
         else:
-            # Handle cases where sentiment analysis failed
-            article['sentiment'] = 0.0
-            article['sentiment_label'] = 'Neutral' # Or 'Error'
+            article['sentiment'] = float(compound_score)
+            article['sentiment_label'] = str(label)
+            yield article
+
+def iter_analyzed(articles, batch_size=SCORE_BATCH_SIZE, workers=None, chunk_size=None):
+    """Scores a stream of articles lazily, `batch_size` articles at a time.
+
+    Lets fetch -> clean -> score -> aggregate run as a generator pipeline: only
+    one batch of articles is held at a time, however long the input is.
+
+    Args:
+        articles (iterable): Article records or article dicts ('title' and 'description').
+        batch_size (int): Articles scored per score_texts call.
+        workers (int): Worker processes for large batches (default settings.SENTIMENT_WORKERS).
+        chunk_size (int): Headlines per worker task (default settings.SENTIMENT_CHUNK_SIZE).
+
+    Yields:
+        ScoredArticle for Article records; dicts are updated in place with
+        'sentiment' and 'sentiment_label' and yielded. Other items are skipped.
+    """
+    batch = []
+    for article in articles:
+        if not isinstance(article, (dict, Article)):
+            logger.warning("Skipping non-article item in articles.")
+            continue
+        batch.append(article)
+        if len(batch) >= batch_size:
+            yield from _analyze_batch(batch, workers, chunk_size)
+            batch = []
+    if batch:
+        yield from _analyze_batch(batch, workers, chunk_size)
+
+@instrumentation.span('analyze_sentiment')
+def analyze_headlines_sentiment(articles, workers=None, chunk_size=None):
+    """Analyzes sentiment for a list of news articles.
+
+    Article records come back as ScoredArticle records; article dictionaries get
+    'sentiment' (VADER compound score) and 'sentiment_label'
+    (Positive/Negative/Neutral) added in place.
 
-        analyzed_articles.append(article)
+    Args:
+        articles (list): Article records or dictionaries (expecting 'title' and 'description').
+        workers (int): Worker processes for large batches (default settings.SENTIMENT_WORKERS).
+        chunk_size (int): Headlines per worker task (default settings.SENTIMENT_CHUNK_SIZE).
 
-    return analyzed_articles
+    Returns:
+        list: The articles with added sentiment information.
+              Returns an empty list if input is invalid.
+    """
+    if not isinstance(articles, list):
+        logger.error("Invalid input: articles must be a list.")
+        return []
+    return list(iter_analyzed(articles, max(len(articles), 1), workers, chunk_size))
 
+@instrumentation.span('aggregate_sentiment')
 def aggregate_sentiment_over_time(analyzed_articles, freq='D'):
     """Aggregates sentiment scores from articles over time.
 
@@ -97,8 +307,9 @@ def aggregate_sentiment_over_time(analyzed_articles, freq='D'):
 
     try:
         df = pd.DataFrame(analyzed_articles)
-        # Convert 'publishedAt' to datetime objects, coercing errors
-        df['publishedAt'] = pd.to_datetime(df['publishedAt'], errors='coerce')
+        # Convert 'publishedAt' to naive UTC datetime objects (so the result can be
+        # sliced with plain dates), coercing errors
+        df['publishedAt'] = pd.to_datetime(df['publishedAt'], errors='coerce', utc=True).dt.tz_localize(None)
         # Drop rows where conversion failed
         df = df.dropna(subset=['publishedAt', 'sentiment'])
         df = df.set_index('publishedAt')
@@ -113,3 +324,58 @@ def aggregate_sentiment_over_time(analyzed_articles, freq='D'):
     except Exception as e:
         logger.error(f"Error aggregating sentiment over time: {e}", exc_info=True)
         return pd.Series(dtype=float)
+
+@instrumentation.span('aggregate_sentiment')
+def aggregate_sentiment_by_ticker(analyzed_articles, tickers, freq='D'):
+    """Aggregates sentiment per ticker over time from a single (blended) fetch.
+
+    Each article is attributed to the tickers its headline mentions (see
+    ticker_matcher.attribute); the (period x ticker) means are then computed in
+    one pass from an article x ticker indicator matrix.
+
+    Args:
+        analyzed_articles (list): Articles with 'publishedAt', 'title',
+                                  'description' and 'sentiment' keys.
+        tickers (list): The tickers the articles were fetched for.
+        freq (str): Pandas frequency string for resampling (e.g., 'D', 'W', 'h').
+
+    Returns:
+        pandas.DataFrame: Mean sentiment per period (rows) and ticker (columns),
+                          NaN where a ticker had no articles, or an empty
+                          DataFrame if processing fails.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not analyzed_articles or not tickers:
+        return pd.DataFrame()
+
+    try:
+        published = pd.to_datetime(
+            [article.get('publishedAt') for article in analyzed_articles], errors='coerce', utc=True
+        ).tz_localize(None)
+        scores = pd.to_numeric(
+            pd.Series([article.get('sentiment') for article in analyzed_articles]), errors='coerce'
+        ).to_numpy(dtype=float)
+        valid = ~(published.isna() | np.isnan(scores))
+        if not valid.any():
+            return pd.DataFrame()
+
+        attributed = ticker_matcher.attribute(
+            [headline_text(article) for article in analyzed_articles], tickers
+        )
+        column = {ticker: i for i, ticker in enumerate(tickers)}
+        mentions = np.zeros((len(analyzed_articles), len(tickers)))
+        cells = [
+            (row, column[ticker]) for row, article_tickers in enumerate(attributed) for ticker in article_tickers
+        ]
+        if not cells:
+            return pd.DataFrame()
+        rows, cols = zip(*cells)
+        mentions[list(rows), list(cols)] = 1.0
+
+        index = published[valid]
+        counts = pd.DataFrame(mentions[valid], index=index, columns=tickers).resample(freq).sum()
+        sums = pd.DataFrame(mentions[valid] * scores[valid, None], index=index, columns=tickers).resample(freq).sum()
+        return sums / counts.where(counts > 0)
+    except Exception as e:
+        logger.error(f"Error aggregating sentiment by ticker: {e}", exc_info=True)
+        return pd.DataFrame()
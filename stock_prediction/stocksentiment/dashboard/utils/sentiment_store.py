@@ -0,0 +1,315 @@
+import uuid
+from datetime import datetime, time, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import F, Sum
+import pandas as pd
+import logging
+
+from ..models import (
+    ArticleMention, ArticleSentiment, DailySentiment, HourlySentiment, LivePost, LiveSentiment, NewsArticle, NewsQuery,
+)
+from . import sentiment_analyzer, ticker_matcher
+
+logger = logging.getLogger(__name__)
+
+# Supported rollups and the pandas resample rule for each
+SERIES_FREQS = {'H': 'h', 'D': 'D', 'W': 'W'}
+
+def save_mentions(article_ids, tickers):
+    """Links stored articles to the tickers their headlines mention.
+
+    Attribution uses ticker_matcher over the title and description, so one
+    combined fetch for several tickers still yields per-ticker mentions. Only
+    tickers a headline actually mentions are linked; articles mentioning none
+    are blended in when the combined series is read. Links that already exist
+    are skipped.
+
+    Args:
+        article_ids (list): Ids of NewsArticle rows.
+        tickers (list): Tickers the articles were fetched for.
+
+    Returns:
+        list: (article_id, ticker, published_at) for each newly created mention.
+    """
+    rows = list(
+        NewsArticle.objects.filter(pk__in=article_ids)
+        .values_list('pk', 'published_at', 'title', 'description')
+    )
+    texts = [sentiment_analyzer.headline_text({'title': t, 'description': d}) for _, _, t, d in rows]
+    attributed = ticker_matcher.attribute(texts, tickers)
+    existing = set(
+        ArticleMention.objects.filter(article_id__in=article_ids, ticker__in=tickers)
+        .values_list('article_id', 'ticker')
+    )
+    new = [
+        (pk, ticker, published_at)
+        for (pk, published_at, _, _), article_tickers in zip(rows, attributed)
+        for ticker in article_tickers
+        if (pk, ticker) not in existing
+    ]
+    ArticleMention.objects.bulk_create([
+        ArticleMention(article_id=pk, ticker=ticker, published_at=published_at)
+        for pk, ticker, published_at in new
+    ], ignore_conflicts=True)
+    return new
+
+def score_articles(article_ids):
+    """Scores stored articles that have no sentiment yet and upserts ArticleSentiment rows.
+
+    Returns:
+        list: Ids of the articles that were scored.
+    """
+    rows = list(
+        NewsArticle.objects.filter(pk__in=article_ids, sentiment__isnull=True)
+        .values_list('pk', 'title', 'description')
+    )
+    if not rows:
+        return []
+    texts = [sentiment_analyzer.headline_text({'title': t, 'description': d}) for _, t, d in rows]
+    # Articles without text or with a failed analysis are stored as neutral
+    scores = sentiment_analyzer.score_texts(texts).fillna({'neg': 0.0, 'neu': 1.0, 'pos': 0.0, 'compound': 0.0})
+    ArticleSentiment.objects.bulk_create(
+        [
+            ArticleSentiment(article_id=pk, neg=neg, neu=neu, pos=pos, compound=compound)
+            for (pk, _, _), (neg, neu, pos, compound) in zip(rows, scores.itertuples(index=False))
+        ],
+        update_conflicts=True,
+        unique_fields=['article'],
+        update_fields=['neg', 'neu', 'pos', 'compound', 'scored_at'],
+    )
+    return [pk for pk, _, _ in rows]
+
+def _fold(model, key_field, deltas):
+    """Adds (sum, count) deltas into running-total bucket rows of a sentiment model.
+
+    Each bucket is updated with UPDATE ... SET score_sum = score_sum + delta, so
+    concurrent folds into the same bucket add up instead of overwriting each other.
+    """
+    if not deltas:
+        return
+    with transaction.atomic():
+        model.objects.bulk_create(
+            [model(**{'ticker': ticker, key_field: key}) for ticker, key in deltas],
+            ignore_conflicts=True,
+        )
+        for (ticker, key), (delta_sum, delta_count) in deltas.items():
+            model.objects.filter(**{'ticker': ticker, key_field: key}).update(
+                score_sum=F('score_sum') + delta_sum,
+                article_count=F('article_count') + delta_count,
+            )
+
+def fold_mentions(mentions):
+    """Folds attributed articles into the running daily and hourly buckets.
+
+    Only the given mentions are read, so the cost depends on the new data and
+    not on how much history is stored. The unfolded ones among them are
+    selected and marked folded with one UPDATE, in the same transaction as the
+    bucket updates (which takes the write lock when it starts, see settings),
+    so a mention is counted once however many processes or retries fold it.
+
+    Args:
+        mentions (list): (article_id, ticker, published_at) tuples.
+
+    Returns:
+        int: Number of mentions folded.
+    """
+    wanted = {(pk, ticker) for pk, ticker, published_at in mentions if published_at is not None}
+    if not wanted:
+        return 0
+    daily, hourly = {}, {}
+    with transaction.atomic():
+        rows = [
+            row for row in ArticleMention.objects.select_for_update().filter(
+                article_id__in={pk for pk, _ in wanted}, folded=False,
+                published_at__isnull=False, article__sentiment__isnull=False,
+            ).values_list('pk', 'article_id', 'ticker', 'published_at', 'article__sentiment__compound')
+            if (row[1], row[2]) in wanted
+        ]
+        if not rows:
+            return 0
+        ArticleMention.objects.filter(pk__in=[row[0] for row in rows]).update(folded=True)
+        for _, _, ticker, published_at, compound in rows:
+            published_at = published_at.astimezone(dt_timezone.utc)
+            for buckets, key in ((daily, (ticker, published_at.date())),
+                                 (hourly, (ticker, published_at.replace(minute=0, second=0, microsecond=0)))):
+                score_sum, count = buckets.get(key, (0.0, 0))
+                buckets[key] = (score_sum + compound, count + 1)
+        _fold(DailySentiment, 'date', daily)
+        _fold(HourlySentiment, 'hour', hourly)
+    return len(rows)
+
+def ingest_articles(article_ids, tickers):
+    """Scores new articles, attributes them to tickers and folds them into the buckets.
+
+    Args:
+        article_ids (list): Ids of NewsArticle rows just stored.
+        tickers (list): Tickers the articles were fetched for.
+    """
+    if not article_ids:
+        return
+    score_articles(article_ids)
+    save_mentions(article_ids, tickers)
+    # Mentions left unfolded by an earlier failed ingest are picked up too
+    fold_mentions(list(
+        ArticleMention.objects.filter(article_id__in=article_ids, folded=False)
+        .values_list('article_id', 'ticker', 'published_at')
+    ))
+
+def fold_live_posts(posts):
+    """Stores scored live posts and adds the new ones to the LiveSentiment windows.
+
+    Posts already stored (seen before a restart, or from another source) are
+    skipped, so folding the same posts again adds nothing.
+
+    Args:
+        posts (list): (source, ticker, post_hash, window_start, score, title, url) tuples.
+
+    Returns:
+        int: Number of posts folded.
+    """
+    if not posts:
+        return 0
+    flush = uuid.uuid4()
+    with transaction.atomic():
+        LivePost.objects.bulk_create([
+            LivePost(source=source, ticker=ticker, post_hash=post_hash, window_start=window_start,
+                     score=score, title=(title or '')[:500], url=(url or '')[:1000], flush=flush)
+            for source, ticker, post_hash, window_start, score, title, url in posts
+        ], ignore_conflicts=True)
+        new = set(LivePost.objects.filter(flush=flush).values_list('ticker', 'post_hash'))
+        windows = {}
+        for _, ticker, post_hash, window_start, score, _, _ in posts:
+            if (ticker, post_hash) not in new:
+                continue
+            # A post repeated within the batch is only stored (and counted) once
+            new.discard((ticker, post_hash))
+            score_sum, count = windows.get((ticker, window_start), (0.0, 0))
+            windows[(ticker, window_start)] = (score_sum + score, count + 1)
+        _fold(LiveSentiment, 'window_start', windows)
+    return sum(count for _, count in windows.values())
+
+def recent_live_posts(ticker, after_id=None, limit=50):
+    """Returns the newest stored live posts with a title for a ticker, oldest first.
+
+    Args:
+        ticker (str): Stock ticker symbol.
+        after_id (int): Only posts stored after the LivePost with this id, or None.
+        limit (int): Most posts returned (the newest ones).
+
+    Returns:
+        list: Dicts with 'id', 'source', 'title', 'url', 'score' and 'window_start'.
+    """
+    posts = LivePost.objects.filter(ticker=ticker).exclude(title='')
+    if after_id is not None:
+        posts = posts.filter(pk__gt=after_id)
+    rows = posts.order_by('-pk').values('id', 'source', 'title', 'url', 'score', 'window_start')[:limit]
+    return list(reversed(rows))
+
+def live_window_totals(ticker, since):
+    """Returns (score_sum, post_count) over a ticker's LiveSentiment windows starting at or after `since`."""
+    totals = LiveSentiment.objects.filter(ticker=ticker, window_start__gte=since).aggregate(
+        score_sum=Sum('score_sum'), count=Sum('article_count')
+    )
+    return totals['score_sum'] or 0.0, totals['count'] or 0
+
+def prune_live_posts(before):
+    """Deletes stored live posts first seen before `before`; returns how many were deleted."""
+    deleted, _ = LivePost.objects.filter(seen_at__lt=before).delete()
+    return deleted
+
+def _bucket_frame(tickers, start_date, end_date, freq):
+    """Reads the stored buckets for a range as a long frame of (Date, Ticker, score_sum, article_count)."""
+    first = datetime.combine(start_date, time.min, tzinfo=dt_timezone.utc)
+    last = datetime.combine(end_date, time.max, tzinfo=dt_timezone.utc)
+    if freq == 'H':
+        rows = HourlySentiment.objects.filter(
+            ticker__in=tickers, hour__gte=first, hour__lte=last
+        ).values_list('hour', 'ticker', 'score_sum', 'article_count')
+    else:
+        rows = DailySentiment.objects.filter(
+            ticker__in=tickers, date__gte=start_date, date__lte=end_date
+        ).values_list('date', 'ticker', 'score_sum', 'article_count')
+    df = pd.DataFrame.from_records(list(rows), columns=['Date', 'Ticker', 'score_sum', 'article_count'])
+    # Naive UTC timestamps, like aggregate_sentiment_over_time
+    df['Date'] = pd.to_datetime(df['Date'], utc=True).dt.tz_localize(None)
+    return df
+
+def _unmatched_frame(tickers, start_date, end_date):
+    """Reads scored articles fetched for the tickers that mention none of them.
+
+    Only queries made up of requested tickers count, so an article from an
+    'AAPL OR MSFT' query is blended into AAPL + MSFT (+ others) but not into AAPL alone.
+
+    Returns:
+        pandas.DataFrame: (Date, score_sum, article_count) with one row per article.
+    """
+    tickers = set(tickers)
+    queries = [
+        pk for pk, query in NewsQuery.objects.values_list('pk', 'query')
+        if set(query.split(' OR ')) <= tickers
+    ]
+    first = datetime.combine(start_date, time.min, tzinfo=dt_timezone.utc)
+    last = datetime.combine(end_date, time.max, tzinfo=dt_timezone.utc)
+    rows = NewsArticle.objects.filter(
+        queries__in=queries, published_at__gte=first, published_at__lte=last, sentiment__isnull=False
+    ).exclude(mentions__ticker__in=tickers).distinct().values_list('published_at', 'sentiment__compound')
+    df = pd.DataFrame.from_records(list(rows), columns=['Date', 'score_sum'])
+    df['Date'] = pd.to_datetime(df['Date'], utc=True).dt.tz_localize(None)
+    df['article_count'] = 1
+    return df
+
+def load_sentiment_series(tickers, start_date, end_date, freq='D'):
+    """Returns mean sentiment over all mentions of the tickers, per period.
+
+    Rolled up from the stored buckets: 'H' from hourly buckets, 'D' from daily
+    buckets and 'W' by summing daily buckets into weeks. Articles fetched for
+    the tickers that mention none of them individually are added once each.
+
+    Args:
+        tickers (list): A list of stock ticker symbols.
+        start_date (datetime.date): Inclusive start date.
+        end_date (datetime.date): Inclusive end date.
+        freq (str): 'H', 'D' or 'W'.
+
+    Returns:
+        pandas.Series: Mean compound score per period between the first and last
+                       period with articles, with 0 (neutral) for empty periods -
+                       the same shape aggregate_sentiment_over_time returns.
+    """
+    if freq not in SERIES_FREQS:
+        raise ValueError(f"Unsupported frequency: {freq}")
+    frames = [_bucket_frame(tickers, start_date, end_date, freq), _unmatched_frame(tickers, start_date, end_date)]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.Series(dtype=float)
+    totals = pd.concat(frames).set_index('Date')[['score_sum', 'article_count']].resample(SERIES_FREQS[freq]).sum()
+    sentiment = totals['score_sum'] / totals['article_count']
+    # Fill missing periods with 0 (neutral)
+    return sentiment.fillna(0)
+
+def load_daily_sentiment(tickers, start_date, end_date, freq='D'):
+    """Reads mean sentiment per ticker as a wide DataFrame (periods x tickers).
+
+    Args:
+        tickers (list): A list of stock ticker symbols.
+        start_date (datetime.date): Inclusive start date.
+        end_date (datetime.date): Inclusive end date.
+        freq (str): 'H', 'D' (default) or 'W'.
+
+    Returns:
+        pandas.DataFrame: Mean compound score per period and ticker, from the
+                          articles that mention the ticker; NaN where a ticker
+                          had none. Empty if nothing is stored.
+    """
+    if freq not in SERIES_FREQS:
+        raise ValueError(f"Unsupported frequency: {freq}")
+    df = _bucket_frame(tickers, start_date, end_date, freq)
+    if df.empty:
+        return pd.DataFrame()
+    totals = df.pivot_table(
+        index='Date', columns='Ticker', values=['score_sum', 'article_count'], aggfunc='sum'
+    ).resample(SERIES_FREQS[freq]).sum(min_count=1)
+    data = totals['score_sum'] / totals['article_count']
+    data.index.name = 'Date'
+    data.columns.name = None
+    return data[[t for t in tickers if t in data.columns]]
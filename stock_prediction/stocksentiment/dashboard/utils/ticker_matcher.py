@@ -0,0 +1,135 @@
+from collections import deque
+from functools import lru_cache
+from django.conf import settings
+
+# Company names (and other spellings) that identify a ticker in headlines, in
+# addition to the symbol itself. Extend or override with settings.TICKER_ALIASES.
+TICKER_ALIASES = {
+    'AAPL': ['Apple', 'iPhone'],
+    'TSLA': ['Tesla'],
+    'AMZN': ['Amazon', 'AWS'],
+    'MSFT': ['Microsoft'],
+    'GOOGL': ['Alphabet', 'Google'],
+}
+
+def aliases_for(ticker):
+    """Returns the company-name aliases for a ticker, with settings overrides applied."""
+    overrides = getattr(settings, 'TICKER_ALIASES', {})
+    return list(overrides.get(ticker, TICKER_ALIASES.get(ticker, [])))
+
+class TickerMatcher:
+    """Aho-Corasick automaton over ticker symbols and company-name aliases.
+
+    All patterns are found in a single left-to-right scan of each text, however
+    many tickers are watched. Matches must start and end on word boundaries.
+    Symbols are case-sensitive ('AAPL', '$AAPL') so short symbols don't match
+    ordinary words; aliases are case-insensitive.
+    """
+
+    def __init__(self, tickers):
+        self.tickers = list(tickers)
+        # Trie as parallel lists: goto transitions, failure links and outputs,
+        # where an output is (pattern length, ticker, symbol or None for an alias)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for ticker in self.tickers:
+            self._add(ticker, (len(ticker), ticker, ticker))
+            for alias in aliases_for(ticker):
+                self._add(alias, (len(alias), ticker, None))
+        self._build_failure_links()
+
+    def _add(self, pattern, output):
+        state = 0
+        for ch in pattern.lower():
+            if ch not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = len(self._goto) - 1
+            state = self._goto[state][ch]
+        self._out[state].append(output)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text):
+        """Returns the set of tickers mentioned in a text."""
+        if not text:
+            return set()
+        found = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, ch in enumerate(text):
+            lowered = ch.lower()
+            # Keep positions aligned with the original text
+            if len(lowered) != 1:
+                lowered = ch
+            while state and lowered not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(lowered, 0)
+            for length, ticker, symbol in out[state]:
+                if ticker in found:
+                    continue
+                start = end - length + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end + 1 < len(text) and text[end + 1].isalnum():
+                    continue
+                if symbol is not None and text[start:end + 1] != symbol:
+                    continue
+                found.add(ticker)
+        return found
+
+    def find_many(self, texts):
+        """Returns, for each text, the set of tickers it mentions."""
+        return [self.find(text) for text in texts]
+
+@lru_cache(maxsize=32)
+def _compiled(tickers, aliases):
+    return TickerMatcher(tickers)
+
+def get_matcher(tickers):
+    """Returns a compiled matcher for a set of tickers, reused across calls.
+
+    Args:
+        tickers (list): Ticker symbols to watch (order and duplicates don't matter).
+
+    Returns:
+        TickerMatcher: The shared matcher for these tickers.
+    """
+    tickers = tuple(sorted(set(tickers)))
+    # The aliases are part of the key so a settings change recompiles the automaton
+    aliases = tuple(tuple(aliases_for(t)) for t in tickers)
+    return _compiled(tickers, aliases)
+
+def attribute(texts, tickers):
+    """Attributes each text to the tickers it mentions.
+
+    Texts that mention none of the tickers get an empty list: they were
+    returned by a query for those tickers (NewsAPI also matches the article
+    body, which isn't stored), so they count towards the blended series of all
+    the tickers when it is read (see sentiment_store.load_sentiment_series), but
+    not towards any single ticker. A query for one ticker needs no matching.
+
+    Args:
+        texts (list): Headline texts (None for articles without text).
+        tickers (list): The tickers the articles were fetched for.
+
+    Returns:
+        list: A list of ticker lists, one per text.
+    """
+    tickers = sorted(set(tickers))
+    if len(tickers) == 1:
+        return [list(tickers) for _ in texts]
+    matcher = get_matcher(tickers)
+    return [sorted(found) for found in matcher.find_many(texts)]
@@ -1,8 +1,10 @@
 from django.shortcuts import render
-from django.http import HttpRequest # For type hinting
-from .utils import data_fetchers, sentiment_analyzer # Import our utils
-import plotly.graph_objects as go
-import plotly.offline as opy
+from django.http import HttpRequest, JsonResponse, StreamingHttpResponse # For type hinting
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import reverse
+from django.conf import settings
+from urllib.parse import urlencode
+from .utils import api_clients, data_fetchers, rate_limiter, sentiment_analyzer, sentiment_store, correlation_analyzer, model_registry, live_stream, result_cache, chart_data, downsampling, price_cube, instrumentation # Import our utils
 import pandas as pd
 import logging
 from datetime import datetime, timedelta, date # Added date
@@ -12,6 +14,165 @@ logger = logging.getLogger(__name__)
 def index(request: HttpRequest):
     return render(request, 'dashboard/index.html')
 
+def _analyze_historic(selected_tickers, start_date, end_date, news_lookback_days):
+    """Runs the fetch -> sentiment -> chart data pipeline for the historic page.
+
+    Returns:
+        dict: 'stock_data' (DataFrame or None), 'daily_sentiment' (Series),
+              'ticker_sentiment' (DataFrame, dates x tickers), 'news_articles',
+              'price_chart' and 'sentiment_chart' (chart payloads or None),
+              'predictions' (see model_registry.predict), 'models_training'
+              (tickers whose models are still being trained) and 'error'.
+    """
+    result = {
+        'stock_data': None,
+        'daily_sentiment': pd.Series(dtype=float),
+        'ticker_sentiment': pd.DataFrame(),
+        'news_articles': [],
+        'price_chart': None,
+        'sentiment_chart': None,
+        'predictions': [],
+        'models_training': [],
+        'error': None,
+    }
+
+    try:
+        # 1-2. Fetch Stock Data (using selected dates) and News (using dates, limited by lookback) concurrently
+        logger.info(f"Fetching historical stock data for: {selected_tickers} from {start_date} to {end_date}")
+        logger.info(f"Fetching news headlines for: {selected_tickers} up to {end_date} (lookback {news_lookback_days} days)")
+        stock_data, news_articles = data_fetchers.fetch_historic_inputs(
+            selected_tickers, start_date, end_date, news_lookback_days
+        )
+        result['stock_data'] = stock_data
+
+        # 3. Analyze Sentiment
+        logger.info(f"Analyzing sentiment for {len(news_articles)} articles.")
+        analyzed_articles = sentiment_analyzer.analyze_headlines_sentiment(news_articles)
+        result['news_articles'] = analyzed_articles[:20] # Display top 20 recent articles
+
+        # 4. Aggregate Sentiment (read from the running per-day buckets kept by the sentiment store).
+        # Only the last news_lookback_days are fetched, but stored history (e.g. from the
+        # backfill_history command) covers the whole range.
+        logger.info("Aggregating sentiment over time.")
+        daily_sentiment = sentiment_store.load_sentiment_series(selected_tickers, start_date, end_date, freq='D')
+        ticker_sentiment = sentiment_store.load_daily_sentiment(selected_tickers, start_date, end_date, freq='D')
+        if daily_sentiment.empty:
+            daily_sentiment = sentiment_analyzer.aggregate_sentiment_over_time(analyzed_articles, freq='D')
+            ticker_sentiment = sentiment_analyzer.aggregate_sentiment_by_ticker(analyzed_articles, selected_tickers, freq='D')
+        result['daily_sentiment'] = daily_sentiment
+        result['ticker_sentiment'] = ticker_sentiment
+
+        # 5. Build chart data (rendered client-side by charts.js)
+        with instrumentation.span('build_charts'):
+            result['price_chart'] = chart_data.price_payload(stock_data, start_date, end_date)
+        if result['price_chart'] is None:
+             logger.warning("No stock data available to generate price chart.")
+             result['error'] = (result.get('error') or "") + "Could not fetch stock price data. "
+
+        if not daily_sentiment.empty:
+            with instrumentation.span('build_charts'):
+                result['sentiment_chart'] = chart_data.sentiment_payload(daily_sentiment, start_date, end_date, ticker_sentiment)
+            if result['sentiment_chart'] is None:
+                logger.warning("No sentiment data available within the selected date range.")
+        else:
+            logger.warning("No sentiment data available to generate sentiment chart.")
+            # Keep the existing error message if sentiment processing failed earlier
+            if "Could not process sentiment data" not in (result.get('error') or ""):
+                result['error'] = (result.get('error') or "") + "Could not process sentiment data for the selected range. "
+
+        # 6. ML Prediction (models are trained by the refresher or in the background, never here)
+        if stock_data is not None and not stock_data.empty:
+            logger.info(f"Predicting price direction for {list(stock_data.columns)}.")
+            with instrumentation.span('predict'):
+                result['predictions'] = model_registry.predict(stock_data, ticker_sentiment, settings.ML_HORIZONS)
+            result['models_training'] = model_registry.training(list(stock_data.columns))
+
+    except Exception as e:
+        logger.error(f"Error processing historic data: {e}", exc_info=True)
+        result['error'] = "An unexpected error occurred while processing the data."
+
+    return result
+
+def _parse_historic_params(params):
+    """Validates the tickers and date range of a historic analysis request.
+
+    Args:
+        params (QueryDict): request.GET or request.POST.
+
+    Returns:
+        dict: 'tickers', 'start_date', 'end_date', 'news_lookback_days' and 'error'
+              (a message, or None if the request is valid). Dates are None if invalid.
+    """
+    parsed = {
+        'tickers': params.getlist('stocks'),
+        'start_date': None,
+        'end_date': None,
+        'news_lookback_days': None,
+        'error': None,
+    }
+
+    # Validate and convert dates
+    try:
+        start_date = datetime.strptime(params.get('start_date'), '%Y-%m-%d').date()
+        end_date = datetime.strptime(params.get('end_date'), '%Y-%m-%d').date()
+        if start_date >= end_date:
+             raise ValueError("Start date must be before end date.")
+    except (ValueError, TypeError) as e:
+        parsed['error'] = f"Invalid date format or range: {e}"
+        return parsed
+    parsed['start_date'] = start_date
+    parsed['end_date'] = end_date
+
+    if not parsed['tickers']:
+        parsed['error'] = "Please select at least one stock."
+    elif len(parsed['tickers']) > 5:
+        parsed['error'] = "Please select a maximum of 5 stocks."
+
+    # Calculate days difference for news lookback, capped at ~30 for NewsAPI
+    news_lookback_days = min((end_date - start_date).days, 28)
+    if news_lookback_days <= 0:
+        news_lookback_days = 1 # Ensure at least 1 day for news
+    parsed['news_lookback_days'] = news_lookback_days
+    return parsed
+
+# Chart payloads of a historic result, also cached on their own (see _get_historic_result)
+HISTORIC_CHARTS = ('price_chart', 'sentiment_chart')
+
+def _historic_cache_keys(tickers, start_date, end_date, news_lookback_days):
+    """Returns the cache keys of a request's full result and of its chart payloads."""
+    return tuple(
+        result_cache.make_key(view_name, tickers, start_date, end_date, lookback=news_lookback_days)
+        for view_name in ('historic', 'historic_charts')
+    )
+
+def _get_historic_result(tickers, start_date, end_date, news_lookback_days):
+    """Returns the historic analysis for a request, from the result cache when possible."""
+    cache_key, charts_key = _historic_cache_keys(tickers, start_date, end_date, news_lookback_days)
+    result = result_cache.load(cache_key)
+    if result is None:
+        result = _analyze_historic(tickers, start_date, end_date, news_lookback_days)
+        # Only complete results are cached; partial ones (including those still
+        # waiting for a model to be trained) are retried on the next view
+        if not result['error'] and not result['models_training']:
+            result_cache.store(cache_key, result)
+        # The charts that were built are cached either way, so the chart requests
+        # following a partial result (e.g. prices but no news) don't run it again
+        charts = {name: result[name] for name in HISTORIC_CHARTS if result[name] is not None}
+        if charts:
+            result_cache.store(charts_key, charts)
+    else:
+        logger.info(f"Serving historic analysis for {tickers} from cache.")
+    return result
+
+def _get_historic_chart(tickers, start_date, end_date, news_lookback_days, chart_key):
+    """Returns (payload, error) for one historic chart, running the analysis only if it is not cached."""
+    _, charts_key = _historic_cache_keys(tickers, start_date, end_date, news_lookback_days)
+    charts = result_cache.load(charts_key)
+    if charts is not None and chart_key in charts:
+        return charts[chart_key], None
+    result = _get_historic_result(tickers, start_date, end_date, news_lookback_days)
+    return result[chart_key], result['error']
+
 def historic(request: HttpRequest):
     # Default date range (e.g., last 3 years)
     default_end_date = date.today()
@@ -22,112 +183,303 @@ def historic(request: HttpRequest):
         'selected_stocks': [],
         'start_date': default_start_date, # Add default dates to context
         'end_date': default_end_date,
-        'price_chart_html': None,
-        'sentiment_chart_html': None,
+        'price_chart_url': None,
+        'sentiment_chart_url': None,
         'news_articles': [],
+        'predictions': [],
+        'models_training': [],
         'error': None
     }
 
-    if request.method == 'POST':
-        selected_tickers = request.POST.getlist('stocks')
-        start_date_str = request.POST.get('start_date')
-        end_date_str = request.POST.get('end_date')
-
-        # Validate and convert dates
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            if start_date >= end_date:
-                 raise ValueError("Start date must be before end date.")
+    # Analysis requests come from the form (POST) or from a shared link (GET with parameters)
+    params = request.POST if request.method == 'POST' else request.GET
+    if request.method == 'POST' or 'stocks' in params:
+        parsed = _parse_historic_params(params)
+        context['selected_stocks'] = parsed['tickers'] # Keep selected stocks
+        if parsed['start_date']:
             # Update context with user-selected dates
-            context['start_date'] = start_date
-            context['end_date'] = end_date
-        except (ValueError, TypeError) as e:
-            context['error'] = f"Invalid date format or range: {e}"
-            context['selected_stocks'] = selected_tickers # Keep selected stocks
+            context['start_date'] = parsed['start_date']
+            context['end_date'] = parsed['end_date']
+        if parsed['error']:
+            context['error'] = parsed['error']
+            if len(parsed['tickers']) > 5:
+                context['selected_stocks'] = [] # Reset selection
             return render(request, 'dashboard/historic.html', context)
 
-        context['selected_stocks'] = selected_tickers
+        result = _get_historic_result(
+            parsed['tickers'], parsed['start_date'], parsed['end_date'], parsed['news_lookback_days']
+        )
+        context['news_articles'] = result['news_articles']
+        context['predictions'] = result['predictions']
+        context['models_training'] = result['models_training']
+        context['error'] = result['error']
 
-        if not selected_tickers:
-            context['error'] = "Please select at least one stock."
-            return render(request, 'dashboard/historic.html', context)
+        # Charts are fetched as JSON by charts.js using the same (normalized) parameters
+        query_string = urlencode({
+            'stocks': parsed['tickers'],
+            'start_date': parsed['start_date'].isoformat(),
+            'end_date': parsed['end_date'].isoformat(),
+        }, doseq=True)
+        if result['price_chart']:
+            context['price_chart_url'] = f"{reverse('api_historic_prices')}?{query_string}"
+        if result['sentiment_chart']:
+            context['sentiment_chart_url'] = f"{reverse('api_historic_sentiment')}?{query_string}"
 
-        if len(selected_tickers) > 5:
-             context['error'] = "Please select a maximum of 5 stocks."
-             context['selected_stocks'] = [] # Reset selection
-             return render(request, 'dashboard/historic.html', context)
+    return render(request, 'dashboard/historic.html', context)
 
-        # Calculate days difference for news lookback, capped at ~30 for NewsAPI
-        news_lookback_days = min((end_date - start_date).days, 28)
-        if news_lookback_days <= 0:
-            news_lookback_days = 1 # Ensure at least 1 day for news
+def _chart_json(request: HttpRequest, payload):
+    """Returns a chart payload as JSON, downsampled per the ?points and ?method parameters."""
+    # Bound the points sent per series; ?points=0 returns full resolution
+    try:
+        max_points = int(request.GET.get('points', settings.CHART_MAX_POINTS))
+    except ValueError:
+        return JsonResponse({'error': "points must be an integer."}, status=400)
+    method = request.GET.get('method', settings.CHART_DOWNSAMPLE_METHOD)
+    if method not in downsampling.METHODS:
+        return JsonResponse({'error': f"method must be one of {', '.join(downsampling.METHODS)}."}, status=400)
+    with instrumentation.span('serialize_chart'):
+        response = JsonResponse(chart_data.downsample_payload(payload, max(max_points, 0), method=method))
+    instrumentation.record_size('chart_payload', len(response.content))
+    return response
 
-        try:
-            # 1. Fetch Stock Data (using selected dates)
-            logger.info(f"Fetching historical stock data for: {selected_tickers} from {start_date} to {end_date}")
-            stock_data = data_fetchers.get_historical_stock_data_by_date(selected_tickers, start_date, end_date)
+def _historic_chart_api(request: HttpRequest, chart_key):
+    parsed = _parse_historic_params(request.GET)
+    if parsed['error']:
+        return JsonResponse({'error': parsed['error']}, status=400)
+    payload, error = _get_historic_chart(
+        parsed['tickers'], parsed['start_date'], parsed['end_date'], parsed['news_lookback_days'], chart_key
+    )
+    if payload is None:
+        return JsonResponse({'error': error or "No data available for the selected range."}, status=404)
+    return _chart_json(request, payload)
 
-            # 2. Fetch News (using dates, limited by lookback)
-            logger.info(f"Fetching news headlines for: {selected_tickers} up to {end_date} (lookback {news_lookback_days} days)")
-            news_articles = data_fetchers.get_news_headlines_by_date(selected_tickers, end_date, news_lookback_days)
+def historic_prices_api(request: HttpRequest):
+    """JSON price series for the historic page: {'dates': [...], 'series': [{'name', 'values'}]}.
 
-            # 3. Analyze Sentiment
-            logger.info(f"Analyzing sentiment for {len(news_articles)} articles.")
-            analyzed_articles = sentiment_analyzer.analyze_headlines_sentiment(news_articles)
-            context['news_articles'] = analyzed_articles[:20] # Display top 20 recent articles
+    Accepts the historic form parameters plus optional 'points' (per-series point
+    budget, default settings.CHART_MAX_POINTS) and 'method' ('lttb' or 'minmax').
+    """
+    return _historic_chart_api(request, 'price_chart')
 
-            # 4. Aggregate Sentiment
-            logger.info("Aggregating sentiment over time.")
-            daily_sentiment = sentiment_analyzer.aggregate_sentiment_over_time(analyzed_articles, freq='D')
+def historic_sentiment_api(request: HttpRequest):
+    """JSON daily sentiment series (with 7-day rolling average) for the historic page."""
+    return _historic_chart_api(request, 'sentiment_chart')
 
-            # 5. Generate Plots
-            if stock_data is not None and not stock_data.empty:
-                logger.info("Generating price chart.")
-                price_fig = go.Figure()
-                for ticker in stock_data.columns:
-                    price_fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data[ticker], mode='lines', name=ticker))
-                price_fig.update_layout(
-                    title=f'Historical Adjusted Close Prices ({start_date} to {end_date})',
-                    xaxis_title='Date', yaxis_title='Price (USD)', legend_title='Tickers'
-                )
-                context['price_chart_html'] = opy.plot(price_fig, auto_open=False, output_type='div')
-            else:
-                 logger.warning("No stock data available to generate price chart.")
-                 context['error'] = (context.get('error') or "") + "Could not fetch stock price data. "
-
-            if not daily_sentiment.empty:
-                # Filter sentiment data to match selected date range
-                filtered_sentiment = daily_sentiment[start_date:end_date]
-                if not filtered_sentiment.empty:
-                    logger.info("Generating sentiment chart.")
-                    sentiment_fig = go.Figure()
-                    sentiment_fig.add_trace(go.Scatter(x=filtered_sentiment.index, y=filtered_sentiment.values, mode='lines+markers', name='Avg Daily Sentiment'))
-                    if len(filtered_sentiment) >= 7:
-                        rolling_avg = filtered_sentiment.rolling(window=7).mean()
-                        sentiment_fig.add_trace(go.Scatter(x=rolling_avg.index, y=rolling_avg.values, mode='lines', name='7-Day Rolling Avg'))
-                    sentiment_fig.update_layout(title='Average Daily News Sentiment (VADER Compound Score)', xaxis_title='Date', yaxis_title='Avg. Sentiment Score')
-                    context['sentiment_chart_html'] = opy.plot(sentiment_fig, auto_open=False, output_type='div')
-                else:
-                    logger.warning("No sentiment data available within the selected date range.")
+# Shown instead of the live stream when the app is served over WSGI (e.g. runserver)
+ASGI_REQUIRED = (
+    "Live updates need an ASGI server. Start the app with "
+    "'uvicorn stocksentiment.asgi:application' instead of 'manage.py runserver'."
+)
+
+def live(request: HttpRequest):
+    stock = request.GET.get('stock')
+    context = {
+        'stocks': data_fetchers.TARGET_STOCKS,
+        'selected_stock': None,
+        'stream_url': None,
+        'sources': list(live_stream.available_sources()),
+        'quote_quota': api_clients.get_ledger('alpha_vantage').status(),
+        'error': None,
+    }
+    if stock:
+        if stock not in data_fetchers.TARGET_STOCKS:
+            context['error'] = f"Unknown stock: {stock}"
+        else:
+            context['selected_stock'] = stock
+            # Under WSGI the stream would be buffered and hold a worker until it ends
+            if isinstance(request, ASGIRequest):
+                context['stream_url'] = f"{reverse('api_live_stream')}?{urlencode({'stock': stock})}"
             else:
-                logger.warning("No sentiment data available to generate sentiment chart.")
-                # Keep the existing error message if sentiment processing failed earlier
-                if "Could not process sentiment data" not in (context.get('error') or ""):
-                    context['error'] = (context.get('error') or "") + "Could not process sentiment data for the selected range. "
+                context['error'] = ASGI_REQUIRED
+    return render(request, 'dashboard/live.html', context)
 
-            # TODO: Add ML Prediction step here later
+async def live_stream_api(request: HttpRequest):
+    """Server-Sent Events stream of live price and sentiment updates for ?stock=.
 
-        except Exception as e:
-            logger.error(f"Error processing historic data: {e}", exc_info=True)
-            context['error'] = "An unexpected error occurred while processing the data."
+    Runs on the ASGI event loop (see stocksentiment/asgi.py); each source is
+    polled concurrently and its results are pushed as they arrive. Under WSGI
+    Django would consume the stream synchronously, buffering it and holding a
+    worker for the whole stream, so it is refused with a 503.
+    """
+    stock = request.GET.get('stock')
+    if stock not in data_fetchers.TARGET_STOCKS:
+        return JsonResponse({'error': "stock must be one of " + ', '.join(data_fetchers.TARGET_STOCKS) + "."}, status=400)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': ASGI_REQUIRED}, status=503)
+    response = StreamingHttpResponse(live_stream.stream_updates(stock), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
 
-    return render(request, 'dashboard/historic.html', context)
+def _analyze_correlation(selected_tickers, start_date, end_date, news_lookback_days, window, max_lag):
+    """Runs the fetch -> align -> correlate pipeline for the correlation page.
 
-def live(request: HttpRequest):
-    return render(request, 'dashboard/live.html')
+    Recent news is fetched (and folded into the sentiment store) as on the historic
+    page; the sentiment matrix then covers the whole range from stored history.
+
+    Returns:
+        dict: 'lag_chart' and 'rolling_chart' (chart payloads or None),
+              'observations' ({ticker: paired days}) and 'error'.
+    """
+    result = {'lag_chart': None, 'rolling_chart': None, 'observations': {}, 'error': None}
+    try:
+        stock_data, _ = data_fetchers.fetch_historic_inputs(
+            selected_tickers, start_date, end_date, news_lookback_days
+        )
+        if stock_data is None or stock_data.empty:
+            result['error'] = "Could not fetch stock price data. "
+            return result
+        ticker_sentiment = sentiment_store.load_daily_sentiment(selected_tickers, start_date, end_date)
+        if ticker_sentiment.empty:
+            result['error'] = "No stored news sentiment for the selected range. "
+            return result
+
+        analysis = correlation_analyzer.analyze_correlation(
+            stock_data, ticker_sentiment, max_lag=max_lag, window=window
+        )
+        if analysis is None:
+            result['error'] = "No overlapping price and sentiment data for the selected stocks. "
+            return result
+        result['observations'] = {str(t): int(n) for t, n in analysis['observations'].items()}
+        result['lag_chart'] = chart_data.lag_heatmap_payload(analysis['lagged'])
+        result['rolling_chart'] = chart_data.rolling_correlation_payload(
+            analysis['pearson'], analysis['spearman'], window
+        )
+        if result['rolling_chart'] is None:
+            logger.warning(f"Not enough paired data for a {window}-day rolling correlation.")
+    except Exception as e:
+        logger.error(f"Error processing correlation data: {e}", exc_info=True)
+        result['error'] = "An unexpected error occurred while processing the data."
+    return result
+
+def _parse_correlation_params(params):
+    """Validates a correlation request: the historic parameters plus 'window' and 'max_lag'."""
+    parsed = _parse_historic_params(params)
+    parsed['window'] = correlation_analyzer.DEFAULT_WINDOW
+    parsed['max_lag'] = correlation_analyzer.DEFAULT_MAX_LAG
+    if parsed['error']:
+        return parsed
+    try:
+        parsed['window'] = int(params.get('window') or correlation_analyzer.DEFAULT_WINDOW)
+        parsed['max_lag'] = int(params.get('max_lag') or correlation_analyzer.DEFAULT_MAX_LAG)
+    except ValueError:
+        parsed['error'] = "Window and maximum lag must be whole numbers."
+        return parsed
+    if not 5 <= parsed['window'] <= 250:
+        parsed['error'] = "Rolling window must be between 5 and 250 trading days."
+    elif not 0 <= parsed['max_lag'] <= 30:
+        parsed['error'] = "Maximum lag must be between 0 and 30 trading days."
+    return parsed
+
+def _get_correlation_result(parsed):
+    """Returns the correlation analysis for a parsed request, from the result cache when possible."""
+    cache_key = result_cache.make_key(
+        'correlation', parsed['tickers'], parsed['start_date'], parsed['end_date'],
+        lookback=parsed['news_lookback_days'], window=parsed['window'], max_lag=parsed['max_lag'],
+    )
+    result = result_cache.load(cache_key)
+    if result is None:
+        result = _analyze_correlation(
+            parsed['tickers'], parsed['start_date'], parsed['end_date'],
+            parsed['news_lookback_days'], parsed['window'], parsed['max_lag'],
+        )
+        if not result['error']:
+            result_cache.store(cache_key, result)
+    else:
+        logger.info(f"Serving correlation analysis for {parsed['tickers']} from cache.")
+    return result
 
 def correlation_view(request: HttpRequest):
-    # Logic for correlation analysis will go here
-    context = {}
+    default_end_date = date.today()
+    default_start_date = default_end_date - timedelta(days=365)
+
+    context = {
+        'stocks': data_fetchers.TARGET_STOCKS,
+        'selected_stocks': [],
+        'start_date': default_start_date,
+        'end_date': default_end_date,
+        'window': correlation_analyzer.DEFAULT_WINDOW,
+        'max_lag': correlation_analyzer.DEFAULT_MAX_LAG,
+        'lag_chart_url': None,
+        'rolling_chart_url': None,
+        'observations': {},
+        'error': None
+    }
+
+    if 'stocks' in request.GET:
+        parsed = _parse_correlation_params(request.GET)
+        context['selected_stocks'] = parsed['tickers']
+        context['window'] = parsed['window']
+        context['max_lag'] = parsed['max_lag']
+        if parsed['start_date']:
+            context['start_date'] = parsed['start_date']
+            context['end_date'] = parsed['end_date']
+        if parsed['error']:
+            context['error'] = parsed['error']
+            if len(parsed['tickers']) > 5:
+                context['selected_stocks'] = []
+            return render(request, 'dashboard/correlation.html', context)
+
+        result = _get_correlation_result(parsed)
+        context['observations'] = result['observations']
+        context['error'] = result['error']
+
+        query_string = urlencode({
+            'stocks': parsed['tickers'],
+            'start_date': parsed['start_date'].isoformat(),
+            'end_date': parsed['end_date'].isoformat(),
+            'window': parsed['window'],
+            'max_lag': parsed['max_lag'],
+        }, doseq=True)
+        if result['lag_chart']:
+            context['lag_chart_url'] = f"{reverse('api_correlation_lags')}?{query_string}"
+        if result['rolling_chart']:
+            context['rolling_chart_url'] = f"{reverse('api_correlation_rolling')}?{query_string}"
+
     return render(request, 'dashboard/correlation.html', context)
+
+def _correlation_chart_api(request: HttpRequest, chart_key):
+    parsed = _parse_correlation_params(request.GET)
+    if parsed['error']:
+        return JsonResponse({'error': parsed['error']}, status=400)
+    result = _get_correlation_result(parsed)
+    payload = result[chart_key]
+    if payload is None:
+        return JsonResponse({'error': result['error'] or "Not enough data for this chart."}, status=404)
+    return _chart_json(request, payload)
+
+def correlation_lags_api(request: HttpRequest):
+    """JSON ticker x lag cross-correlation heatmap for the correlation page."""
+    return _correlation_chart_api(request, 'lag_chart')
+
+def correlation_rolling_api(request: HttpRequest):
+    """JSON rolling Pearson/Spearman correlation series; accepts 'points' and 'method' like the historic APIs."""
+    return _correlation_chart_api(request, 'rolling_chart')
+
+def model_metrics_api(request: HttpRequest):
+    """JSON model registry metrics for the worker process serving the request.
+
+    Reports cache size and contents, hit rate, model load times and recent
+    per-prediction latency (see ModelRegistry.stats).
+    """
+    return JsonResponse(model_registry.get_registry().stats())
+
+def quota_metrics_api(request: HttpRequest):
+    """JSON API usage: today's calls against each provider's daily quota (shared by
+    all workers) and how many duplicate in-flight fetches this worker coalesced.
+    """
+    return JsonResponse({
+        'quotas': api_clients.quota_status(),
+        'coalescing': rate_limiter.coalescing_stats(),
+    })
+
+def timing_metrics_api(request: HttpRequest):
+    """JSON request timing for the worker process serving the request: per-view and
+    per-stage durations, upstream call and cache counters, and payload sizes
+    (see instrumentation.Metrics.snapshot).
+    """
+    return JsonResponse(instrumentation.metrics.snapshot())
+
+def price_cube_metrics_api(request: HttpRequest):
+    """JSON description of the price cube mapped by this worker: version, shape and size."""
+    return JsonResponse(price_cube.stats())
@@ -2,6 +2,9 @@
 ASGI config for stocksentiment project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn stocksentiment.asgi:application``)
+so the live page's Server-Sent Events stream runs on the event loop instead of
+holding a worker thread per client.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
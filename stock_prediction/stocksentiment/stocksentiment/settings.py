@@ -33,6 +33,25 @@ REDDIT_USER_AGENT = os.getenv('REDDIT_USER_AGENT')
 
 # OpenRouter API Key
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+OPENROUTER_MODEL = os.getenv('OPENROUTER_MODEL', 'mistralai/mistral-7b-instruct')
+# Seconds an LLM prediction is reused for the same (bucketed) price move and sentiment
+LLM_CACHE_SECONDS = 900
+
+# Sentiment scoring: worker processes for large headline batches (1 = serial)
+# and the number of headlines sent to a worker per task
+SENTIMENT_WORKERS = int(os.getenv('SENTIMENT_WORKERS', '1'))
+SENTIMENT_CHUNK_SIZE = int(os.getenv('SENTIMENT_CHUNK_SIZE', '500'))
+
+# When True, page views only read data already stored by the refresh_market_data
+# command and never call yfinance or NewsAPI during a request
+PREWARMED_DATA_ONLY = os.getenv('PREWARMED_DATA_ONLY', 'False').lower() in ('1', 'true', 'yes')
+
+# Concurrent data fetching: pool size and per-source timeouts (seconds)
+FETCH_MAX_WORKERS = 8
+FETCH_TIMEOUTS = {
+    'prices': 20,
+    'news': 15,
+}
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
@@ -60,6 +79,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "dashboard.middleware.ServerTimingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -96,6 +116,14 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Prices and news are written from several fetch threads at once: wait for
+        # locks instead of failing, and take the write lock when a transaction starts
+        # (transaction_mode and init_command need Django 5.1+)
+        "OPTIONS": {
+            "timeout": 20,
+            "transaction_mode": "IMMEDIATE",
+            "init_command": "PRAGMA journal_mode=WAL;",
+        },
     }
 }
 
@@ -131,6 +159,52 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Live page: seconds between polls per source ('quote', 'reddit', 'rss') and stream length
+LIVE_POLL_INTERVALS = {}
+LIVE_STREAM_MAX_SECONDS = 900
+# Seconds an Alpha Vantage quote is shared by all live streams before it is fetched again
+QUOTE_CACHE_SECONDS = 60
+
+# Daily API quotas ({provider: calls per UTC day, or None}); unset providers use
+# the defaults in dashboard/utils/api_clients.py (NewsAPI 100, Alpha Vantage 25)
+API_DAILY_QUOTAS = {}
+
+# Charts: maximum points sent per series and how series are downsampled ('lttb' or 'minmax')
+CHART_MAX_POINTS = 1000
+CHART_DOWNSAMPLE_METHOD = 'lttb'
+
+# Prediction horizons (trading days) shown on the historic page
+ML_HORIZONS = (1, 5)
+
+# Years of stored price history models are trained on (see refresher.refresh_models)
+ML_TRAINING_YEARS = 3
+
+# Trained models kept in memory per worker process (LRU)
+MODEL_REGISTRY_SIZE = int(os.getenv('MODEL_REGISTRY_SIZE', '32'))
+
+# Send per-stage request timings to browsers in a Server-Timing header
+# (aggregates are kept at /api/metrics/timing/ either way)
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'True').lower() in ('1', 'true', 'yes')
+
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Local runtime data (caches, model files); not checked in
+VAR_DIR = Path(os.getenv('STOCKSENTIMENT_VAR_DIR', BASE_DIR / 'var'))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Computed page results, shared by all worker processes
+    "results": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": VAR_DIR / "cache" / "results",
+        "OPTIONS": {"MAX_ENTRIES": 500},
+    },
+}
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.0/howto/static-files/
 